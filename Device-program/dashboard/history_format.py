@@ -0,0 +1,88 @@
+"""Format respon ringkas untuk query histori (/api/logs).
+
+Dibangun langsung dari hasil fetch cursor (tuple), tanpa dict per baris:
+- columns : JSON {"columns": [...], "rows": n, "data": {kolom: [nilai...]}}
+- f32     : biner little-endian; timestamp float64 (epoch detik) lalu satu
+            blok float32 per kolom (NaN = null; id tidak ikut karena float32
+            tidak presisi untuk id besar). Nama kolom di header
+            X-Columns, jumlah baris di X-Row-Count. Di browser:
+            new Float64Array(buf, 0, n) dan new Float32Array(buf, 8*n + 4*n*i, n)
+- arrow   : Arrow IPC stream (butuh pyarrow)
+"""
+import importlib.util
+import json
+import math
+import sys
+from array import array
+from datetime import datetime
+
+# pyarrow opsional dan berat; hanya dicek keberadaannya, diimport saat format arrow dipakai
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+HISTORY_FORMATS = ("json", "columns", "f32", "arrow")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+F32_MEDIA_TYPE = "application/octet-stream"
+
+
+def negotiate(format=None, accept=None):
+    """format= menang atas header Accept; default json (list dict, perilaku lama)"""
+    if format:
+        return format
+    accept = accept or ""
+    if ARROW_MEDIA_TYPE in accept:
+        return "arrow"
+    if F32_MEDIA_TYPE in accept:
+        return "f32"
+    return "json"
+
+
+def columnar(cursor):
+    """Return (nama kolom, list kolom) dari cursor dalam satu transpose"""
+    names = [c[0] for c in cursor.description]
+    rows = cursor.fetchall()
+    columns = [list(col) for col in zip(*rows)] if rows else [[] for _ in names]
+    return names, columns
+
+
+def encode_columns(names, columns):
+    payload = {"columns": names, "rows": len(columns[0]) if columns else 0, "data": dict(zip(names, columns))}
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def epoch(values):
+    # Timestamp DB adalah waktu lokal tanpa zona; .timestamp() mengubahnya ke epoch UTC
+    result = array("d")
+    for ts in values:
+        try:
+            result.append(datetime.fromisoformat(ts).timestamp())
+        except (TypeError, ValueError):
+            result.append(math.nan)
+    return result
+
+
+def encode_f32(names, columns):
+    """Return (body, kolom yang dikirim); id dan kolom teks selain timestamp dilewati"""
+    n = len(columns[0]) if columns else 0
+    blocks, sent = [], []
+    for name, values in zip(names, columns):
+        if name in ("timestamp", "id"):
+            continue
+        if any(isinstance(v, str) for v in values):
+            continue
+        blocks.append(array("f", [math.nan if v is None else v for v in values]))
+        sent.append(name)
+    times = epoch(columns[names.index("timestamp")]) if "timestamp" in names else array("d", [math.nan] * n)
+    parts = [times] + blocks
+    if sys.byteorder != "little":
+        for part in parts:
+            part.byteswap()
+    return b"".join(part.tobytes() for part in parts), ["timestamp"] + sent
+
+
+def encode_arrow(names, columns):
+    import pyarrow as pa
+    table = pa.table(dict(zip(names, columns)))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,32 +1,156 @@
+import time
+STARTUP_STARTED = time.perf_counter()
 import sqlite3
 import os
-from fastapi import FastAPI, HTTPException, Response, UploadFile, File
-from fastapi.staticfiles import StaticFiles
+import sys
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response, UploadFile, File
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-import psutil
-import pandas as pd
+from usb_drives import DriveWatcher
 import io
-import time
 import shutil
+import threading
+import uuid
+import hashlib
+import json
+import math
+
+# Mode ukur waktu start (WS600_STARTUP_TIMING=1): durasi import, init DB, start service
+# dan respon pertama dicetak ke konsol saat request pertama selesai
+STARTUP_TIMING = os.environ.get("WS600_STARTUP_TIMING") == "1"
+startup_marks = []
+
+# Mode multi-worker (python main.py --workers N): proses induk menjalankan init DB, hub feed live dan
+# runner laporan sekali, lalu uvicorn menjalankan N proses worker dengan WS600_DASHBOARD_WORKER=1
+WORKERS = max(1, int(os.environ.get("WS600_DASHBOARD_WORKERS") or 1))
+WORKER_PROCESS = os.environ.get("WS600_DASHBOARD_WORKER") == "1"
 
-app = FastAPI()
+def mark_startup(phase):
+    startup_marks.append((phase, time.perf_counter() - STARTUP_STARTED))
+
+def report_startup():
+    print("[startup] waktu sejak import main.py:")
+    previous = 0.0
+    for phase, elapsed in startup_marks:
+        print(f"[startup]   {phase:<16} {elapsed:7.3f}s  (+{elapsed - previous:.3f}s)")
+        previous = elapsed
+
+@asynccontextmanager
+async def lifespan(app):
+    """Kerja start sekali: skema DB lalu service background; aset statis dikompres di thread.
+    Worker multi-proses melewati init_db dan runner laporan (dijalankan proses induk)"""
+    mark_startup("lifespan")
+    if not WORKER_PROCESS:
+        init_db()
+        fail_stale_jobs()
+        start_report_runner()
+    mark_startup("init_db")
+    drive_watcher.start()
+    recent_store.start()
+    profiler.watch(read_profile_mode)
+    threading.Thread(target=static_files.warm, name="static-warm", daemon=True).start()
+    mark_startup("services")
+    yield
+    report_stop.set()
+    drive_watcher.stop()
+    recent_store.stop()
+    profiler.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # Path to database (Points to root folder Wheather/ws600_data.db)
-DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ws600_data.db"))
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DB_PATH = os.environ.get("WS600_DB_PATH") or os.path.join(ROOT_DIR, "ws600_data.db")
+
+# Modul bersama poller & dashboard (ws600_*.py) ada di folder root
+sys.path.insert(0, ROOT_DIR)
+from ws600_metrics import REGISTRY, CONTENT_TYPE
+from recent_buffer import RecentStore, RECENT_CAPACITY
+from ws600_livefeed import LIVE_FIELDS
+from ws600_qc import qc_clean_sql, qc_value_sql
+from ws600_compress import COMPRESS_FIELDS, KEYFRAME_INTERVAL, default_tolerance, resample, validate as validate_compression
+from static_cache import CachedStaticFiles
+from result_cache import DiskResultCache, ResultCache, RESULT_CACHE_BYTES, range_closed
+from ws600_profiler import Profiler, PROFILE_MODES, profile_files, load_profile
+from history_format import (
+    HISTORY_FORMATS, ARROW_MEDIA_TYPE, F32_MEDIA_TYPE, ARROW_AVAILABLE,
+    negotiate, columnar, encode_columns, encode_f32, encode_arrow,
+)
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "ws600_http_request_seconds", "Latency request dashboard per endpoint", ("endpoint", "method", "status")
+)
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """Gzip hanya untuk respon API >= 1 KB; file statis sudah punya varian gzip sendiri (static_cache.py)
+    dan file laporan xlsx/pdf sudah terkompresi"""
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] == "http" and (
+            not (path.startswith("/api/") or path == "/metrics")
+            or path == "/api/export-excel" or path.endswith("/file")
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(ApiGZipMiddleware, minimum_size=1024, compresslevel=6)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    if STARTUP_TIMING and startup_marks[-1][0] != "first_response":
+        mark_startup("first_response")
+        report_startup()
+    # Pakai template path (/api/reports/{job_id}) agar label tidak meledak; file statis digabung
+    route = request.scope.get("route")
+    REQUEST_LATENCY.observe(
+        time.perf_counter() - started,
+        endpoint=getattr(route, "path", "static"), method=request.method, status=response.status_code
+    )
+    return response
+
+drive_watcher = DriveWatcher()
 
 def get_usb_path():
-    """Helper untuk mendeteksi letak Flashdisk"""
-    for partition in psutil.disk_partitions():
-        if 'removable' in partition.opts.lower() or partition.fstype == 'FAT32':
-            try:
-                test_file = os.path.join(partition.mountpoint, ".test_write")
-                with open(test_file, 'w') as f: f.write('1')
-                os.remove(test_file)
-                return partition.mountpoint
-            except: continue
-    return None
+    """Helper untuk mendeteksi letak Flashdisk (dari cache DriveWatcher, tanpa probing disk)"""
+    return drive_watcher.get_usb_path()
+
+# Profiling runtime (ws600_profiler.py): mode dari system_settings.profile_mode, file profil di samping DB
+# (sama dengan poller). Thread recent-buffer menunggu di sock.recv: frame terdalamnya dihitung idle
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "profiles")
+profiler = Profiler("dashboard", PROFILE_DIR, idle=[("recent_buffer.py", "_run")])
+
+def read_profile_mode():
+    conn = sqlite3.connect(DB_PATH)
+    row = conn.execute("SELECT profile_mode FROM system_settings WHERE id = 1").fetchone()
+    conn.close()
+    return row[0] if row else "off"
+
+# Data live beberapa jam terakhir di memori, diisi feed UDP dari poller (worker: lewat hub proses induk)
+recent_store = RecentStore(DB_PATH, subscribe=WORKER_PROCESS)
+
+LIVE_SNAPSHOT_TTL = 1.0  # detik; poller memperbarui weather_live/system_status setiap siklus polling
+live_rows = {}  # (tabel, station_id) -> (waktu baca, baris)
+
+def live_row(table, station_id):
+    """Baris weather_live/system_status: maksimal satu query per TTL per proses, berapa pun jumlah kiosk"""
+    cached = live_rows.get((table, station_id))
+    if cached and time.monotonic() - cached[0] < LIVE_SNAPSHOT_TTL:
+        return cached[1]
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute(f"SELECT * FROM {table} WHERE id = ?", (station_id,)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    row = dict(row)
+    live_rows[(table, station_id)] = (time.monotonic(), row)
+    return row
 
 class WeatherData(BaseModel):
     id: int
@@ -60,8 +184,64 @@ class SystemSettings(BaseModel):
     baudrate: int
     show_air_quality: bool = True
     show_flow_meter: bool = True
+    # Koneksi stasiun utama: serial (RTU), tcp (Modbus TCP) atau rtu_tcp (RTU lewat gateway TCP)
+    transport: str = "serial"
+    host: Optional[str] = ""
+    tcp_port: int = 502
+    slave_id: int = 1
+    pipeline_depth: int = 1
+    # Profiling runtime (off/stacks/full); None = tidak diubah
+    profile_mode: Optional[str] = None
 
-from datetime import datetime
+class Station(BaseModel):
+    id: int
+    name: str
+    transport: str = "serial"
+    com_port: Optional[str] = None
+    baudrate: int = 9600
+    host: Optional[str] = None
+    tcp_port: int = 502
+    slave_id: int = 1
+    pipeline_depth: int = 1
+    enabled: bool = True
+
+class ReplicationSettings(BaseModel):
+    enabled: bool = False
+    endpoint_url: Optional[str] = ""
+    site_id: Optional[str] = ""
+    api_key: Optional[str] = ""
+    batch_size: int = 2000
+    max_bytes_per_sec: int = 0
+    backfill_days: int = -1
+
+class CompressionField(BaseModel):
+    field: str
+    mode: str = "off"
+    tolerance: Optional[float] = None  # None = default dari rentang sensor
+
+TRANSPORTS = ("serial", "tcp", "rtu_tcp", "esp32")
+PRIMARY_STATION = 1  # stasiun di system_settings; grafik, forecast & laporan memakai stasiun ini
+STATION_COLUMNS = [
+    ("transport", "TEXT DEFAULT 'serial'"),
+    ("host", "TEXT DEFAULT ''"),
+    ("tcp_port", "INTEGER DEFAULT 502"),
+    ("slave_id", "INTEGER DEFAULT 1"),
+    ("pipeline_depth", "INTEGER DEFAULT 1"),
+]
+# Statistik jendela simpan dari poller (semua sampel di antara dua baris histori)
+WINDOW_COLUMNS = [
+    ("sample_count", "INTEGER"),
+    ("wind_speed_avg", "REAL"),
+    ("wind_gust", "REAL"),
+    ("wind_dir_avg", "REAL"),
+    ("wind_dir_std", "REAL"),
+    ("temp_min", "REAL"),
+    ("temp_max", "REAL"),
+    ("rain_increment", "REAL"),
+    ("qc_flags", "INTEGER"),
+]
+
+from datetime import datetime, timedelta
 
 def init_db():
     conn = sqlite3.connect(DB_PATH)
@@ -157,75 +337,341 @@ def init_db():
         cursor.execute("ALTER TABLE system_settings ADD COLUMN show_air_quality INTEGER DEFAULT 1")
     if "show_flow_meter" not in cols:
         cursor.execute("ALTER TABLE system_settings ADD COLUMN show_flow_meter INTEGER DEFAULT 1")
+    for column, ddl in STATION_COLUMNS:
+        if column not in cols:
+            cursor.execute(f"ALTER TABLE system_settings ADD COLUMN {column} {ddl}")
+    if "profile_mode" not in cols:
+        cursor.execute("ALTER TABLE system_settings ADD COLUMN profile_mode TEXT DEFAULT 'off'")
+
+    # Stasiun tambahan (dibaca poller); id stasiun = id baris weather_live/system_status
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stations (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            transport TEXT DEFAULT 'serial',
+            com_port TEXT,
+            baudrate INTEGER DEFAULT 9600,
+            host TEXT,
+            tcp_port INTEGER DEFAULT 502,
+            slave_id INTEGER DEFAULT 1,
+            pipeline_depth INTEGER DEFAULT 1,
+            enabled INTEGER DEFAULT 1
+        )
+    """)
+    # Kolom radiasi (channel opsional) untuk tabel lama, sama dengan migrasi poller: dibutuhkan backfill
+    # recent buffer walaupun dashboard start lebih dulu dari poller
+    for table in ("weather_data", "weather_live"):
+        cursor.execute(f"PRAGMA table_info({table})")
+        if "solar_radiation" not in [c[1] for c in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN solar_radiation REAL")
+    cursor.execute("PRAGMA table_info(weather_data)")
+    cols = [c[1] for c in cursor.fetchall()]
+    if "station_id" not in cols:
+        cursor.execute(f"ALTER TABLE weather_data ADD COLUMN station_id INTEGER DEFAULT {PRIMARY_STATION}")
+    for column, ddl in WINDOW_COLUMNS:
+        if column not in cols:
+            cursor.execute(f"ALTER TABLE weather_data ADD COLUMN {column} {ddl}")
+
+    # Replikasi ke server pusat (ws600_replicator.py); cursor pengiriman di replication_state
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS replication_settings (
+            id INTEGER PRIMARY KEY,
+            enabled INTEGER DEFAULT 0,
+            endpoint_url TEXT,
+            site_id TEXT,
+            api_key TEXT,
+            batch_size INTEGER DEFAULT 2000,
+            max_bytes_per_sec INTEGER DEFAULT 0,
+            backfill_days INTEGER DEFAULT -1
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS replication_state (
+            target TEXT PRIMARY KEY,
+            last_id INTEGER,
+            rows_sent INTEGER DEFAULT 0,
+            bytes_sent INTEGER DEFAULT 0,
+            last_success DATETIME,
+            last_attempt DATETIME,
+            last_error TEXT
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO replication_settings (id) VALUES (1)")
+
+    # Rollup hujan per jam dari poller (increment counter rain_total, sudah termasuk reset/rollover)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rain_hourly (
+            station_id INTEGER,
+            hour DATETIME,
+            rain_mm REAL DEFAULT 0,
+            peak_intensity REAL DEFAULT 0,
+            PRIMARY KEY (station_id, hour)
+        )
+    """)
 
     # Insert default settings if not exists
     cursor.execute("SELECT COUNT(*) FROM system_settings")
     if cursor.fetchone()[0] == 0:
         cursor.execute("INSERT INTO system_settings (poll_interval, save_interval, com_port, baudrate, show_air_quality, show_flow_meter) VALUES (2, 10, 'COM21', 9600, 1, 1)")
+
+    # Riwayat cek ulang kualitas data (ws600_qc.py); id terakhir ikut ETag histori
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS qc_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at DATETIME,
+            range_start DATETIME,
+            range_end DATETIME,
+            station_id INTEGER,
+            rows_checked INTEGER,
+            rows_flagged INTEGER,
+            duration_s REAL
+        )
+    """)
+
+    # Kompresi histori per kolom (dibaca poller); kolom tanpa baris = off
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS compression_settings (
+            field TEXT PRIMARY KEY,
+            mode TEXT DEFAULT 'off',
+            tolerance REAL
+        )
+    """)
+
+    # Index waktu agar query per hari / per range tidak full scan
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_weather_data_timestamp ON weather_data (timestamp)")
+
+    # Create daily_stats table (cache statistik harian untuk laporan)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            date TEXT PRIMARY KEY,
+            samples INTEGER,
+            temp_min REAL,
+            temp_max REAL,
+            temp_avg REAL,
+            hum_min REAL,
+            hum_max REAL,
+            hum_avg REAL,
+            wind_avg REAL,
+            gust_max REAL,
+            gust_time TEXT,
+            prevailing_dir TEXT,
+            rain_total REAL,
+            pressure_open REAL,
+            pressure_close REAL,
+            pressure_tendency REAL,
+            computed_at DATETIME,
+            temp_weight INTEGER,
+            hum_weight INTEGER
+        )
+    """)
+    # Bobot rerata harian (jumlah sample_count) untuk rerata laporan multi-hari; baris cache
+    # lama tanpa bobot dihitung ulang oleh get_daily_stats
+    cursor.execute("PRAGMA table_info(daily_stats)")
+    cols = [c[1] for c in cursor.fetchall()]
+    for column in DAILY_WEIGHT_COLUMNS:
+        if column not in cols:
+            cursor.execute(f"ALTER TABLE daily_stats ADD COLUMN {column} INTEGER")
     
     conn.commit()
     conn.close()
 
-init_db()
+def feed_latest(station_id):
+    """Baris seperti weather_live dari sampel feed terakhir (worker multi-proses), None jika belum ada"""
+    latest = recent_store.latest(station_id)
+    if latest is None:
+        return None
+    ts, values = latest
+    # Kolom weather_live lain (kualitas udara, flow meter) tidak diisi poller, sama dengan baris DB-nya
+    row = dict.fromkeys(WeatherData.model_fields)
+    row.update(id=station_id, timestamp=datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"))
+    row.update({f: None if math.isnan(v) else round(v, 3) for f, v in zip(LIVE_FIELDS, values)})
+    return row
+
+def feed_status(station_id):
+    """Baris seperti system_status dari status feed terakhir (worker multi-proses), None jika belum ada"""
+    status = recent_store.status(station_id)
+    if status is None:
+        return None
+    changed_at, port_ok, sensor_ok, state = status
+    return {
+        "id": station_id, "port_connected": int(port_ok), "sensor_responding": int(sensor_ok),
+        "last_check": datetime.fromtimestamp(changed_at).strftime("%Y-%m-%d %H:%M:%S"), "circuit_state": state,
+    }
 
 @app.get("/api/latest")
-async def get_latest_data():
+async def get_latest_data(station_id: int = PRIMARY_STATION):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        # Mengambil data terbaru dari tabel live (update setiap 2 detik)
-        cursor.execute("SELECT * FROM weather_live WHERE id = 1")
-        row = cursor.fetchone()
-        conn.close()
+        # Worker: dari feed hub di memori. Proses tunggal, atau feed belum masuk (poller mati):
+        # tabel live (update setiap siklus polling, satu baris per stasiun)
+        row = (feed_latest(station_id) if WORKER_PROCESS else None) or live_row("weather_live", station_id)
         
         if row:
-            return dict(row)
+            return row
         return {"error": "No data found"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/recent")
+async def get_recent(
+    seconds: int = 300,
+    station_id: int = PRIMARY_STATION,
+    fields: Optional[str] = None,
+    max_points: Optional[int] = None
+):
+    """Sampel live N detik terakhir dari ring buffer memori (resolusi polling, tanpa query DB)"""
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds harus > 0")
+    selected = [f for f in fields.split(",") if f] if fields else None
+    buffer = recent_store.buffer(station_id)
+    if buffer is None:
+        data = {"timestamp": []}
+        data.update({f: [] for f in (selected or LIVE_FIELDS)})
+    else:
+        data = buffer.since(time.time() - seconds, selected, max_points)
+    return {"station_id": station_id, "seconds": seconds, "capacity": RECENT_CAPACITY, **data}
+
+def history_version(conn):
+    """(id terkecil, id terbesar weather_data, run QC terakhir): berubah jika ada baris baru/terhapus atau QC dicek ulang"""
+    return conn.execute(
+        "SELECT (SELECT MIN(id) FROM weather_data), (SELECT MAX(id) FROM weather_data), (SELECT MAX(id) FROM qc_runs)"
+    ).fetchone()
+
+def history_etag(conn, request, version=None):
+    """ETag query histori: berubah jika histori berubah (history_version), hari berganti, atau parameter beda"""
+    lo, hi, qc_run = version or history_version(conn)
+    key = f"{lo}:{hi}:{qc_run}:{datetime.now().date()}:{request.url.query}:{request.headers.get('accept', '')}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest()[:16] + '"'
+
+def not_modified(request, etag):
+    return etag in [tag.strip(" W/") for tag in request.headers.get("if-none-match", "").split(",")]
+
+# Hasil /api/logs & /api/export-excel per query; rentang yang sudah tutup tidak di-query ulang.
+# Proses tunggal: di memori. Multi-worker: satu cache file bersama (dikosongkan proses induk saat start)
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "result_cache")
+result_cache = DiskResultCache(RESULT_CACHE_DIR) if WORKER_PROCESS else ResultCache()
+
+def cached_result(conn, key, end_date=None, version=None):
+    """Return (hasil cache | None, fungsi simpan(value, size)); end_date None = rentang terbuka"""
+    lo, hi, qc_run = version or history_version(conn)
+    tail = None if range_closed(end_date) else hi
+    value = result_cache.get(key, (lo, qc_run), tail)
+
+    def store(result, size):
+        result_cache.put(key, result, size, (lo, qc_run), tail)
+    return value, store
+
 @app.get("/api/logs")
 async def get_logs(
+    request: Request,
     limit: int = 100, 
     start_date: Optional[str] = None, 
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    station_id: int = PRIMARY_STATION,
+    format: Optional[str] = None,
+    fields: Optional[str] = None,
+    clean: bool = False,
+    interval: Optional[int] = None
 ):
+    """Histori weather_data terbaru dulu.
+
+    format=json (default, list dict) | columns | f32 | arrow, atau lewat header Accept;
+    fields=wind_speed,wind_direction membatasi kolom (timestamp selalu ikut);
+    clean=true mengganti nilai yang ditandai QC (qc_flags) dengan null;
+    interval=N merekonstruksi deret reguler setiap N detik dari baris tersimpan (histori terkompresi):
+    kolom swinging_door linear, kolom lain step.
+    Hasil disimpan di result_cache: rentang yang sudah tutup tidak di-query ulang.
+    """
+    fmt = negotiate(format, request.headers.get("accept"))
+    if fmt not in HISTORY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format tidak dikenal: {fmt}")
+    if interval is not None and interval <= 0:
+        raise HTTPException(status_code=400, detail="interval harus > 0")
+    if fmt == "arrow" and not ARROW_AVAILABLE:
+        raise HTTPException(status_code=406, detail="Format arrow butuh pyarrow (pip install pyarrow)")
     try:
         conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
+        version = history_version(conn)
+        etag = history_etag(conn, request, version)
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if not_modified(request, etag):
+            conn.close()
+            return Response(status_code=304, headers=cache_headers)
+
+        if not (start_date and end_date):
+            start_date = end_date = None
+        modes = dict(conn.execute("SELECT field, mode FROM compression_settings")) if interval else {}
+        key = ("logs", station_id, start_date, end_date, limit, fmt, fields, clean, interval, tuple(sorted(modes.items())))
+        cached, store = cached_result(conn, key, end_date, version)
+        if cached is not None:
+            conn.close()
+            body, media_type, headers = cached
+            return Response(body, media_type=media_type, headers={**cache_headers, **headers})
+
+        columns = "*"
+        if fields or clean:
+            known = [c[1] for c in cursor.execute("PRAGMA table_info(weather_data)")]
+            selected = [f for f in fields.split(",") if f] if fields else known
+            unknown = [f for f in selected if f not in known]
+            if unknown:
+                conn.close()
+                raise HTTPException(status_code=400, detail=f"Kolom tidak dikenal: {', '.join(unknown)}")
+            if fields:
+                selected = ["timestamp"] + [f for f in selected if f != "timestamp"]
+            columns = ", ".join(f"{qc_value_sql(f)} AS {f}" if clean else f for f in selected)
         
-        query = "SELECT * FROM weather_data"
-        params = []
+        query = f"SELECT {columns} FROM weather_data WHERE station_id = ?"
+        params = [station_id]
         
         if start_date and end_date:
-            query += " WHERE timestamp BETWEEN ? AND ?"
+            query += " AND timestamp BETWEEN ? AND ?"
             params.extend([start_date + " 00:00:00", end_date + " 23:59:59"])
         
         query += " ORDER BY id DESC LIMIT ?"
         params.append(limit)
         
         cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        if interval:
+            rows = cursor.fetchall()[::-1]
+            names = [c[0] for c in cursor.description]
+            conn.close()
+            names, data = resample(names, rows, interval, modes)
+            data = [column[::-1] for column in data]  # tetap terbaru dulu
+        else:
+            names, data = columnar(cursor)
+            conn.close()
+
+        headers = {}
+        if fmt == "json":
+            # Sama dengan JSONResponse FastAPI (list dict), tapi sudah jadi bytes agar bisa di-cache
+            rows = [dict(zip(names, row)) for row in zip(*data)]
+            body, media_type = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode(), "application/json"
+        elif fmt == "columns":
+            body, media_type = encode_columns(names, data), "application/json"
+        elif fmt == "arrow":
+            body, media_type = encode_arrow(names, data), ARROW_MEDIA_TYPE
+        else:
+            body, sent = encode_f32(names, data)
+            media_type = F32_MEDIA_TYPE
+            headers = {
+                "X-Columns": ",".join(sent),
+                "X-Row-Count": str(len(data[0]) if data else 0),
+                "Access-Control-Expose-Headers": "X-Columns, X-Row-Count",
+            }
+        store((body, media_type, headers), len(body))
+        return Response(body, media_type=media_type, headers={**cache_headers, **headers})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/status")
-async def get_status():
+async def get_status(station_id: int = PRIMARY_STATION):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM system_status WHERE id = 1")
-        row = cursor.fetchone()
-        conn.close()
+        row = (feed_status(station_id) if WORKER_PROCESS else None) or live_row("system_status", station_id)
         
         if row:
-            return dict(row)
+            return row
         return {"error": "Status not found"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -237,7 +683,12 @@ async def get_forecast():
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         # Ambil 50 data terakhir untuk dianalisis trend-nya
-        cursor.execute("SELECT temperature, humidity, wind_speed FROM weather_data ORDER BY id DESC LIMIT 50")
+        # Baris yang ditandai QC (spike, sensor macet, di luar rentang) tidak ikut regresi
+        cursor.execute(
+            "SELECT temperature, humidity, wind_speed FROM weather_data WHERE station_id = ? AND "
+            + qc_clean_sql("temperature", "humidity", "wind_speed") + " ORDER BY id DESC LIMIT 50",
+            (PRIMARY_STATION,)
+        )
         rows = cursor.fetchall()
         conn.close()
 
@@ -281,6 +732,278 @@ async def get_forecast():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+WIND_SECTORS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+DAILY_STATS_COLUMNS = [
+    "date", "samples", "temp_min", "temp_max", "temp_avg", "hum_min", "hum_max", "hum_avg",
+    "wind_avg", "gust_max", "gust_time", "prevailing_dir", "rain_total",
+    "pressure_open", "pressure_close", "pressure_tendency", "computed_at"
+]
+# Jumlah sample_count di balik temp_avg/hum_avg, bobot saat rerata harian digabung
+DAILY_WEIGHT_COLUMNS = ["temp_weight", "hum_weight"]
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Format tanggal salah: {value} (gunakan YYYY-MM-DD)")
+
+def compute_daily_stats(cursor, day):
+    """Hitung statistik satu hari dari weather_data (satu kali scan per hari)"""
+    day_start = f"{day} 00:00:00"
+    day_end = f"{day} 23:59:59"
+
+    # Nilai rain_day terakhir sebelum hari ini, agar hujan sebelum sampel pertama ikut terhitung
+    cursor.execute(
+        "SELECT rain_day FROM weather_data WHERE station_id = ? AND timestamp < ? ORDER BY timestamp DESC LIMIT 1",
+        (PRIMARY_STATION, day_start)
+    )
+    prev = cursor.fetchone()
+    prev_rain = prev[0] if prev else None
+
+    # Baris baru membawa statistik semua sampel sejak simpan sebelumnya (gust, rerata vektor,
+    # min/maks suhu); baris lama hanya snapshot, jadi dipakai sebagai gantinya.
+    # Nilai snapshot yang ditandai QC menjadi NULL dan dilewati per kolom
+    ws, wd, temp, hum, pres = (qc_value_sql(c) for c in ("wind_speed", "wind_direction", "temperature", "humidity", "pressure"))
+    cursor.execute(f"""
+        SELECT timestamp, COALESCE(wind_speed_avg, {ws}), COALESCE(wind_gust, {ws}),
+               COALESCE(wind_dir_avg, {wd}), {temp}, COALESCE(temp_min, {temp}),
+               COALESCE(temp_max, {temp}), {hum}, {pres}, rain_day, sample_count
+        FROM weather_data WHERE station_id = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp
+    """, (PRIMARY_STATION, day_start, day_end))
+
+    samples = temp_count = hum_count = 0
+    temp_min = temp_max = hum_min = hum_max = None
+    temp_sum = hum_sum = wind_sum = 0.0
+    wind_weight = 0
+    gust_max, gust_time = None, None
+    pressure_open = pressure_close = None
+    rain_total = 0.0
+    bins = [0] * 16
+
+    for ts, speed, gust, direction, temp, t_min, t_max, hum, pres, rain_day, count in cursor:
+        samples += 1
+        # Rerata dibobot jumlah sampel di jendela, bukan per baris: histori terkompresi punya jarak
+        # baris tidak rata. Baris lama tanpa statistik = 1, titik belok kompresi = 0
+        count = 1 if count is None else count
+        if t_min is not None and (temp_min is None or t_min < temp_min): temp_min = t_min
+        if t_max is not None and (temp_max is None or t_max > temp_max): temp_max = t_max
+        if temp is not None:
+            temp_sum += temp * count
+            temp_count += count
+        if hum is not None:
+            if hum_min is None or hum < hum_min: hum_min = hum
+            if hum_max is None or hum > hum_max: hum_max = hum
+            hum_sum += hum * count
+            hum_count += count
+        if speed is not None:
+            wind_sum += speed * count
+            wind_weight += count
+        if gust is not None and (gust_max is None or gust > gust_max):
+            gust_max, gust_time = gust, ts
+        if direction is not None:
+            bins[int(round(direction / 22.5)) % 16] += count
+        if pres is not None:
+            if pressure_open is None: pressure_open = pres
+            pressure_close = pres
+
+        # Counter rain_day di-reset sensor setiap hari: nilai turun = counter baru mulai dari 0
+        if rain_day is not None:
+            if prev_rain is not None:
+                rain_total += rain_day - prev_rain if rain_day >= prev_rain else rain_day
+            prev_rain = rain_day
+
+    # Hari yang sudah punya rollup per jam dari poller: pakai jumlah increment-nya
+    rollup = cursor.execute(
+        "SELECT COUNT(*), SUM(rain_mm) FROM rain_hourly WHERE station_id = ? AND hour BETWEEN ? AND ?",
+        (PRIMARY_STATION, day_start, day_end)
+    ).fetchone()
+    if rollup[0]:
+        rain_total = rollup[1] or 0.0
+
+    def r(value):
+        return round(value, 2) if value is not None else None
+
+    return {
+        "date": str(day),
+        "samples": samples,
+        "temp_min": r(temp_min),
+        "temp_max": r(temp_max),
+        "temp_avg": r(temp_sum / temp_count) if temp_count else None,
+        "hum_min": r(hum_min),
+        "hum_max": r(hum_max),
+        "hum_avg": r(hum_sum / hum_count) if hum_count else None,
+        "wind_avg": r(wind_sum / wind_weight) if wind_weight else None,
+        "gust_max": r(gust_max),
+        "gust_time": gust_time,
+        "prevailing_dir": WIND_SECTORS[bins.index(max(bins))] if any(bins) else None,
+        "rain_total": r(rain_total),
+        "pressure_open": r(pressure_open),
+        "pressure_close": r(pressure_close),
+        "pressure_tendency": r(pressure_close - pressure_open) if pressure_open is not None else None,
+        "computed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "temp_weight": temp_count,
+        "hum_weight": hum_count,
+    }
+
+def get_daily_stats(conn, start, end):
+    """Ambil statistik harian; hari yang sudah lewat dihitung sekali lalu disimpan di daily_stats"""
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute("SELECT * FROM daily_stats WHERE date BETWEEN ? AND ?", (str(start), str(end)))
+    cached = {row["date"]: dict(row) for row in cursor.fetchall()}
+
+    today = datetime.now().date()
+    days = []
+    day = start
+    while day <= end and day <= today:
+        stats = cached.get(str(day))
+        if stats is None or stats["temp_weight"] is None:
+            stats = compute_daily_stats(cursor, day)
+            # Hari ini masih berjalan, jadi tidak di-cache
+            if day < today:
+                columns = DAILY_STATS_COLUMNS + DAILY_WEIGHT_COLUMNS
+                cursor.execute(
+                    f"INSERT OR REPLACE INTO daily_stats ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    [stats[c] for c in columns]
+                )
+        if stats["samples"]:
+            days.append(stats)
+        day += timedelta(days=1)
+    conn.commit()
+    return days
+
+@app.get("/api/report")
+async def get_report(
+    request: Request,
+    response: Response,
+    date: Optional[str] = None,
+    range: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+):
+    """Statistik harian siap pakai untuk laporan PDF/Excel.
+
+    date=YYYY-MM-DD, range=YYYY-MM (satu bulan) atau range=YYYY-MM-DD,YYYY-MM-DD,
+    atau start_date & end_date seperti /api/logs.
+    """
+    try:
+        if date:
+            start = end = parse_date(date)
+        elif range and "," in range:
+            start_str, end_str = range.split(",", 1)
+            start, end = parse_date(start_str.strip()), parse_date(end_str.strip())
+        elif range:
+            start = parse_date(range + "-01")
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        elif start_date and end_date:
+            start, end = parse_date(start_date), parse_date(end_date)
+        else:
+            start = end = datetime.now().date()
+
+        if start > end:
+            raise HTTPException(status_code=400, detail="Tanggal awal melebihi tanggal akhir")
+
+        conn = sqlite3.connect(DB_PATH)
+        etag = history_etag(conn, request)
+        if not_modified(request, etag):
+            conn.close()
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        days = get_daily_stats(conn, start, end)
+        conn.close()
+        response.headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+
+        summary = None
+        if days:
+            # Hari yang seluruh nilainya ditandai QC punya statistik None, dilewati per kolom
+            def present(key):
+                return [d for d in days if d[key] is not None]
+
+            def weighted(key, weight_key):
+                # Bobot = jumlah sample_count hari itu (sama dengan compute_daily_stats), bukan jumlah baris:
+                # histori terkompresi menyimpan jauh lebih sedikit baris per sampel
+                valid = present(key)
+                weight = sum(d[weight_key] for d in valid)
+                return round(sum(d[key] * d[weight_key] for d in valid) / weight, 2) if weight else None
+
+            total_samples = sum(d["samples"] for d in days)
+            gust_day = max(present("gust_max"), key=lambda d: d["gust_max"], default={"gust_max": None, "gust_time": None})
+            summary = {
+                "days": len(days),
+                "samples": total_samples,
+                "temp_min": min((d["temp_min"] for d in present("temp_min")), default=None),
+                "temp_max": max((d["temp_max"] for d in present("temp_max")), default=None),
+                "temp_avg": weighted("temp_avg", "temp_weight"),
+                "hum_min": min((d["hum_min"] for d in present("hum_min")), default=None),
+                "hum_max": max((d["hum_max"] for d in present("hum_max")), default=None),
+                "hum_avg": weighted("hum_avg", "hum_weight"),
+                "gust_max": gust_day["gust_max"],
+                "gust_time": gust_day["gust_time"],
+                "rain_total": round(sum(d["rain_total"] for d in days), 2),
+            }
+
+        return {"start_date": str(start), "end_date": str(end), "days": days, "summary": summary}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+RAIN_BUCKETS = {"hour": 13, "day": 10, "month": 7}  # panjang prefix kolom hour (YYYY-MM-DD HH)
+
+@app.get("/api/rain")
+async def get_rain(
+    request: Request,
+    response: Response,
+    start_date: str,
+    end_date: str,
+    bucket: str = "day",
+    station_id: int = PRIMARY_STATION
+):
+    """Total hujan & intensitas per jam/hari/bulan dari rollup rain_hourly (O(jumlah jam), bukan O(baris histori))"""
+    if bucket not in RAIN_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket harus salah satu dari: {', '.join(RAIN_BUCKETS)}")
+    try:
+        start, end = parse_date(start_date), parse_date(end_date)
+        if start > end:
+            raise HTTPException(status_code=400, detail="Tanggal awal melebihi tanggal akhir")
+        conn = sqlite3.connect(DB_PATH)
+        etag = history_etag(conn, request)
+        if not_modified(request, etag):
+            conn.close()
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        rows = conn.execute(f"""
+            SELECT substr(hour, 1, {RAIN_BUCKETS[bucket]}), SUM(rain_mm), MAX(peak_intensity),
+                   COUNT(*), SUM(rain_mm > 0)
+            FROM rain_hourly WHERE station_id = ? AND hour BETWEEN ? AND ?
+            GROUP BY 1 ORDER BY 1
+        """, (station_id, f"{start} 00:00:00", f"{end} 23:59:59")).fetchall()
+        conn.close()
+        response.headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+
+        buckets = [{
+            "bucket": key, "rain_mm": round(total, 2), "peak_intensity": peak,
+            "hours": hours, "rain_hours": rain_hours,
+            # Intensitas rata-rata selama jam yang benar-benar hujan (mm/jam)
+            "mean_intensity": round(total / rain_hours, 2) if rain_hours else 0.0,
+        } for key, total, peak, hours, rain_hours in rows]
+        total = sum(b["rain_mm"] for b in buckets)
+        rain_hours = sum(b["rain_hours"] for b in buckets)
+        return {
+            "station_id": station_id, "start_date": str(start), "end_date": str(end), "bucket": bucket,
+            "buckets": buckets,
+            "summary": {
+                "rain_mm": round(total, 2),
+                "peak_intensity": max((b["peak_intensity"] for b in buckets), default=None),
+                "hours": sum(b["hours"] for b in buckets),
+                "rain_hours": rain_hours,
+                "mean_intensity": round(total / rain_hours, 2) if rain_hours else 0.0,
+            },
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/settings")
 async def get_settings():
     try:
@@ -296,42 +1019,208 @@ async def get_settings():
 
 @app.post("/api/settings")
 async def update_settings(settings: SystemSettings):
+    if settings.transport not in TRANSPORTS:
+        raise HTTPException(status_code=400, detail=f"Transport tidak dikenal: {settings.transport}")
+    if settings.profile_mode is not None and settings.profile_mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"profile_mode harus salah satu dari {', '.join(PROFILE_MODES)}")
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE system_settings 
             SET poll_interval = ?, save_interval = ?, com_port = ?, baudrate = ?, 
-                show_air_quality = ?, show_flow_meter = ?
+                show_air_quality = ?, show_flow_meter = ?,
+                transport = ?, host = ?, tcp_port = ?, slave_id = ?, pipeline_depth = ?,
+                profile_mode = COALESCE(?, profile_mode)
             WHERE id = 1
         """, (settings.poll_interval, settings.save_interval, settings.com_port, settings.baudrate,
-              1 if settings.show_air_quality else 0, 1 if settings.show_flow_meter else 0))
+              1 if settings.show_air_quality else 0, 1 if settings.show_flow_meter else 0,
+              settings.transport, settings.host or "", settings.tcp_port, settings.slave_id, settings.pipeline_depth,
+              settings.profile_mode))
         conn.commit()
         conn.close()
+        # Proses ini langsung; poller & worker lain menyusul dalam beberapa detik
+        if settings.profile_mode is not None:
+            profiler.configure(settings.profile_mode)
         return {"message": "Settings updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/export-excel")
-async def export_excel(start_date: Optional[str] = None, end_date: Optional[str] = None):
+@app.get("/api/stations")
+async def get_stations():
+    """Daftar stasiun (utama + tambahan) beserta status koneksi terakhir dari poller"""
     try:
         conn = sqlite3.connect(DB_PATH)
-        query = "SELECT timestamp, wind_speed, wind_direction, temperature, humidity, pressure, rain_total FROM weather_data"
-        params = []
-        
-        if start_date and end_date:
-            query += " WHERE timestamp BETWEEN ? AND ?"
-            params.extend([start_date + " 00:00:00", end_date + " 23:59:59"])
-        
-        query += " ORDER BY id DESC"
-        df = pd.read_sql_query(query, conn, params=params)
+        conn.row_factory = sqlite3.Row
+        primary = conn.execute(
+            "SELECT transport, com_port, baudrate, host, tcp_port, slave_id, pipeline_depth FROM system_settings WHERE id = 1"
+        ).fetchone()
+        stations = [dict(primary, id=PRIMARY_STATION, name="Stasiun Utama", enabled=1)]
+        stations += [dict(row) for row in conn.execute("SELECT * FROM stations WHERE id != ? ORDER BY id", (PRIMARY_STATION,))]
+        status = {row["id"]: dict(row) for row in conn.execute("SELECT * FROM system_status")}
+        conn.close()
+        for station in stations:
+            station["status"] = status.get(station["id"])
+        return stations
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/stations")
+async def save_station(station: Station):
+    """Tambah / ubah stasiun tambahan; poller memuat ulang daftar stasiun dalam beberapa detik"""
+    if station.id == PRIMARY_STATION:
+        raise HTTPException(status_code=400, detail="Stasiun utama diatur lewat /api/settings")
+    if station.transport not in TRANSPORTS:
+        raise HTTPException(status_code=400, detail=f"Transport tidak dikenal: {station.transport}")
+    serial_port = station.transport in ("serial", "esp32")  # esp32 = frame dari ESP32 lewat USB serial
+    if serial_port and not station.com_port:
+        raise HTTPException(status_code=400, detail=f"COM port wajib diisi untuk transport {station.transport}")
+    if not serial_port and not station.host:
+        raise HTTPException(status_code=400, detail="Host gateway wajib diisi untuk transport TCP")
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("""
+            INSERT OR REPLACE INTO stations
+                (id, name, transport, com_port, baudrate, host, tcp_port, slave_id, pipeline_depth, enabled)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (station.id, station.name, station.transport, station.com_port, station.baudrate, station.host,
+              station.tcp_port, station.slave_id, station.pipeline_depth, 1 if station.enabled else 0))
+        conn.commit()
+        conn.close()
+        return {"message": "Station saved successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/stations/{station_id}")
+async def delete_station(station_id: int):
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        deleted = conn.execute("DELETE FROM stations WHERE id = ?", (station_id,)).rowcount
+        conn.commit()
         conn.close()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Stasiun tidak ditemukan")
+    return {"message": "Station deleted"}
 
-        if df.empty:
-            raise HTTPException(status_code=404, detail="Tidak ada data untuk diexport")
+@app.get("/api/replication")
+async def get_replication():
+    """Pengaturan replikasi + posisi cursor dan jumlah baris yang belum terkirim"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        settings = dict(conn.execute("SELECT * FROM replication_settings WHERE id = 1").fetchone())
+        settings.pop("api_key", None)
+        targets = [dict(row) for row in conn.execute("SELECT * FROM replication_state ORDER BY target")]
+        for target in targets:
+            target["pending_rows"] = conn.execute(
+                "SELECT COUNT(*) FROM weather_data WHERE id > ?", (target["last_id"] or 0,)
+            ).fetchone()[0]
+        conn.close()
+        return {"settings": settings, "targets": targets}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Rename columns for better readability in Excel
-        df.columns = ['Waktu', 'Kec. Angin (m/s)', 'Arah Angin (°)', 'Suhu (°C)', 'Kelembaban (%)', 'Tekanan (hPa)', 'Curah Hujan (mm)']
+@app.post("/api/replication")
+async def update_replication(settings: ReplicationSettings):
+    """Simpan pengaturan replikasi; agent memuat ulang dalam ~30 detik"""
+    if settings.enabled and not (settings.endpoint_url or "").startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="URL server pusat harus diawali http:// atau https://")
+    if settings.batch_size <= 0 or settings.max_bytes_per_sec < 0:
+        raise HTTPException(status_code=400, detail="batch_size harus > 0 dan max_bytes_per_sec >= 0")
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("""
+            UPDATE replication_settings
+            SET enabled = ?, endpoint_url = ?, site_id = ?, batch_size = ?, max_bytes_per_sec = ?, backfill_days = ?
+            WHERE id = 1
+        """, (1 if settings.enabled else 0, settings.endpoint_url or "", settings.site_id or "",
+              settings.batch_size, settings.max_bytes_per_sec, settings.backfill_days))
+        # api_key kosong = tetap pakai key lama (GET tidak mengembalikan key)
+        if settings.api_key:
+            conn.execute("UPDATE replication_settings SET api_key = ? WHERE id = 1", (settings.api_key,))
+        conn.commit()
+        conn.close()
+        return {"message": "Replication settings updated"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/compression")
+async def get_compression():
+    """Mode kompresi histori per kolom + toleransi efektif (default = pecahan rentang sensor)"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        saved = {field: (mode, tolerance) for field, mode, tolerance in conn.execute(
+            "SELECT field, mode, tolerance FROM compression_settings"
+        )}
+        conn.close()
+        fields = []
+        for field in COMPRESS_FIELDS:
+            mode, tolerance = saved.get(field, ("off", None))
+            fields.append({
+                "field": field, "mode": mode, "tolerance": tolerance,
+                "default_tolerance": default_tolerance(field),
+            })
+        return {"fields": fields, "keyframe_interval": KEYFRAME_INTERVAL}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/compression")
+async def update_compression(fields: List[CompressionField]):
+    """Simpan mode kompresi per kolom; poller memuat ulang dalam beberapa detik dan mulai dari baris penuh"""
+    for item in fields:
+        error = validate_compression(item.field, item.mode, item.tolerance)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.executemany(
+            "INSERT OR REPLACE INTO compression_settings (field, mode, tolerance) VALUES (?, ?, ?)",
+            [(item.field, item.mode, item.tolerance) for item in fields]
+        )
+        conn.commit()
+        conn.close()
+        return {"message": "Compression settings updated"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/export-excel")
+async def export_excel(start_date: Optional[str] = None, end_date: Optional[str] = None, clean: bool = False):
+    """clean=true: sel yang ditandai QC dikosongkan. File xlsx rentang yang sudah tutup diambil dari result_cache"""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        if not (start_date and end_date):
+            start_date = end_date = None
+        data, store = cached_result(conn, ("excel", start_date, end_date, clean), end_date)
+        if data is None:
+            columns = ["timestamp", "wind_speed", "wind_direction", "temperature", "humidity", "pressure", "rain_total"]
+            if clean:
+                columns = [f"{qc_value_sql(c)} AS {c}" for c in columns]
+            query = f"SELECT {', '.join(columns)} FROM weather_data WHERE station_id = ?"
+            params = [PRIMARY_STATION]
+            
+            if start_date and end_date:
+                query += " AND timestamp BETWEEN ? AND ?"
+                params.extend([start_date + " 00:00:00", end_date + " 23:59:59"])
+            
+            query += " ORDER BY id DESC"
+            import pandas as pd  # berat (~0.3 s + openpyxl), hanya dimuat saat export pertama
+            df = pd.read_sql_query(query, conn, params=params)
+
+            if df.empty:
+                conn.close()
+                raise HTTPException(status_code=404, detail="Tidak ada data untuk diexport")
+
+            # Rename columns for better readability in Excel
+            df.columns = ['Waktu', 'Kec. Angin (m/s)', 'Arah Angin (°)', 'Suhu (°C)', 'Kelembaban (%)', 'Tekanan (hPa)', 'Curah Hujan (mm)']
+
+            output = io.BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                df.to_excel(writer, index=False, sheet_name='Data Cuaca')
+            data = output.getvalue()
+            store(data, len(data))
+        conn.close()
 
         filename = f"Laporan_Cuaca_{int(time.time())}.xlsx"
         
@@ -344,18 +1233,20 @@ async def export_excel(start_date: Optional[str] = None, end_date: Optional[str]
             if not os.path.exists(target_dir): os.makedirs(target_dir)
             
             full_path = os.path.join(target_dir, filename)
-            df.to_excel(full_path, index=False)
+            try:
+                with open(full_path, "wb") as f:
+                    f.write(data)
+            except OSError:
+                drive_watcher.mark_failed(usb_path)
+                raise
             return {"status": "saved_to_usb", "path": full_path, "drive": usb_path}
         
         # --- FALLBACK: DOWNLOAD VIA BROWSER ---
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Data Cuaca')
-        
-        output.seek(0)
         headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
-        return StreamingResponse(output, headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        return StreamingResponse(io.BytesIO(data), headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -372,16 +1263,377 @@ async def save_to_usb(file: UploadFile = File(...)):
             os.makedirs(target_dir)
             
         full_path = os.path.join(target_dir, file.filename)
-        with open(full_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        try:
+            with open(full_path, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+        except OSError:
+            drive_watcher.mark_failed(usb_path)
+            raise
             
         return {"status": "saved_to_usb", "path": full_path, "drive": usb_path}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Serve static files
-app.mount("/", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static"), html=True), name="static")
+@app.get("/api/drives")
+async def get_drives():
+    """Daftar Flashdisk yang terdeteksi beserta sisa kapasitas"""
+    return drive_watcher.snapshot()
+
+# ==============================
+# LAPORAN SISI SERVER (PDF / XLSX)
+# ==============================
+REPORT_DIR = os.path.join(os.path.dirname(__file__), "reports")
+REPORT_JOB_DIR = os.path.join(REPORT_DIR, "jobs")
+REPORT_JOB_HISTORY = 20
+REPORT_FOLDER = "Laporan_Insalusi"
+PDF_MAX_ROWS = 5000
+REPORT_COLUMNS = "timestamp, wind_speed, wind_direction, temperature, humidity, pressure, rain_total"
+REPORT_HEADERS = ['Waktu', 'Kec. Angin (m/s)', 'Arah Angin (°)', 'Suhu (°C)', 'Kelembaban (%)', 'Tekanan (hPa)', 'Curah Hujan (mm)']
+
+# Satu runner laporan untuk seluruh dashboard: laporan diproses berurutan agar tidak berebut CPU/disk
+# dengan API live. Proses tunggal menjalankan runner sendiri; di mode multi-worker runner ada di proses
+# induk dan worker hanya menulis job "queued" ke REPORT_JOB_DIR (antrian di disk)
+REPORT_POLL_INTERVAL = 1.0  # detik, runner memeriksa antrian di disk
+report_jobs = {}  # job yang sedang dijalankan runner di proses ini
+report_jobs_lock = threading.Lock()
+report_wakeup = threading.Event()
+report_stop = threading.Event()
+
+class ReportRequest(BaseModel):
+    format: str = "xlsx"
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+def job_path(job_id):
+    return os.path.join(REPORT_JOB_DIR, f"{job_id}.json")
+
+def save_job(job):
+    """Status job juga ditulis ke file (tmp + rename) agar bisa dibaca worker dashboard mana pun"""
+    os.makedirs(REPORT_JOB_DIR, exist_ok=True)
+    tmp_path = job_path(job["id"]) + ".part"
+    with open(tmp_path, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp_path, job_path(job["id"]))
+
+def load_job(job_id):
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(job_path(job_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def stored_jobs():
+    """Job tersimpan, terbaru dulu"""
+    try:
+        names = [n[:-5] for n in os.listdir(REPORT_JOB_DIR) if n.endswith(".json")]
+    except OSError:
+        return []
+    jobs = [job for job in map(load_job, names) if job]
+    return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+def fail_stale_jobs():
+    """Saat start: job yang masih queued/running milik proses sebelumnya tidak akan selesai lagi"""
+    for job in stored_jobs():
+        if job["status"] in ("queued", "running"):
+            job.update(status="error", error="Dashboard di-restart sebelum laporan selesai")
+            save_job(job)
+
+def update_job(job_id, **fields):
+    with report_jobs_lock:
+        report_jobs[job_id].update(fields)
+        save_job(report_jobs[job_id])
+
+def report_range_clause(start_date, end_date):
+    if start_date and end_date:
+        return " WHERE station_id = ? AND timestamp BETWEEN ? AND ?", [PRIMARY_STATION, start_date + " 00:00:00", end_date + " 23:59:59"]
+    return " WHERE station_id = ?", [PRIMARY_STATION]
+
+def write_report_xlsx(conn, path, start_date, end_date, job_id):
+    from openpyxl import Workbook
+
+    # write_only: baris langsung di-stream ke file, tidak ditampung di memori
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Data Cuaca")
+    ws.append(REPORT_HEADERS)
+    where, params = report_range_clause(start_date, end_date)
+    cursor = conn.execute(f"SELECT {REPORT_COLUMNS} FROM weather_data{where} ORDER BY id DESC", params)
+    count = 0
+    for row in cursor:
+        ws.append(list(row))
+        count += 1
+        if count % 5000 == 0:
+            update_job(job_id, rows=count)
+
+    if start_date and end_date:
+        days = get_daily_stats(conn, parse_date(start_date), parse_date(end_date))
+        ws_days = wb.create_sheet("Ringkasan Harian")
+        ws_days.append(DAILY_STATS_COLUMNS[:-1])
+        for day in days:
+            ws_days.append([day[c] for c in DAILY_STATS_COLUMNS[:-1]])
+
+    wb.save(path)
+    return count
+
+def cell(value, spec=""):
+    """Nilai sel PDF; NULL (NaN ESP32 / ditolak QC) ditulis "-" """
+    return "-" if value is None else format(value, spec)
+
+def write_report_pdf(conn, path, start_date, end_date, job_id):
+    from pdf_report import PDFReport
+
+    pdf = PDFReport(path)
+    try:
+        shown = write_pdf_content(pdf, conn, start_date, end_date)
+    except BaseException:
+        pdf.abort()  # file harus tertutup sebelum .part dihapus (Windows)
+        raise
+    pdf.close()
+    return shown
+
+def write_pdf_content(pdf, conn, start_date, end_date):
+    where, params = report_range_clause(start_date, end_date)
+    period = f"{start_date} s/d {end_date}" if start_date and end_date else "Semua data"
+
+    pdf.line(f"Dicetak pada: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    pdf.line(f"Periode Laporan: {period}")
+
+    # Ringkasan angin dihitung di SQL, bukan dari baris mentah di browser. Dibobot sample_count
+    # (histori terkompresi: jarak baris tidak rata; baris lama = 1)
+    cursor = conn.execute(
+        f"SELECT COUNT(*), SUM(wind_speed * COALESCE(sample_count, 1)) / "
+        f"SUM(CASE WHEN wind_speed IS NOT NULL THEN COALESCE(sample_count, 1) END), "
+        f"MAX(wind_speed) FROM weather_data{where}", params
+    )
+    total, avg_speed, max_speed = cursor.fetchone()
+    bins = [0] * 16
+    for direction, count in conn.execute(f"SELECT wind_direction, COALESCE(sample_count, 1) FROM weather_data{where}", params):
+        if direction is not None:
+            bins[int(round(direction / 22.5)) % 16] += count
+    weight = sum(bins)
+
+    pdf.heading("Ringkasan Analisis Angin")
+    pdf.table(
+        ["Arah Dominan", "Kecepatan Rerata", "Kecepatan Maksimum", "Total Sampel"],
+        [[
+            WIND_SECTORS[bins.index(max(bins))] if total else "-",
+            f"{avg_speed:.2f} m/s" if avg_speed is not None else "-",
+            f"{max_speed:.2f} m/s" if max_speed is not None else "-",
+            str(total)
+        ]]
+    )
+    pdf.table(WIND_SECTORS, [[f"{c / weight * 100:.1f}%" if weight else "-" for c in bins]])
+
+    if start_date and end_date:
+        days = get_daily_stats(conn, parse_date(start_date), parse_date(end_date))
+        pdf.heading("Statistik Harian")
+        pdf.table(
+            ["Tanggal", "Suhu Min", "Suhu Maks", "Suhu Rerata", "Lembab Rerata", "Gust (m/s)", "Waktu Gust", "Arah", "Hujan (mm)", "Tend. Tekanan"],
+            ([d["date"], cell(d["temp_min"]), cell(d["temp_max"]), cell(d["temp_avg"]), cell(d["hum_avg"]),
+              cell(d["gust_max"]), (d["gust_time"] or "")[11:], cell(d["prevailing_dir"]), cell(d["rain_total"]),
+              cell(d["pressure_tendency"])] for d in days)
+        )
+
+    shown = min(total, PDF_MAX_ROWS)
+    pdf.heading(f"Data Log ({shown} dari {total} baris terbaru)")
+    cursor = conn.execute(
+        f"SELECT {REPORT_COLUMNS} FROM weather_data{where} ORDER BY id DESC LIMIT ?", params + [PDF_MAX_ROWS]
+    )
+    pdf.table(
+        ['Waktu', 'Kec. Angin (m/s)', 'Arah (°)', 'Suhu (°C)', 'Lembab (%)', 'Tekan (hPa)', 'Hujan (mm)'],
+        ([ts, cell(ws, ".2f"), cell(wd, ".0f"), cell(t, ".1f"), cell(h, ".0f"), cell(p, ".1f"), cell(r, ".2f")]
+         for ts, ws, wd, t, h, p, r in cursor)
+    )
+    return shown
+
+def run_report_job(job):
+    job_id = job["id"]
+    with report_jobs_lock:
+        report_jobs[job_id] = job
+    update_job(job_id, status="running")
+    tmp_path = usb_path = None
+    try:
+        usb_path = get_usb_path()
+        target_dir = os.path.join(usb_path, REPORT_FOLDER) if usb_path else REPORT_DIR
+        os.makedirs(target_dir, exist_ok=True)
+
+        full_path = os.path.join(target_dir, job["filename"])
+        # Tulis ke file sementara lalu rename, agar file di flashdisk tidak setengah jadi
+        tmp_path = full_path + ".part"
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            writer = write_report_pdf if job["format"] == "pdf" else write_report_xlsx
+            rows = writer(conn, tmp_path, job["start_date"], job["end_date"], job_id)
+        finally:
+            conn.close()
+        os.replace(tmp_path, full_path)
+
+        update_job(
+            job_id, status="done", rows=rows, path=full_path,
+            saved_to="usb" if usb_path else "local", drive=usb_path,
+            finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+    except Exception as e:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass  # file sisa tidak boleh membuat job tertahan di status running
+        if usb_path and isinstance(e, OSError):
+            drive_watcher.mark_failed(usb_path)
+        update_job(job_id, status="error", error=str(e))
+    finally:
+        with report_jobs_lock:
+            report_jobs.pop(job_id, None)
+
+def run_report_jobs():
+    """Loop runner: job queued terlama dulu; bangun saat job dibuat di proses ini atau tiap REPORT_POLL_INTERVAL"""
+    while not report_stop.is_set():
+        queued = [job for job in stored_jobs() if job["status"] == "queued"]
+        for job in reversed(queued):
+            if report_stop.is_set():
+                return
+            run_report_job(job)
+        if not queued:
+            report_wakeup.wait(REPORT_POLL_INTERVAL)
+            report_wakeup.clear()
+
+def start_report_runner():
+    report_stop.clear()
+    threading.Thread(target=run_report_jobs, name="report-runner", daemon=True).start()
+
+@app.post("/api/reports")
+async def create_report(req: ReportRequest):
+    """Buat laporan di background; client hanya menerima job_id lalu polling status"""
+    if req.format not in ("pdf", "xlsx"):
+        raise HTTPException(status_code=400, detail="Format harus 'pdf' atau 'xlsx'")
+    if bool(req.start_date) != bool(req.end_date):
+        raise HTTPException(status_code=400, detail="start_date dan end_date harus diisi bersamaan")
+    if req.start_date:
+        parse_date(req.start_date)
+        parse_date(req.end_date)
+
+    job_id = uuid.uuid4().hex[:12]
+    job = {
+        "id": job_id,
+        "format": req.format,
+        "start_date": req.start_date,
+        "end_date": req.end_date,
+        "filename": f"Laporan_Cuaca_{int(time.time())}_{job_id[:4]}.{req.format}",
+        "status": "queued",
+        "rows": 0,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    save_job(job)
+    # Simpan histori job secukupnya
+    for old in stored_jobs()[REPORT_JOB_HISTORY:]:
+        if old["status"] in ("done", "error"):
+            # File laporan lokal (fallback tanpa flashdisk) ikut dihapus bersama job-nya
+            paths = [job_path(old["id"])]
+            if old.get("saved_to") == "local" and old.get("path"):
+                paths.append(old["path"])
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # sudah dihapus worker lain
+    report_wakeup.set()  # runner di proses ini langsung jalan; runner proses induk melihatnya di pemeriksaan berikutnya
+    return job
+
+REGISTRY.gauge(
+    "ws600_report_queue_depth", "Job laporan yang menunggu atau sedang diproses",
+    fn=lambda: sum(1 for j in stored_jobs() if j["status"] in ("queued", "running"))
+)
+REGISTRY.gauge("ws600_result_cache_bytes", "Ukuran hasil query histori di result_cache", fn=lambda: result_cache.bytes)
+REGISTRY.gauge("ws600_result_cache_hits", "Query histori yang dilayani dari result_cache sejak start", fn=lambda: result_cache.hits)
+REGISTRY.gauge("ws600_result_cache_misses", "Query histori yang dihitung dari database sejak start", fn=lambda: result_cache.misses)
+REGISTRY.gauge(
+    "ws600_recent_feed_samples", "Sampel live yang diterima ring buffer dari poller sejak start",
+    fn=lambda: recent_store.received
+)
+
+@app.get("/api/reports/{job_id}")
+async def get_report_job(job_id: str):
+    with report_jobs_lock:
+        job = report_jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+    # Job di antrian disk (runner proses lain / proses induk)
+    job = load_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job tidak ditemukan")
+    return job
+
+@app.get("/api/reports/{job_id}/file")
+async def download_report(job_id: str):
+    """Fallback jika flashdisk tidak ada: file disimpan di server dan diunduh langsung"""
+    job = report_jobs.get(job_id) or load_job(job_id)
+    if job is None or job["status"] != "done" or job.get("saved_to") != "local":
+        raise HTTPException(status_code=404, detail="File laporan tidak tersedia")
+    return FileResponse(job["path"], filename=job["filename"])
+
+@app.get("/api/debug/profile")
+async def get_profile(process: str = "dashboard", top: int = 20):
+    """Hot spot profiler (profile_mode di /api/settings). process=dashboard: jendela berjalan proses ini;
+    process=poller: file profil terakhir yang ditulis poller"""
+    if process not in ("dashboard", "poller"):
+        raise HTTPException(status_code=400, detail="process harus 'dashboard' atau 'poller'")
+    if top <= 0:
+        raise HTTPException(status_code=400, detail="top harus > 0")
+    try:
+        files = profile_files(PROFILE_DIR, process)
+        if process == "dashboard":
+            result = profiler.summary(top)
+        elif files:
+            result = load_profile(files[0], top)
+        else:
+            raise HTTPException(status_code=404, detail="Belum ada profil poller (profile_mode masih off?)")
+        result["files"] = [os.path.basename(f) for f in files]
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def metrics():
+    """Metrik Prometheus dashboard (metrik poller ada di exporter poller, port 9101)"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# Serve static files (gzip siap pakai, aset berversi di-cache immutable)
+static_files = CachedStaticFiles(directory=os.path.join(os.path.dirname(__file__), "static"), html=True)
+app.mount("/", static_files, name="static")
+mark_startup("imports")
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    parser = argparse.ArgumentParser(description="Dashboard WS-600")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Jumlah proses worker (default WS600_DASHBOARD_WORKERS atau 1)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+    else:
+        from ws600_livefeed import LiveFeedHub
+        # Sekali di proses induk: migrasi skema, satu penerima feed live dan satu runner laporan untuk
+        # semua worker; cache hasil bersama dimulai kosong (entri lama bisa dari DB lain)
+        init_db()
+        fail_stale_jobs()
+        DiskResultCache(RESULT_CACHE_DIR).clear()
+        hub = LiveFeedHub()
+        hub.start()
+        drive_watcher.start()
+        start_report_runner()
+        os.environ["WS600_DASHBOARD_WORKER"] = "1"
+        os.environ["WS600_DASHBOARD_WORKERS"] = str(args.workers)
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
+        report_stop.set()
+        drive_watcher.stop()
+        hub.stop()
@@ -0,0 +1,134 @@
+"""Penulis PDF minimal (tanpa dependency) untuk laporan cuaca di sisi server.
+
+Hanya mendukung yang dibutuhkan laporan: teks Helvetica, kotak berwarna dan
+tabel yang otomatis pindah halaman. Halaman ditulis langsung ke file begitu
+selesai, jadi memori tetap kecil walaupun tabelnya ribuan baris.
+"""
+import zlib
+
+PAGE_WIDTH = 842   # A4 landscape (pt)
+PAGE_HEIGHT = 595
+MARGIN = 40
+HEADER_COLOR = (37, 99, 235)
+
+
+def _escape(text):
+    raw = str(text).encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _rgb(color):
+    return " ".join(f"{c / 255:.3f}" for c in color).encode()
+
+
+class PDFReport:
+    def __init__(self, path, title="INSALUSI WEATHER STATION REPORT"):
+        self.title = title
+        self.file = open(path, "wb")
+        self.offsets = {}
+        self.page_ids = []
+        # 1 = Catalog, 2 = Pages, 3 = Helvetica, 4 = Helvetica-Bold
+        self.next_id = 5
+        self.content = []
+        self.cursor_y = 0
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        self._write_object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        self.add_page()
+
+    def _write_object(self, obj_id, body):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _flush_page(self):
+        stream = zlib.compress(b"\n".join(self.content))
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._write_object(
+            content_id,
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+        self._write_object(
+            page_id,
+            (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+             f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>").encode()
+        )
+        self.page_ids.append(page_id)
+        self.content = []
+
+    def add_page(self):
+        if self.content:
+            self._flush_page()
+        self.rect(0, 0, PAGE_WIDTH, 60, HEADER_COLOR)
+        self.text(MARGIN, 24, self.title, size=20, bold=True, color=(255, 255, 255))
+        self.cursor_y = 80
+
+    def rect(self, x, y, w, h, color):
+        # Koordinat dari atas halaman (seperti jsPDF), dikonversi ke koordinat PDF
+        self.content.append(_rgb(color) + f" rg {x} {PAGE_HEIGHT - y - h} {w} {h} re f".encode())
+
+    def text(self, x, y, value, size=10, bold=False, color=(0, 0, 0)):
+        font = b"/F2" if bold else b"/F1"
+        self.content.append(
+            b"BT " + _rgb(color) + b" rg " + font + f" {size} Tf {x} {PAGE_HEIGHT - y - size} Td (".encode()
+            + _escape(value) + b") Tj ET"
+        )
+
+    def heading(self, value):
+        if self.cursor_y > PAGE_HEIGHT - MARGIN - 60:
+            self.add_page()
+        self.text(MARGIN, self.cursor_y, value, size=14, bold=True, color=HEADER_COLOR)
+        self.cursor_y += 24
+
+    def line(self, value, size=10, color=(60, 60, 60)):
+        if self.cursor_y > PAGE_HEIGHT - MARGIN - size:
+            self.add_page()
+        self.text(MARGIN, self.cursor_y, value, size=size, color=color)
+        self.cursor_y += size + 6
+
+    def table(self, headers, rows, widths=None, size=8):
+        """Tulis tabel; rows boleh berupa generator supaya tidak perlu ditampung di memori"""
+        widths = widths or [(PAGE_WIDTH - 2 * MARGIN) / len(headers)] * len(headers)
+        row_h = size + 6
+
+        def draw_header():
+            self.rect(MARGIN, self.cursor_y, sum(widths), row_h, HEADER_COLOR)
+            x = MARGIN
+            for header, w in zip(headers, widths):
+                self.text(x + 3, self.cursor_y + 3, header, size=size, bold=True, color=(255, 255, 255))
+                x += w
+            self.cursor_y += row_h
+
+        draw_header()
+        for i, row in enumerate(rows):
+            if self.cursor_y + row_h > PAGE_HEIGHT - MARGIN:
+                self.add_page()
+                draw_header()
+            if i % 2:
+                self.rect(MARGIN, self.cursor_y, sum(widths), row_h, (241, 245, 249))
+            x = MARGIN
+            for value, w in zip(row, widths):
+                self.text(x + 3, self.cursor_y + 3, value, size=size)
+                x += w
+            self.cursor_y += row_h
+        self.cursor_y += 12
+
+    def abort(self):
+        """Tutup file tanpa menulis trailer (laporan gagal, file sementara akan dihapus)"""
+        self.file.close()
+
+    def close(self):
+        self._flush_page()
+        kids = " ".join(f"{pid} 0 R" for pid in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_pos = self.file.tell()
+        count = self.next_id
+        self.file.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, count):
+            self.file.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode())
+        self.file.write(
+            f"trailer\n<< /Size {count} /Root 1 0 R >>\n"
+            f"startxref\n{xref_pos}\n%%EOF\n".encode()
+        )
+        self.file.close()
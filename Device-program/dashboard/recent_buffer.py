@@ -0,0 +1,179 @@
+"""Ring buffer memori untuk data live beberapa jam terakhir.
+
+Diisi dari feed UDP poller (ws600_livefeed.py) oleh satu thread, dibaca oleh
+/api/recent tanpa query database. Di mode multi-worker setiap worker
+berlangganan ke LiveFeedHub proses induk (subscribe=True) alih-alih bind port feed. Setiap stasiun punya array berukuran tetap
+(timestamp double + satu array float32 per field) yang dialokasikan sekali,
+jadi memori konstan: RECENT_CAPACITY x 36 byte per stasiun (~390 KB).
+Sampel dan status terakhir per stasiun dari feed juga disimpan (latest()/status()),
+untuk /api/latest dan /api/status di worker tanpa query weather_live/system_status.
+"""
+import math
+import socket
+import sqlite3
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from ws600_livefeed import (
+    LIVE_FEED_HOST, LIVE_FEED_PORT, LIVE_FIELDS, SUBSCRIBE, SUBSCRIBE_INTERVAL,
+    decode, decode_status, ignore_connreset, is_status, receive_error,
+)
+
+RECENT_CAPACITY = 10800  # 3 jam pada polling 1 detik, 6 jam pada 2 detik
+BACKFILL_HOURS = 6       # saat start, isi dari weather_data agar grafik tidak kosong
+
+
+class RingBuffer:
+    def __init__(self, capacity=RECENT_CAPACITY, fields=LIVE_FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self.times = array("d", bytes(8 * capacity))
+        self.columns = [array("f", bytes(4 * capacity)) for _ in fields]
+        self.start = 0  # posisi sampel tertua
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def append(self, ts, values):
+        with self._lock:
+            if self.size and ts <= self.times[(self.start + self.size - 1) % self.capacity]:
+                return  # datagram terlambat / duplikat: urutan waktu harus naik untuk binary search
+            if self.size < self.capacity:
+                idx = (self.start + self.size) % self.capacity
+                self.size += 1
+            else:
+                idx = self.start
+                self.start = (self.start + 1) % self.capacity
+            self.times[idx] = ts
+            for column, value in zip(self.columns, values):
+                column[idx] = math.nan if value is None else value
+
+    def since(self, t0, fields=None, max_points=None):
+        """Sampel dengan timestamp >= t0 dalam format kolom; max_points menipiskan data dengan stride"""
+        selected = [(f, c) for f, c in zip(self.fields, self.columns) if not fields or f in fields]
+        with self._lock:
+            cap, start = self.capacity, self.start
+            lo, hi = 0, self.size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.times[(start + mid) % cap] < t0:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            count = self.size - lo
+            stride = math.ceil(count / max_points) if max_points and count > max_points else 1
+            positions = [(start + i) % cap for i in range(lo, self.size, stride)]
+            result = {"timestamp": [self.times[i] for i in positions]}
+            for field, column in selected:
+                # float32 -> 3 desimal; NaN (channel tidak ada) -> null agar JSON valid
+                result[field] = [None if math.isnan(column[i]) else round(column[i], 3) for i in positions]
+        return result
+
+
+class RecentStore:
+    def __init__(self, db_path, host=LIVE_FEED_HOST, port=LIVE_FEED_PORT, capacity=RECENT_CAPACITY, subscribe=False):
+        self.db_path = db_path
+        self.address = (host, port)
+        self.capacity = capacity
+        self.subscribe = subscribe
+        self.buffers = {}  # station_id -> RingBuffer
+        self.live = {}     # station_id -> (ts, values) sampel terakhir dari feed (bukan backfill)
+        self.statuses = {}  # station_id -> (waktu perubahan, port_ok, sensor_ok, circuit_state)
+        self.received = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def buffer(self, station_id, create=False):
+        with self._lock:
+            buf = self.buffers.get(station_id)
+            if buf is None and create:
+                buf = self.buffers[station_id] = RingBuffer(self.capacity)
+            return buf
+
+    def add(self, station_id, ts, values):
+        self.buffer(station_id, create=True).append(ts, values)
+
+    def latest(self, station_id):
+        """(ts, values) sampel live terakhir dari feed, atau None jika belum ada"""
+        return self.live.get(station_id)
+
+    def status(self, station_id):
+        """(waktu perubahan, port_ok, sensor_ok, circuit_state) terakhir dari feed, atau None"""
+        return self.statuses.get(station_id)
+
+    def backfill(self, hours=BACKFILL_HOURS):
+        """Isi awal dari histori (resolusi DB_SAVE_INTERVAL) agar grafik tidak kosong setelah restart"""
+        since = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(
+                f"SELECT station_id, timestamp, {', '.join(LIVE_FIELDS)} FROM weather_data "
+                "WHERE timestamp >= ? ORDER BY timestamp", (since,)
+            )
+            for station_id, ts, *values in cursor:
+                try:
+                    epoch = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").timestamp()
+                except (TypeError, ValueError):
+                    continue
+                self.add(station_id, epoch, values)
+        finally:
+            conn.close()
+
+    def _subscribe(self, sock):
+        try:
+            sock.sendto(SUBSCRIBE, self.address)
+        except OSError:
+            pass  # hub belum siap, dicoba lagi di interval berikutnya
+        return time.monotonic()
+
+    def _run(self, sock):
+        subscribed = self._subscribe(sock) if self.subscribe else 0.0
+        try:
+            self.backfill()
+        except Exception as e:
+            print(f"Gagal backfill recent buffer: {e}")
+        while not self._stop.is_set():
+            if self.subscribe and time.monotonic() - subscribed >= SUBSCRIBE_INTERVAL:
+                subscribed = self._subscribe(sock)
+            try:
+                datagram = sock.recv(2048)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                # Windows: SUBSCRIBE ke hub yang belum bind/mati -> ConnectionResetError, socket tetap dipakai
+                if receive_error(e, self._stop):
+                    break
+                continue
+            if is_status(datagram):
+                for station_id, *status in decode_status(datagram):
+                    self.statuses[station_id] = tuple(status)
+                continue
+            for station_id, ts, values in decode(datagram):
+                self.add(station_id, ts, values)
+                latest = self.live.get(station_id)
+                if latest is None or ts >= latest[0]:
+                    self.live[station_id] = (ts, values)
+                self.received += 1
+        sock.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            # Worker: port acak, alamatnya didaftarkan ke hub lewat SUBSCRIBE
+            sock.bind((self.address[0], 0) if self.subscribe else self.address)
+        except OSError as e:
+            print(f"Feed live tidak aktif (port {self.address[1]}): {e}")
+            sock.close()
+            return
+        ignore_connreset(sock)
+        # Socket dibuka sebelum backfill, datagram yang datang selama backfill antre di kernel
+        sock.settimeout(1.0)
+        self._thread = threading.Thread(target=self._run, args=(sock,), name="recent-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
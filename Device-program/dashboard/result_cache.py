@@ -0,0 +1,175 @@
+"""Cache hasil query histori (/api/logs, /api/export-excel) di memori.
+
+Kunci = query yang sudah dinormalisasi (rentang, kolom, resolusi, format). Rentang yang
+sudah tutup (berakhir sebelum hari ini) tidak berubah lagi, jadi hasilnya dipakai terus
+sampai histori ditulis ulang (QC dicek ulang / baris lama dihapus = generation berubah).
+Rentang yang menyentuh ekor yang masih terbuka (hari ini, atau tanpa rentang) hanya
+berlaku sampai baris weather_data baru masuk. Dibatasi total byte, entri terlama
+(LRU) dibuang lebih dulu.
+
+ResultCache ada di memori satu proses. Dashboard multi-worker memakai DiskResultCache:
+aturan sama, tapi satu file per entri di folder bersama, jadi semua worker berbagi satu
+cache (dan satu budget byte) dan hasil yang dihitung satu worker dipakai worker lain.
+"""
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+MAX_ENTRY_FRACTION = 0.25  # satu hasil maksimal 1/4 kapasitas, agar export besar tidak menyapu semua entri
+CLOSE_GRACE = 300          # detik setelah tengah malam sebelum hari kemarin dianggap tutup (baris telat poller)
+
+
+def range_closed(end_date, now=None):
+    """True jika rentang yang berakhir di end_date (YYYY-MM-DD) tidak akan mendapat baris baru lagi"""
+    if not end_date:
+        return False
+    try:
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return (now or datetime.now()) >= end + timedelta(days=1, seconds=CLOSE_GRACE)
+
+
+class ResultCache:
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (generation, tail, value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, generation, tail=None):
+        """tail = penanda ekor saat ini (mis. MAX(id)); hanya dicocokkan untuk entri rentang terbuka"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, entry_tail, value, size = entry
+                if entry_generation == generation and (entry_tail is None or entry_tail == tail):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size, generation, tail=None):
+        """tail=None = rentang tutup, berlaku sampai generation berubah"""
+        if size > self.max_bytes * MAX_ENTRY_FRACTION:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, tail, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _drop(self, key):
+        self.bytes -= self._entries.pop(key)[3]
+
+
+class DiskResultCache:
+    """ResultCache bersama antar proses: entri = file pickle (generation, tail, value) di directory.
+
+    LRU memakai mtime file (disentuh saat hit). Tulis lewat tmp + rename; file yang sedang
+    dibaca/ditulis proses lain (Windows) cukup dianggap miss atau tidak disimpan.
+    """
+
+    def __init__(self, directory, max_bytes=RESULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0    # per proses
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".bin")
+
+    def _files(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        files = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # baru dihapus proses lain
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    @property
+    def bytes(self):
+        return sum(size for _, size, path in self._files() if path.endswith(".bin"))
+
+    def __len__(self):
+        return sum(1 for _, _, path in self._files() if path.endswith(".bin"))
+
+    def get(self, key, generation, tail=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry_generation, entry_tail, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            self.misses += 1
+            return None
+        if entry_generation == generation and (entry_tail is None or entry_tail == tail):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return value
+        self._remove(path)
+        self.misses += 1
+        return None
+
+    def put(self, key, value, size, generation, tail=None):
+        if size > self.max_bytes * MAX_ENTRY_FRACTION:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.part"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump((generation, tail, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+        self._trim()
+
+    def _trim(self):
+        files = sorted(f for f in self._files() if f[2].endswith(".bin"))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._files():
+            if path.endswith((".bin", ".part")):
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # sudah dihapus proses lain / masih dibuka (Windows)
@@ -101,211 +101,61 @@ async function fetchLogs() {
 }
 
 async function exportToExcel() {
-    try {
-        console.log("Exporting to Excel (Server Side)...");
-        const startDate = document.getElementById('start-date').value;
-        const endDate = document.getElementById('end-date').value;
-
-        let url = `/api/export-excel?limit=5000`;
-        if (startDate && endDate) {
-            url += `&start_date=${startDate}&end_date=${endDate}`;
-        }
-
-        const response = await fetch(url);
-
-        // Cek apakah server mengirim JSON (USB saved) atau Blob (Download)
-        const contentType = response.headers.get("content-type");
-        if (contentType && contentType.indexOf("application/json") !== -1) {
-            const result = await response.json();
-            if (result.status === "saved_to_usb") {
-                alert(`✅ BERHASIL!\nLaporan telah disimpan langsung ke Flashdisk.\n\nFolder: ${result.path}`);
-            } else {
-                alert("Gagal simpan ke USB: " + (result.detail || "Error tidak diketahui"));
-            }
-        } else if (response.ok) {
-            // Flashdisk tidak ada, download via browser
-            const blob = await response.blob();
-            const urlBlob = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = urlBlob;
-            a.download = `Laporan_Cuaca_${new Date().getTime()}.xlsx`;
-            document.body.appendChild(a);
-            a.click();
-            a.remove();
-            alert("⚠️ Flashdisk tidak ditemukan.\nLaporan telah di-download ke folder Downloads PC ini.");
-        } else {
-            const err = await response.json();
-            alert("Gagal Export: " + (err.detail || "Server Error"));
-        }
-    } catch (err) {
-        console.error("Excel Export Error:", err);
-        alert("Gagal Export Excel: " + err.message);
-    }
+    await runServerReport('xlsx');
 }
 
 async function exportToPDF() {
-    try {
-        console.log("Exporting to PDF...");
-        if (!currentLogs || currentLogs.length === 0) {
-            alert("Belum ada data untuk di-export. Klik tombol 'Tampilkan' dulu.");
-            return;
-        }
-
-        const { jsPDF } = window.jspdf;
-        if (!jsPDF) {
-            alert("Eror: Library PDF belum siap.");
-            return;
-        }
-
-        const doc = new jsPDF('l', 'mm', 'a4');
-        const fileName = `Laporan_Cuaca_${new Date().getTime()}.pdf`;
-
-        // Style PDF Header
-        doc.setFillColor(37, 99, 235);
-        doc.rect(0, 0, 297, 25, 'F');
-        doc.setTextColor(255, 255, 255);
-        doc.setFontSize(22);
-
-        // Add Logo if exists
-        const logo = document.getElementById('app-logo');
-        if (logo) {
-            try {
-                // Posisi: x=10, y=5, ukuran: 15x15 mm
-                doc.addImage(logo, 'PNG', 10, 5, 15, 15);
-                doc.text("INSALUSI WEATHER STATION REPORT", 30, 17);
-            } catch (e) {
-                console.error("Gagal menambahkan logo ke PDF:", e);
-                doc.text("INSALUSI WEATHER STATION REPORT", 14, 17);
-            }
-        } else {
-            doc.text("INSALUSI WEATHER STATION REPORT", 14, 17);
-        }
+    await runServerReport('pdf');
+}
 
-        doc.setTextColor(100, 100, 100);
-        doc.setFontSize(10);
-        doc.text(`Dicetak pada: ${new Date().toLocaleString()}`, 14, 32);
+// Laporan dibuat di server (background job) lalu ditulis langsung ke Flashdisk.
+// Browser hanya polling status, tidak perlu menampung/mengunggah file.
+async function runServerReport(format) {
+    const label = format === 'pdf' ? 'PDF' : 'Excel';
+    try {
+        console.log(`Exporting to ${label} (Server Side)...`);
+        const startDate = document.getElementById('start-date').value;
+        const endDate = document.getElementById('end-date').value;
 
-        // Add Chart Image
-        const chartCanvas = document.getElementById('trendChart');
-        if (chartCanvas) {
-            const chartImg = chartCanvas.toDataURL("image/png");
-            doc.addImage(chartImg, 'PNG', 14, 40, 269, 70);
+        const body = { format: format };
+        if (startDate && endDate) {
+            body.start_date = startDate;
+            body.end_date = endDate;
         }
 
-        // Add Content Table
-        const tableData = currentLogs.map(row => [
-            row.timestamp,
-            row.wind_speed.toFixed(2),
-            row.wind_direction.toFixed(0),
-            row.temperature.toFixed(1),
-            row.humidity.toFixed(0),
-            row.pressure.toFixed(1),
-            row.rain_total.toFixed(2)
-        ]);
-
-        doc.autoTable({
-            startY: 120,
-            head: [['Waktu', 'Kec. Angin (m/s)', 'Arah (°)', 'Suhu (°C)', 'Lembab (%)', 'Tekan (hPa)', 'Hujan (mm)']],
-            body: tableData,
-            theme: 'striped',
-            headStyles: { fillColor: [37, 99, 235], textColor: [255, 255, 255] },
-            styles: { fontSize: 9 }
+        const response = await fetch('/api/reports', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
         });
-
-        // --- HALAMAN 2: WIND ROSE ANALYSIS ---
-        doc.addPage('l', 'mm', 'a4');
-
-        // Header Halaman 2
-        doc.setFillColor(37, 99, 235);
-        doc.rect(0, 0, 297, 25, 'F');
-        doc.setTextColor(255, 255, 255);
-        doc.setFontSize(22);
-        if (logo) {
-            doc.addImage(logo, 'PNG', 10, 5, 15, 15);
-            doc.text("INSALUSI WEATHER STATION REPORT", 30, 17);
-        } else {
-            doc.text("INSALUSI WEATHER STATION REPORT", 14, 17);
+        let job = await response.json();
+        if (!response.ok) {
+            alert(`Gagal Export ${label}: ` + (job.detail || "Server Error"));
+            return;
         }
 
-        doc.setTextColor(37, 99, 235);
-        doc.setFontSize(18);
-        doc.text("Analisis Mawar Angin (Wind Rose)", 14, 40);
-
-        doc.setDrawColor(200, 200, 200);
-        doc.line(14, 45, 283, 45);
-
-        // Tambahkan Grafik Wind Rose
-        const roseCanvas = document.getElementById('windRoseChart');
-        if (roseCanvas) {
-            const roseImg = roseCanvas.toDataURL("image/png");
-            doc.addImage(roseImg, 'PNG', 14, 55, 130, 130);
+        while (job.status === 'queued' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            job = await (await fetch(`/api/reports/${job.id}`)).json();
         }
 
-        // Hitung statistik secara mandiri (agar tidak kosong jika tab wind rose belum dibuka)
-        const roseBins = new Array(16).fill(0);
-        const roseLabels = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW'];
-        let totalSpd = 0; let maxSpd = 0;
-
-        currentLogs.forEach(row => {
-            const idx = Math.round(row.wind_direction / 22.5) % 16;
-            roseBins[idx]++;
-            totalSpd += row.wind_speed;
-            if (row.wind_speed > maxSpd) maxSpd = row.wind_speed;
-        });
-
-        const domIdx = roseBins.indexOf(Math.max(...roseBins));
-        const avgSpd = totalSpd / currentLogs.length;
-
-        // Tambahkan Ringkasan Analisis di Sisi Kanan
-        doc.setTextColor(50, 50, 50);
-        doc.setFontSize(14);
-        doc.text("Ringkasan Analisis Statistik", 160, 65);
-
-        doc.setFontSize(11);
-        const statsX = 160;
-        let statsY = 80;
-        const spacing = 12;
-
-        const summaryData = [
-            ["Arah Dominan", roseLabels[domIdx]],
-            ["Kecepatan Rerata", avgSpd.toFixed(2) + " m/s"],
-            ["Kecepatan Maksimum", maxSpd.toFixed(2) + " m/s"],
-            ["Total Sampel", currentLogs.length.toString()],
-            ["Periode Laporan", document.getElementById('start-date').value + " s/d " + document.getElementById('end-date').value]
-        ];
-
-        summaryData.forEach(([label, value]) => {
-            doc.setTextColor(100, 100, 100);
-            doc.text(label + ":", statsX, statsY);
-            doc.setTextColor(0, 0, 0);
-            doc.setFont("helvetica", "bold");
-            doc.text(value, statsX + 50, statsY);
-            doc.setFont("helvetica", "normal");
-            statsY += spacing;
-        });
-
-        // --- TRY TO SAVE TO USB VIA SERVER ---
-        const pdfBlob = doc.output('blob');
-        const formData = new FormData();
-        formData.append('file', pdfBlob, fileName);
-
-        const usbResponse = await fetch('/api/save-usb', {
-            method: 'POST',
-            body: formData
-        });
-
-        const result = await usbResponse.json();
-        if (result.status === "saved_to_usb") {
-            alert(`✅ BERHASIL!\nPDF telah disimpan langsung ke Flashdisk.\n\nFolder: ${result.path}`);
+        if (job.status === 'error') {
+            alert(`Gagal Export ${label}: ` + (job.error || "Error tidak diketahui"));
+        } else if (job.saved_to === 'usb') {
+            alert(`✅ BERHASIL!\nLaporan ${label} telah disimpan langsung ke Flashdisk.\n\nFolder: ${job.path}`);
         } else {
-            // Fallback: Simpan via browser
-            doc.save(fileName);
-            alert("⚠️ Flashdisk tidak ditemukan.\nLaporan PDF telah di-download ke folder Downloads PC.");
+            // Flashdisk tidak ada, download langsung dari server
+            const a = document.createElement('a');
+            a.href = `/api/reports/${job.id}/file`;
+            a.download = job.filename;
+            document.body.appendChild(a);
+            a.click();
+            a.remove();
+            alert(`⚠️ Flashdisk tidak ditemukan.\nLaporan ${label} telah di-download ke folder Downloads PC ini.`);
         }
-
     } catch (err) {
-        console.error("PDF Export Error:", err);
-        alert("Gagal Export PDF: " + err.message);
+        console.error(`${label} Export Error:`, err);
+        alert(`Gagal Export ${label}: ` + err.message);
     }
 }
 
@@ -347,15 +197,33 @@ function initChart() {
     });
 }
 
-function updateChart() {
+async function fetchRecent(param) {
+    // Tanpa filter tanggal: grafik 30 menit terakhir dari ring buffer (resolusi polling)
+    try {
+        const response = await fetch(`/api/recent?seconds=1800&max_points=300&fields=${param}`);
+        const recent = await response.json();
+        if (!recent.timestamp || recent.timestamp.length < 2) return null;
+        return {
+            labels: recent.timestamp.map(ts => new Date(ts * 1000).toTimeString().slice(0, 8)),
+            data: recent[param]
+        };
+    } catch (err) {
+        console.error("Error fetching recent data:", err);
+        return null;
+    }
+}
+
+async function updateChart() {
     if (!trendChart) initChart();
 
     const paramSelector = document.getElementById('param-selector');
     if (!paramSelector) return;
 
     const param = paramSelector.value;
-    const labels = currentLogs.map(row => row.timestamp.split(' ')[1]).reverse();
-    const data = currentLogs.map(row => row[param]).reverse();
+    const hasRange = document.getElementById('start-date').value && document.getElementById('end-date').value;
+    const recent = hasRange ? null : await fetchRecent(param);
+    const labels = recent ? recent.labels : currentLogs.map(row => row.timestamp.split(' ')[1]).reverse();
+    const data = recent ? recent.data : currentLogs.map(row => row[param]).reverse();
 
     trendChart.data.labels = labels;
     trendChart.data.datasets[0].data = data;
@@ -459,7 +327,8 @@ function toggleRoseCustomDates() {
 async function fetchWindRoseData() {
     try {
         const period = document.getElementById('rose-period').value;
-        let url = '/api/logs?limit=5000'; // Ambil lebih banyak data untuk statistik
+        // Ambil lebih banyak data untuk statistik; format kolom, hanya field angin
+        let url = '/api/logs?limit=5000&format=columns&fields=wind_speed,wind_direction&clean=true';
 
         if (period === 'today') {
             const today = new Date().toISOString().split('T')[0];
@@ -488,8 +357,10 @@ async function fetchWindRoseData() {
     }
 }
 
-function processWindRose(data) {
-    if (!data || data.length === 0) {
+function processWindRose(result) {
+    const speeds = result.data.wind_speed;
+    const directions = result.data.wind_direction;
+    if (!result.rows) {
         alert("Tidak ada data untuk periode ini.");
         return;
     }
@@ -501,17 +372,21 @@ function processWindRose(data) {
 
     let totalSpeed = 0;
     let maxSpeed = 0;
-
-    data.forEach(row => {
-        const angle = row.wind_direction;
-        const index = Math.round(angle / 22.5) % 16;
+    let count = 0;
+
+    for (let i = 0; i < result.rows; i++) {
+        const speed = speeds[i];
+        // clean=true: nilai yang ditandai QC bernilai null
+        if (speed === null || directions[i] === null) continue;
+        count++;
+        const index = Math.round(directions[i] / 22.5) % 16;
         bins[index]++;
-        binSpeeds[index] += row.wind_speed;
-        totalSpeed += row.wind_speed;
-        if (row.wind_speed > maxSpeed) maxSpeed = row.wind_speed;
-    });
+        binSpeeds[index] += speed;
+        totalSpeed += speed;
+        if (speed > maxSpeed) maxSpeed = speed;
+    }
 
-    const percentages = bins.map(count => (count / data.length * 100).toFixed(1));
+    const percentages = bins.map(n => (count ? n / count * 100 : 0).toFixed(1));
 
     // Tentukan warna berdasarkan rata-rata kecepatan di arah tersebut
     const bgColors = bins.map((count, i) => {
@@ -525,9 +400,9 @@ function processWindRose(data) {
     // Update Stats UI
     const maxFreqIndex = bins.indexOf(Math.max(...bins));
     document.getElementById('dominant-dir').innerText = labels[maxFreqIndex];
-    document.getElementById('avg-speed').innerText = (totalSpeed / data.length).toFixed(2) + " m/s";
+    document.getElementById('avg-speed').innerText = (count ? totalSpeed / count : 0).toFixed(2) + " m/s";
     document.getElementById('max-speed').innerText = maxSpeed.toFixed(2) + " m/s";
-    document.getElementById('rose-count').innerText = data.length;
+    document.getElementById('rose-count').innerText = count;
 
     renderWindRoseChart(labels, percentages, bgColors);
 }
@@ -729,6 +604,12 @@ async function loadSettings() {
         document.getElementById('set-save').value = settings.save_interval;
         document.getElementById('set-port').value = settings.com_port;
         document.getElementById('set-baud').value = settings.baudrate;
+        document.getElementById('set-transport').value = settings.transport || 'serial';
+        document.getElementById('set-slave').value = settings.slave_id ?? 1;
+        document.getElementById('set-host').value = settings.host || '';
+        document.getElementById('set-tcp-port').value = settings.tcp_port || 502;
+        document.getElementById('set-pipeline').value = settings.pipeline_depth || 1;
+        toggleTransportFields();
 
         // Visibility Settings
         const showAQ = document.getElementById('set-show-aq');
@@ -742,6 +623,20 @@ async function loadSettings() {
     }
 }
 
+function toggleTransportFields() {
+    const transport = document.getElementById('set-transport').value;
+    // esp32 juga lewat COM port (USB), hanya protokolnya frame ESP32, bukan Modbus
+    const serial = transport === 'serial' || transport === 'esp32';
+    document.querySelectorAll('.transport-serial').forEach(el => el.style.display = serial ? 'block' : 'none');
+    document.querySelectorAll('.transport-tcp').forEach(el => el.style.display = serial ? 'none' : 'block');
+    // COM port hanya wajib untuk serial
+    document.getElementById('set-port').required = serial;
+    document.getElementById('set-host').required = !serial;
+    // Firmware ESP32 mengirim di 115200; 9600 adalah default RS-485 sensor
+    const baud = document.getElementById('set-baud');
+    if (transport === 'esp32' && baud.value === '9600') baud.value = '115200';
+}
+
 function applyModuleVisibility(showAQ, showFlow) {
     const aqBtn = document.querySelector('button[onclick="switchTab(\'airquality\')"]');
     const flowBtn = document.querySelector('button[onclick="switchTab(\'flowmeter\')"]');
@@ -761,7 +656,12 @@ async function saveSettings() {
         com_port: document.getElementById('set-port').value,
         baudrate: parseInt(document.getElementById('set-baud').value),
         show_air_quality: document.getElementById('set-show-aq').checked,
-        show_flow_meter: document.getElementById('set-show-flow').checked
+        show_flow_meter: document.getElementById('set-show-flow').checked,
+        transport: document.getElementById('set-transport').value,
+        host: document.getElementById('set-host').value,
+        tcp_port: parseInt(document.getElementById('set-tcp-port').value) || 502,
+        slave_id: parseInt(document.getElementById('set-slave').value) || 1,
+        pipeline_depth: parseInt(document.getElementById('set-pipeline').value) || 1
     };
 
     try {
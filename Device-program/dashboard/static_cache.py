@@ -0,0 +1,106 @@
+"""StaticFiles dengan varian gzip siap pakai dan cache header.
+
+- File teks (js/css/html/svg) dikompres sekali lalu disimpan di memori,
+  dikompres ulang hanya jika mtime/ukuran file berubah.
+- index.html ditulis ulang: referensi aset lokal (src/href) diberi ?v=<hash isi>,
+  sehingga aset dengan versi yang cocok boleh di-cache browser selamanya
+  (immutable). index.html sendiri dan aset tanpa versi divalidasi ulang
+  lewat ETag (304).
+"""
+import gzip
+import hashlib
+import os
+import re
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+COMPRESSIBLE = (".html", ".js", ".css", ".svg", ".json", ".txt")
+MIN_COMPRESS_SIZE = 1024
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+ASSET_REF = re.compile(r'\b(src|href)="([^":?#]+\.(?:js|css|png|svg|ico))"')
+
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._files = {}  # full_path -> (mtime, size, hash, isi, gzip|None)
+        self._pages = {}  # full_path -> (kunci versi, etag, html, gzip)
+
+    def entry(self, full_path, stat_result):
+        key = (stat_result.st_mtime, stat_result.st_size)
+        cached = self._files.get(full_path)
+        if cached is None or cached[:2] != key:
+            with open(full_path, "rb") as f:
+                data = f.read()
+            compressed = None
+            if full_path.endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            cached = self._files[full_path] = (*key, hashlib.sha256(data).hexdigest()[:12], data, compressed)
+        return cached
+
+    def version(self, base_dir, ref):
+        """Hash isi aset yang dirujuk index.html; None jika file tidak ada di folder static"""
+        full_path, stat_result = self.lookup_path(os.path.normpath(os.path.join(base_dir, ref)))
+        if stat_result is None:
+            return None
+        return self.entry(full_path, stat_result)[2]
+
+    def warm(self):
+        """Kompres semua file teks di awal agar request pertama tidak menunggu"""
+        for directory in self.all_directories:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    if name.endswith(COMPRESSIBLE):
+                        full_path = os.path.join(root, name)
+                        self.entry(full_path, os.stat(full_path))
+
+    def page(self, full_path, stat_result, path):
+        base_dir = os.path.dirname(path) if path.endswith(".html") else path
+        html = self.entry(full_path, stat_result)[3].decode("utf-8")
+        refs = sorted(set(m.group(2) for m in ASSET_REF.finditer(html)))
+        versions = {ref: self.version(base_dir, ref) for ref in refs}
+        key = (stat_result.st_mtime, stat_result.st_size, tuple(versions.items()))
+        cached = self._pages.get(full_path)
+        if cached is None or cached[0] != key:
+            def add_version(match):
+                attr, ref = match.groups()
+                v = versions.get(ref)
+                return f'{attr}="{ref}?v={v}"' if v else match.group(0)
+            body = ASSET_REF.sub(add_version, html).encode("utf-8")
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            cached = self._pages[full_path] = (key, etag, body, gzip.compress(body, compresslevel=9, mtime=0))
+        return cached[1:]
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if status_code != 200 or scope["method"] != "GET":
+            return response
+        request_headers = Headers(scope=scope)
+        accepts_gzip = "gzip" in request_headers.get("accept-encoding", "")
+
+        if full_path.endswith(".html"):
+            etag, body, compressed = self.page(full_path, stat_result, self.get_path(scope))
+            headers = {"ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+            if etag in [tag.strip(" W/") for tag in request_headers.get("if-none-match", "").split(",")]:
+                return NotModifiedResponse(Headers(headers=headers))
+            if accepts_gzip:
+                headers["Content-Encoding"] = "gzip"
+                body = compressed
+            return Response(body, headers=headers, media_type="text/html")
+
+        _, _, digest, _, compressed = self.entry(full_path, stat_result)
+        version = parse_qs(scope.get("query_string", b"").decode()).get("v", [None])[0]
+        cache_control = IMMUTABLE if version == digest else REVALIDATE
+        response.headers["Cache-Control"] = cache_control
+        if isinstance(response, NotModifiedResponse) or compressed is None:
+            return response
+        response.headers["Vary"] = "Accept-Encoding"
+        if not accepts_gzip:
+            return response
+        headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type", "accept-ranges")}
+        headers["Content-Encoding"] = "gzip"
+        return Response(compressed, headers=headers, media_type=response.media_type)
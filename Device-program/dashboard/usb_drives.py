@@ -0,0 +1,101 @@
+"""Deteksi Flashdisk di background.
+
+Daftar partisi removable dicek berkala oleh satu thread. Tes tulis hanya
+dilakukan sekali saat drive baru muncul (atau setelah penulisan gagal),
+jadi endpoint export cukup membaca hasil cache tanpa menyentuh disk.
+"""
+import os
+import threading
+import time
+
+DRIVE_REFRESH_INTERVAL = 3  # detik
+
+
+def is_removable(partition):
+    return 'removable' in partition.opts.lower() or partition.fstype == 'FAT32'
+
+
+def probe_writable(mountpoint):
+    try:
+        test_file = os.path.join(mountpoint, ".test_write")
+        with open(test_file, 'w') as f: f.write('1')
+        os.remove(test_file)
+        return True
+    except OSError:
+        return False
+
+
+class DriveWatcher:
+    def __init__(self, interval=DRIVE_REFRESH_INTERVAL):
+        self.interval = interval
+        self.drives = []
+        self.last_refresh = None
+        self._writable = {}  # mountpoint -> hasil tes tulis terakhir
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        import psutil  # dimuat di thread watcher, tidak memperlambat start dashboard
+        drives = []
+        writable = {}
+        for partition in psutil.disk_partitions():
+            if not is_removable(partition):
+                continue
+            mountpoint = partition.mountpoint
+            ok = self._writable.get(mountpoint)
+            if ok is None:
+                # Drive baru terpasang: tes tulis sekali saja
+                ok = probe_writable(mountpoint)
+            writable[mountpoint] = ok
+            try:
+                usage = psutil.disk_usage(mountpoint)
+            except OSError:
+                continue
+            drives.append({
+                "mountpoint": mountpoint,
+                "fstype": partition.fstype,
+                "writable": ok,
+                "total_bytes": usage.total,
+                "free_bytes": usage.free,
+            })
+        with self._lock:
+            self._writable = writable
+            self.drives = drives
+            self.last_refresh = time.time()
+        return drives
+
+    def mark_failed(self, mountpoint):
+        """Dipanggil jika penulisan ke drive gagal, agar dites ulang pada refresh berikutnya"""
+        with self._lock:
+            self._writable.pop(mountpoint, None)
+            self.drives = [d for d in self.drives if d["mountpoint"] != mountpoint]
+
+    def get_usb_path(self):
+        if self.last_refresh is None:
+            self.refresh()
+        with self._lock:
+            for drive in self.drives:
+                if drive["writable"]:
+                    return drive["mountpoint"]
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            return {"drives": list(self.drives), "last_refresh": self.last_refresh}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Gagal cek drive: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="drive-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -1,3 +1,6 @@
+# Poller lama satu sensor (tanpa circuit breaker, multi stasiun, QC, dsb.), disimpan untuk
+# uji cepat manual. run_sensor.bat dan start_system.bat menjalankan poller utama
+# ../modbusWs600.py; jangan jalankan keduanya bersamaan pada port yang sama.
 import math
 import struct
 import time
@@ -304,6 +307,8 @@ print(f"Monitoring WS-600 aktif: {PORT} @ {BAUDRATE}")
 print(f"Poll: {READ_INTERVAL}s | Save: {DB_SAVE_INTERVAL}s")
 
 config_check_counter = 0
+last_status = None
+fail_sleep = READ_INTERVAL  # backoff saat sensor/port mati
 
 try:
     while True:
@@ -314,13 +319,22 @@ try:
             config_check_counter = 0
 
         current_time = time.time()
-        port_detected = is_port_detected(PORT)
         sensor_data = read_ws600()
+        port_detected = sensor_data is not None or is_port_detected(PORT)
         
-        # UPDATE STATUS KE DATABASE
-        update_status(port_detected, sensor_data is not None)
+        # UPDATE STATUS KE DATABASE (hanya saat berubah)
+        status = (port_detected, sensor_data is not None)
+        if status != last_status:
+            update_status(*status)
+            if sensor_data is None:
+                if port_detected:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Cek Wiring Sensor")
+                else:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Cek USB TTL")
+            last_status = status
         
         if sensor_data:
+            fail_sleep = READ_INTERVAL
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Data diterima.")
             
             # Update data live setiap 2 detik (Real-time di Dashboard)
@@ -331,10 +345,10 @@ try:
                 if save_to_db(sensor_data):
                     last_db_save = current_time
         else:
-            if port_detected:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Cek Wiring Sensor")
-            else:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Cek USB TTL")
+            # Sensor mati: jeda probe digandakan sampai maksimal 60 detik
+            time.sleep(fail_sleep)
+            fail_sleep = min(fail_sleep * 2, 60)
+            continue
 
         time.sleep(READ_INTERVAL)
 
@@ -21,6 +21,16 @@ static const uint16_t REGISTER_COUNT = 20;
 static const uint16_t START_ADDRESSES[] = {0, 1};
 static const uint8_t START_ADDRESS_COUNT = sizeof(START_ADDRESSES) / sizeof(START_ADDRESSES[0]);
 
+// =======================
+// OUTPUT KE PC (USB serial, dibaca modbusWs600.py transport "esp32")
+// =======================
+// $WS,<node>,<seq>,<ms>,<v0>,...,<v9>*<CRC16 hex>   sampel (nilai kosong = tidak valid)
+// $WE,<node>,<seq>,<ms>,<kode>*<CRC16 hex>          sensor tidak menjawab
+// CRC-16/CCITT-FALSE dari teks di antara '$' dan '*' (lihat ws600_esp32.py)
+static const uint8_t NODE_ID = SLAVE_ID;            // = slave_id stasiun di dashboard
+static const uint32_t SAMPLE_INTERVAL_MS = 1000;
+static const bool OUTPUT_TEXT = false;              // true = cetak juga teks lama untuk Serial Monitor
+
 static const char* FIELD_NAMES[10] = {
   "Wind Speed",
   "Wind Dir",
@@ -90,6 +100,46 @@ int scoreDataset(const float values[10]) {
   return score;
 }
 
+uint32_t frameSeq = 0;
+
+uint16_t crc16(const char* data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)(uint8_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// body = isi frame tanpa '$' dan '*'
+void sendFrame(const char* body, size_t len) {
+  Serial.printf("$%s*%04X\n", body, crc16(body, len));
+  frameSeq++;
+}
+
+void sendSampleFrame(const float values[10]) {
+  char body[192];
+  int len = snprintf(body, sizeof(body), "WS,%u,%lu,%lu",
+                     NODE_ID, (unsigned long)frameSeq, (unsigned long)millis());
+  for (uint8_t i = 0; i < 10; i++) {
+    if (isfinite(values[i])) {
+      len += snprintf(body + len, sizeof(body) - len, ",%.2f", values[i]);
+    } else {
+      len += snprintf(body + len, sizeof(body) - len, ",");
+    }
+  }
+  sendFrame(body, len);
+}
+
+void sendErrorFrame(uint8_t code) {
+  char body[48];
+  int len = snprintf(body, sizeof(body), "WE,%u,%lu,%lu,%u",
+                     NODE_ID, (unsigned long)frameSeq, (unsigned long)millis(), code);
+  sendFrame(body, len);
+}
+
 void sendToNextion(const String& component, const String& value) {
   nextion.print(component + ".txt=\"" + value + "\"");
   nextion.write(0xFF);
@@ -113,7 +163,13 @@ void setup() {
   Serial.println("WS-600 Logger Start");
 }
 
+void waitNextSample(uint32_t started) {
+  uint32_t elapsed = millis() - started;
+  if (elapsed < SAMPLE_INTERVAL_MS) delay(SAMPLE_INTERVAL_MS - elapsed);
+}
+
 void loop() {
+  uint32_t started = millis();
   uint16_t regs[REGISTER_COUNT];
   float candidate[10];
   float bestData[10];
@@ -123,12 +179,19 @@ void loop() {
   bool bestWordBig = true;
   uint16_t bestAddress = START_ADDRESSES[0];
   bool readOk = false;
+  uint8_t lastResult = 0;
+
+  // Alamat awal yang sudah terbukti benar tidak perlu diprobe ulang tiap siklus
+  static int8_t lockedAddressIdx = -1;
+  uint8_t firstIdx = lockedAddressIdx >= 0 ? lockedAddressIdx : 0;
+  uint8_t lastIdx = lockedAddressIdx >= 0 ? lockedAddressIdx + 1 : START_ADDRESS_COUNT;
 
-  for (uint8_t a = 0; a < START_ADDRESS_COUNT; a++) {
+  for (uint8_t a = firstIdx; a < lastIdx; a++) {
     uint16_t startAddress = START_ADDRESSES[a];
     uint8_t result = node.readHoldingRegisters(startAddress, REGISTER_COUNT);
 
     if (result != node.ku8MBSuccess) {
+      lastResult = result;
       continue;
     }
 
@@ -158,28 +221,40 @@ void loop() {
   }
 
   if (!readOk) {
-    Serial.println("Modbus Read Failed");
-    delay(2000);
+    sendErrorFrame(lastResult);
+    if (OUTPUT_TEXT) Serial.println("Modbus Read Failed");
+    lockedAddressIdx = -1;
+    waitNextSample(started);
     return;
   }
 
-  Serial.println("===== WS-600 DATA =====");
-  Serial.printf("Decode -> addr=%u, byte=%s, word=%s, score=%d/10\n",
-                bestAddress,
-                bestByteBig ? "big" : "little",
-                bestWordBig ? "big" : "little",
-                bestScore);
-  Serial.printf("%s: %.2f m/s\n", FIELD_NAMES[0], bestData[0]);
-  Serial.printf("%s: %.2f deg\n", FIELD_NAMES[1], bestData[1]);
-  Serial.printf("%s: %.2f C\n", FIELD_NAMES[2], bestData[2]);
-  Serial.printf("%s: %.2f %%\n", FIELD_NAMES[3], bestData[3]);
-  Serial.printf("%s: %.2f hPa\n", FIELD_NAMES[4], bestData[4]);
-  Serial.printf("%s: %.2f mm\n", FIELD_NAMES[5], bestData[5]);
-  Serial.printf("%s: %.2f mm\n", FIELD_NAMES[6], bestData[6]);
-  Serial.printf("%s: %.2f mm\n", FIELD_NAMES[7], bestData[7]);
-  Serial.printf("%s: %.2f mm\n", FIELD_NAMES[8], bestData[8]);
-  Serial.printf("%s: %.2f W/m2\n", FIELD_NAMES[9], bestData[9]);
-  Serial.println("========================\n");
+  if (lockedAddressIdx < 0) {
+    for (uint8_t a = 0; a < START_ADDRESS_COUNT; a++) {
+      if (START_ADDRESSES[a] == bestAddress) lockedAddressIdx = a;
+    }
+  }
+
+  sendSampleFrame(bestData);
+
+  if (OUTPUT_TEXT) {
+    Serial.println("===== WS-600 DATA =====");
+    Serial.printf("Decode -> addr=%u, byte=%s, word=%s, score=%d/10\n",
+                  bestAddress,
+                  bestByteBig ? "big" : "little",
+                  bestWordBig ? "big" : "little",
+                  bestScore);
+    Serial.printf("%s: %.2f m/s\n", FIELD_NAMES[0], bestData[0]);
+    Serial.printf("%s: %.2f deg\n", FIELD_NAMES[1], bestData[1]);
+    Serial.printf("%s: %.2f C\n", FIELD_NAMES[2], bestData[2]);
+    Serial.printf("%s: %.2f %%\n", FIELD_NAMES[3], bestData[3]);
+    Serial.printf("%s: %.2f hPa\n", FIELD_NAMES[4], bestData[4]);
+    Serial.printf("%s: %.2f mm\n", FIELD_NAMES[5], bestData[5]);
+    Serial.printf("%s: %.2f mm\n", FIELD_NAMES[6], bestData[6]);
+    Serial.printf("%s: %.2f mm\n", FIELD_NAMES[7], bestData[7]);
+    Serial.printf("%s: %.2f mm\n", FIELD_NAMES[8], bestData[8]);
+    Serial.printf("%s: %.2f W/m2\n", FIELD_NAMES[9], bestData[9]);
+    Serial.println("========================\n");
+  }
 
   sendToNextion("tWind", String(bestData[0], 1));
   sendToNextion("tTemp", String(bestData[2], 1));
@@ -188,5 +263,5 @@ void loop() {
   sendToNextion("tRain", String(bestData[8], 1));
   sendToNextion("tRad", String(bestData[9], 0));
 
-  delay(2000);
+  waitNextSample(started);
 }
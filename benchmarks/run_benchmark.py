@@ -0,0 +1,334 @@
+"""Benchmark WS-600: akuisisi (poller vs simulator) dan load test API dashboard.
+
+    python benchmarks/run_benchmark.py                       # semua skenario
+    python benchmarks/run_benchmark.py --skip-api --error-rate 0.1
+    python benchmarks/run_benchmark.py --json hasil.json --compare baseline.json
+
+Semua data ditulis ke folder sementara; ws600_data.db asli tidak disentuh.
+Dengan --compare, exit code 1 jika p99 atau throughput memburuk lebih dari
+--tolerance dibanding baseline.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DASHBOARD_DIR = os.path.join(ROOT_DIR, "Device-program", "dashboard")
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from sim_slave import SimulatedWS600, start_slave
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def db_size(path):
+    conn = sqlite3.connect(path)
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    conn.close()
+    return page_count * page_size
+
+
+# ==============================
+# AKUISISI
+# ==============================
+def bench_acquisition(args, workdir):
+    import modbusWs600 as poller
+
+    devices = [
+        SimulatedWS600(
+            slave_id=i + 1, register_count=args.registers, byte_order=args.byte_order, word_order=args.word_order,
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=42 + i
+        )
+        for i in range(args.stations)
+    ]
+    server, port = start_slave(devices, framing="tcp" if args.transport == "tcp" else "rtu")
+
+    poller.DB_NAME = os.path.join(workdir, "acq.db")
+    poller.init_db()
+    # Stasiun diatur lewat DB seperti di lapangan: stasiun utama di system_settings, sisanya di tabel stations
+    com_port = f"socket://127.0.0.1:{port}" if args.transport == "serial" else ""
+    conn = sqlite3.connect(poller.DB_NAME)
+    conn.execute("""
+        UPDATE system_settings SET com_port = ?, transport = ?, host = '127.0.0.1', tcp_port = ?,
+            slave_id = 1, pipeline_depth = ?, poll_interval = ?, save_interval = 0
+        WHERE id = 1
+    """, (com_port, args.transport, port, args.pipeline, args.poll_interval))  # save_interval 0: setiap sampel ke histori
+    conn.executemany("""
+        INSERT INTO stations (id, name, transport, com_port, host, tcp_port, slave_id, pipeline_depth)
+        VALUES (?, ?, ?, ?, '127.0.0.1', ?, ?, ?)
+    """, [(i, f"Sim {i}", args.transport, com_port, port, i, args.pipeline) for i in range(2, args.stations + 1)])
+    conn.commit()
+    conn.close()
+    poller.load_settings()
+    size_before = db_size(poller.DB_NAME)
+
+    cycle_times = []
+    samples = 0
+    started = time.time()
+    poller.print = lambda *a, **k: None  # log "Data saved" tidak ikut diukur
+    try:
+        while time.time() - started < args.duration:
+            loop_start = time.time()
+            samples += len(poller.poll_once(loop_start))
+            elapsed = time.time() - loop_start
+            cycle_times.append(elapsed)
+            time.sleep(max(0, poller.READ_INTERVAL - elapsed))
+    finally:
+        poller.close_client()
+        server.shutdown()
+        del poller.print
+    wall = time.time() - started
+
+    # Sampel hasil akuisisi digandakan sampai >= 20000 baris agar ukuran per baris tidak tertutup page kosong
+    conn = sqlite3.connect(poller.DB_NAME)
+    rows = conn.execute("SELECT COUNT(*) FROM weather_data").fetchone()[0]
+    if rows:
+        cols = [c[1] for c in conn.execute("PRAGMA table_info(weather_data)") if c[1] != "id"]
+        while rows < 20000:
+            conn.execute(f"INSERT INTO weather_data ({', '.join(cols)}) SELECT {', '.join(cols)} FROM weather_data")
+            rows = conn.execute("SELECT COUNT(*) FROM weather_data").fetchone()[0]
+        conn.commit()
+    conn.close()
+    bytes_per_row = (db_size(poller.DB_NAME) - size_before) / rows if rows else 0
+    rtt = poller.MODBUS_RTT.snapshot().get(())
+
+    def rtt_ms(q):
+        value = poller.MODBUS_RTT.percentile(q)
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "stations": args.stations,
+        "transport": args.transport,
+        "cycles": len(cycle_times),
+        "samples": samples,
+        "samples_per_s": round(samples / wall, 2),
+        "sample_success_ratio": round(samples / (len(cycle_times) * args.stations), 3) if cycle_times else 0,
+        "cycle_p50_ms": round(percentile(cycle_times, 50) * 1000, 2),
+        "cycle_p99_ms": round(percentile(cycle_times, 99) * 1000, 2),
+        "modbus_rtt_avg_ms": round(rtt["sum"] / rtt["count"] * 1000, 2) if rtt and rtt["count"] else None,
+        "modbus_rtt_p50_ms": rtt_ms(50),
+        "modbus_rtt_p99_ms": rtt_ms(99),
+        "modbus_errors": {k[0]: v for k, v in poller.MODBUS_ERRORS.snapshot().items()},
+        "adaptive_timeout": {s.slave_id: s.latency.snapshot() for s in poller.stations},
+        "slave_stats": {d.slave_id: dict(d.stats) for d in devices},
+        "db_bytes_per_row": round(bytes_per_row, 1),
+        "db_growth_per_day_mb": round(bytes_per_row * 86400 / args.save_interval / 1e6, 2),
+    }
+
+
+# ==============================
+# LOAD TEST API
+# ==============================
+def build_history_db(path, days, save_interval):
+    import modbusWs600 as poller
+
+    poller.DB_NAME = path
+    poller.init_db()
+    conn = sqlite3.connect(path)
+    rng = random.Random(1)
+    end = datetime.now().replace(microsecond=0)
+    ts = end - timedelta(days=days)
+    rain_day = rain_total = 0.0
+    batch = []
+    while ts <= end:
+        if ts.hour == 0 and ts.minute == 0 and ts.second < save_interval:
+            rain_day = 0.0
+        if rng.random() < 0.01:
+            rain_day += 0.2
+            rain_total += 0.2
+        batch.append((
+            ts.strftime("%Y-%m-%d %H:%M:%S"), round(rng.uniform(0, 8), 2), round(rng.uniform(0, 360), 1),
+            round(rng.uniform(22, 33), 2), round(rng.uniform(50, 95), 2), round(rng.uniform(1005, 1015), 2),
+            0.0, 0.0, round(rain_day, 2), round(rain_total, 2)
+        ))
+        if len(batch) >= 10000:
+            conn.executemany(
+                "INSERT INTO weather_data (timestamp, wind_speed, wind_direction, temperature, humidity, pressure, "
+                "rain_minute, rain_hour, rain_day, rain_total) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+            )
+            batch = []
+        ts += timedelta(seconds=save_interval)
+    if batch:
+        conn.executemany(
+            "INSERT INTO weather_data (timestamp, wind_speed, wind_direction, temperature, humidity, pressure, "
+            "rain_minute, rain_hour, rain_day, rain_total) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+        )
+    conn.execute(
+        "INSERT OR REPLACE INTO weather_live (id, timestamp, wind_speed, wind_direction, temperature, humidity, "
+        "pressure, rain_total) VALUES (1, ?, 2.5, 180, 27.5, 72, 1010, 125)", (end.strftime("%Y-%m-%d %H:%M:%S"),)
+    )
+    conn.commit()
+    conn.close()
+
+
+def api_endpoints():
+    today = datetime.now().date()
+    week = (today - timedelta(days=7)).isoformat()
+    month = (today - timedelta(days=30)).isoformat()
+    return {
+        "latest": "/api/latest",
+        "status": "/api/status",
+        "logs_100": "/api/logs?limit=100",
+        "logs_7d_5000": f"/api/logs?limit=5000&start_date={week}&end_date={today}",
+        "forecast": "/api/forecast",
+        "report_30d": f"/api/report?start_date={month}&end_date={today}",
+    }
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/api/status", timeout=1).read()
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+def bench_api(args, workdir):
+    db_path = os.path.join(workdir, "api.db")
+    build_history_db(db_path, args.days, args.save_interval)
+
+    env = dict(os.environ, WS600_DB_PATH=db_path)
+    if args.api_workers > 1:
+        # Mode multi-worker dashboard (init DB + hub feed live di proses induk)
+        command = [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(args.api_port),
+                   "--workers", str(args.api_workers), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.api_port),
+                   "--log-level", "warning"]
+    proc = subprocess.Popen(command, cwd=DASHBOARD_DIR, env=env)
+    base_url = f"http://127.0.0.1:{args.api_port}"
+    results = {}
+    try:
+        if not wait_ready(base_url):
+            raise RuntimeError("Dashboard tidak merespon")
+        for name, path in api_endpoints().items():
+            urllib.request.urlopen(base_url + path).read()  # warm-up (mis. cache laporan harian)
+
+            def hit(_):
+                t0 = time.perf_counter()
+                with urllib.request.urlopen(base_url + path) as resp:
+                    size = len(resp.read())
+                return time.perf_counter() - t0, size
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.clients) as pool:
+                samples = list(pool.map(hit, range(args.requests)))
+            wall = time.perf_counter() - started
+            latencies = [s[0] for s in samples]
+            results[name] = {
+                "req_per_s": round(len(samples) / wall, 1),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "bytes": samples[-1][1],
+            }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return results
+
+
+# ==============================
+# PERBANDINGAN BASELINE
+# ==============================
+def compare(current, baseline, tolerance):
+    """Return daftar regresi (teks) antara hasil sekarang dan baseline"""
+    regressions = []
+    acq_now, acq_base = current.get("acquisition"), baseline.get("acquisition")
+    if acq_now and acq_base and acq_now["samples_per_s"] < acq_base["samples_per_s"] * (1 - tolerance):
+        regressions.append(f"acquisition samples/s {acq_base['samples_per_s']} -> {acq_now['samples_per_s']}")
+    for name, now in (current.get("api") or {}).items():
+        base = (baseline.get("api") or {}).get(name)
+        if not base:
+            continue
+        if now["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"api {name} p99 {base['p99_ms']}ms -> {now['p99_ms']}ms")
+        if now["req_per_s"] < base["req_per_s"] * (1 - tolerance):
+            regressions.append(f"api {name} req/s {base['req_per_s']} -> {now['req_per_s']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WS-600 Dashboard System")
+    parser.add_argument("--skip-acquisition", action="store_true")
+    parser.add_argument("--skip-api", action="store_true")
+    # akuisisi
+    parser.add_argument("--duration", type=float, default=10.0, help="durasi benchmark akuisisi (detik)")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.02, help="latency respon simulator (detik)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--registers", type=int, default=20)
+    parser.add_argument("--byte-order", choices=["big", "little"], default="big")
+    parser.add_argument("--word-order", choices=["big", "little"], default="big")
+    parser.add_argument("--transport", choices=["serial", "tcp", "rtu_tcp"], default="serial",
+                        help="serial = RTU lewat socket:// (pyserial)")
+    parser.add_argument("--stations", type=int, default=1, help="jumlah slave di belakang satu gateway")
+    parser.add_argument("--pipeline", type=int, default=1, help="request Modbus TCP yang boleh menunggu sekaligus")
+    # api
+    parser.add_argument("--days", type=int, default=30, help="hari data histori sintetis")
+    parser.add_argument("--save-interval", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="request per endpoint")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--api-workers", type=int, default=1, help="jumlah proses worker dashboard")
+    # output
+    parser.add_argument("--json", help="simpan hasil ke file JSON")
+    parser.add_argument("--compare", help="file JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ws600_bench_")
+    result = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args)}
+    try:
+        if not args.skip_acquisition:
+            print("[*] Benchmark akuisisi...")
+            result["acquisition"] = bench_acquisition(args, workdir)
+            print(json.dumps(result["acquisition"], indent=2))
+        if not args.skip_api:
+            print(f"[*] Load test API ({args.days} hari data, {args.clients} client)...")
+            result["api"] = bench_api(args, workdir)
+            print(f"{'endpoint':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'bytes':>12}")
+            for name, r in result["api"].items():
+                print(f"{name:<16}{r['req_per_s']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['bytes']:>12}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("[!] REGRESI:")
+            for line in regressions:
+                print("    " + line)
+            sys.exit(1)
+        print("[*] Tidak ada regresi dibanding baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Simulator ESP32 (transport "esp32") tanpa hardware.
+
+Mengirim frame $WS/$WE (ws600_esp32.py) seperti WS600_ESP32.ino, dengan nilai
+dari SimulatedWS600. Bisa menyisipkan frame rusak (CRC salah), frame hilang
+(loncatan seq) dan baris teks debug untuk menguji parser. Poller terhubung
+lewat COM port = "socket://127.0.0.1:5030", atau di Linux lewat pty (--pty)
+yang terlihat seperti port USB serial biasa.
+
+    python benchmarks/sim_esp32.py --port 5030 --nodes 2 --corrupt-rate 0.05 --loss-rate 0.02
+    python benchmarks/sim_esp32.py --pty
+"""
+import argparse
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from sim_slave import SimulatedWS600, ThreadingServer
+from ws600_esp32 import encode_error, encode_sample
+
+
+class SimulatedEsp32:
+    """Satu ESP32 dengan satu atau beberapa sensor (node) di bus RS-485-nya"""
+
+    def __init__(self, node_ids=(1,), interval=1.0, corrupt_rate=0.0, loss_rate=0.0, error_rate=0.0, seed=None):
+        self.devices = [SimulatedWS600(slave_id=n, seed=None if seed is None else seed + n) for n in node_ids]
+        self.interval = interval
+        self.corrupt_rate = corrupt_rate
+        self.loss_rate = loss_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.seq = {n: 0 for n in node_ids}
+        self.started = time.monotonic()
+        self.stats = {"frames": 0, "corrupted": 0, "lost": 0, "errors": 0}
+
+    def frames(self):
+        """Frame satu siklus sampling (satu per node)"""
+        ms = int((time.monotonic() - self.started) * 1000)
+        out = []
+        for device in self.devices:
+            node = device.slave_id
+            seq = self.seq[node]
+            self.seq[node] += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                frame = encode_error(node, seq, ms, 226)  # ku8MBResponseTimedOut
+            else:
+                device.registers()  # maju satu langkah random walk
+                frame = encode_sample(node, seq, ms, list(device.values))
+            if self.loss_rate and self.rng.random() < self.loss_rate:
+                self.stats["lost"] += 1
+                continue
+            if self.corrupt_rate and self.rng.random() < self.corrupt_rate:
+                self.stats["corrupted"] += 1
+                frame = frame[:8] + bytes([frame[8] ^ 0x01]) + frame[9:]
+            self.stats["frames"] += 1
+            out.append(frame)
+        return b"".join(out)
+
+    def stream(self, write, stop):
+        write(b"WS-600 Logger Start\r\n")
+        while not stop.is_set():
+            write(self.frames())
+            stop.wait(self.interval)
+
+
+def start_esp32(esp32, host="127.0.0.1", port=0):
+    """Layani frame lewat TCP (pyserial socket://) di thread background; return (server, port)"""
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            try:
+                esp32.stream(self.request.sendall, self.server.stop)
+            except OSError:
+                pass
+
+    server = ThreadingServer((host, port), Handler)
+    server.stop = threading.Event()
+    threading.Thread(target=server.serve_forever, name="sim-esp32", daemon=True).start()
+    return server, server.server_address[1]
+
+
+def start_pty(esp32):
+    """Linux/macOS: pasangan pty, poller membuka path slave seperti /dev/ttyUSB0"""
+    import pty
+    master, slave = pty.openpty()
+    stop = threading.Event()
+    threading.Thread(target=esp32.stream, args=(lambda b: os.write(master, b), stop), daemon=True).start()
+    return stop, os.ttyname(slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator ESP32 WS-600 (frame serial)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5030)
+    parser.add_argument("--pty", action="store_true", help="pakai pty, bukan TCP")
+    parser.add_argument("--nodes", type=int, default=1, help="jumlah sensor (node id 1..N)")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0)
+    parser.add_argument("--loss-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    esp32 = SimulatedEsp32(range(1, args.nodes + 1), args.interval, args.corrupt_rate, args.loss_rate, args.error_rate)
+    if args.pty:
+        _, path = start_pty(esp32)
+        print(f"[*] Simulator ESP32 ({args.nodes} node) di {path}")
+    else:
+        _, port = start_esp32(esp32, args.host, args.port)
+        print(f"[*] Simulator ESP32 ({args.nodes} node) di socket://{args.host}:{port}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[*] {esp32.stats}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
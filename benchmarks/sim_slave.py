@@ -0,0 +1,185 @@
+"""Simulator slave WS-600 untuk benchmark (tanpa sensor fisik).
+
+Melayani function code 03 (read holding registers) dengan layout float 32-bit
+WS-600 (9 parameter + radiasi opsional) lewat TCP, baik framing Modbus TCP
+(MBAP) maupun RTU-over-TCP. Poller bisa terhubung via PORT="socket://host:port"
+(pyserial URL) untuk RTU. Urutan byte/word, latency dan error rate bisa diatur.
+Beberapa slave bisa dipasang di belakang satu server untuk meniru gateway
+RS-485-ke-Ethernet (--slaves); request tetap dilayani berurutan seperti bus RS-485.
+
+    python benchmarks/sim_slave.py --port 5020 --latency 0.02 --error-rate 0.05
+"""
+import argparse
+import random
+import socketserver
+import struct
+import threading
+import time
+
+BASE_VALUES = [2.5, 180.0, 27.5, 72.0, 1010.0, 0.0, 0.4, 3.2, 125.0, 650.0]
+
+
+def crc16(data):
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return struct.pack("<H", crc)
+
+
+def encode_float(value, byte_order="big", word_order="big"):
+    raw = struct.pack(">f", value)
+    hi, lo = raw[:2], raw[2:]
+    if byte_order == "little":
+        hi, lo = hi[::-1], lo[::-1]
+    words = [int.from_bytes(hi, "big"), int.from_bytes(lo, "big")]
+    return words if word_order == "big" else words[::-1]
+
+
+class SimulatedWS600:
+    def __init__(self, slave_id=1, register_count=20, byte_order="big", word_order="big",
+                 latency=0.0, jitter=0.0, error_rate=0.0, address_offset=0, seed=None):
+        self.slave_id = slave_id
+        self.register_count = register_count
+        self.byte_order = byte_order
+        self.word_order = word_order
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.address_offset = address_offset
+        self.rng = random.Random(seed)
+        self.values = list(BASE_VALUES)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "dropped": 0, "corrupted": 0, "exceptions": 0}
+
+    def registers(self):
+        with self.lock:
+            # Random walk kecil agar data terlihat hidup
+            self.values[0] = max(0.0, self.values[0] + self.rng.uniform(-0.3, 0.3))
+            self.values[1] = (self.values[1] + self.rng.uniform(-10, 10)) % 360
+            self.values[2] += self.rng.uniform(-0.05, 0.05)
+            self.values[3] = min(100.0, max(0.0, self.values[3] + self.rng.uniform(-0.2, 0.2)))
+            self.values[4] += self.rng.uniform(-0.02, 0.02)
+            # Tipping bucket 0.2 mm sesekali: counter rain_total naik untuk uji akumulasi hujan
+            if self.rng.random() < 0.05:
+                self.values[8] += 0.2
+            regs = []
+            for value in self.values:
+                regs.extend(encode_float(value, self.byte_order, self.word_order))
+        return [0] * self.address_offset + regs
+
+    def handle_pdu(self, pdu):
+        """Return PDU respon, atau None jika respon sengaja di-drop"""
+        self.stats["requests"] += 1
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats["dropped"] += 1
+            return None
+        function, address, count = struct.unpack(">BHH", pdu[:5])
+        if function != 3:
+            self.stats["exceptions"] += 1
+            return bytes([function | 0x80, 1])
+        regs = self.registers()
+        if address + count > self.register_count + self.address_offset or count > 125:
+            self.stats["exceptions"] += 1
+            return bytes([0x83, 2])
+        data = b"".join(struct.pack(">H", r) for r in regs[address:address + count])
+        return bytes([3, len(data)]) + data
+
+    def maybe_corrupt(self, frame):
+        if self.error_rate and self.rng.random() < self.error_rate / 2:
+            self.stats["corrupted"] += 1
+            return frame[:-1] + bytes([frame[-1] ^ 0xFF])
+        return frame
+
+
+def make_handler(devices, framing):
+    first = next(iter(devices.values()))
+
+    class Handler(socketserver.BaseRequestHandler):
+        def read_exact(self, size):
+            buf = b""
+            while len(buf) < size:
+                chunk = self.request.recv(size - len(buf))
+                if not chunk:
+                    raise ConnectionError
+                buf += chunk
+            return buf
+
+        def handle(self):
+            try:
+                while True:
+                    if framing == "tcp":
+                        tid, _, length, unit = struct.unpack(">HHHB", self.read_exact(7))
+                        pdu = self.read_exact(length - 1)
+                        device = devices.get(unit) or (first if unit in (0, 255) else None)
+                        if device is None:
+                            continue
+                        reply = device.handle_pdu(pdu)
+                        if reply is not None:
+                            self.request.sendall(struct.pack(">HHHB", tid, 0, len(reply) + 1, unit) + reply)
+                    else:
+                        frame = self.read_exact(8)
+                        device = devices.get(frame[0])
+                        if crc16(frame[:-2]) != frame[-2:] or device is None:
+                            continue
+                        reply = device.handle_pdu(frame[1:6])
+                        if reply is not None:
+                            body = bytes([device.slave_id]) + reply
+                            self.request.sendall(device.maybe_corrupt(body + crc16(body)))
+            except (ConnectionError, OSError):
+                pass
+
+    return Handler
+
+
+class ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_slave(device, host="127.0.0.1", port=0, framing="rtu"):
+    """Jalankan slave (satu SimulatedWS600 atau list) di thread background; return (server, port)"""
+    devices = device if isinstance(device, (list, tuple)) else [device]
+    server = ThreadingServer((host, port), make_handler({d.slave_id: d for d in devices}, framing))
+    threading.Thread(target=server.serve_forever, name="sim-slave", daemon=True).start()
+    return server, server.server_address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator slave Modbus WS-600")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    parser.add_argument("--framing", choices=["rtu", "tcp"], default="rtu")
+    parser.add_argument("--slave-id", type=int, default=1)
+    parser.add_argument("--slaves", type=int, default=1, help="jumlah slave (id berurutan) di belakang gateway")
+    parser.add_argument("--registers", type=int, default=20, help="18 = tanpa radiasi")
+    parser.add_argument("--byte-order", choices=["big", "little"], default="big")
+    parser.add_argument("--word-order", choices=["big", "little"], default="big")
+    parser.add_argument("--address-offset", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    devices = [
+        SimulatedWS600(args.slave_id + i, args.registers, args.byte_order, args.word_order,
+                       args.latency, args.jitter, args.error_rate, args.address_offset)
+        for i in range(args.slaves)
+    ]
+    server, port = start_slave(devices, args.host, args.port, args.framing)
+    print(f"[*] Simulator WS-600 ({args.framing}, {len(devices)} slave) aktif di {args.host}:{port}")
+    try:
+        while True:
+            time.sleep(10)
+            for device in devices:
+                print(f"[*] slave {device.slave_id}: {device.stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
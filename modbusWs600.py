@@ -1,13 +1,24 @@
 import math
+import os
+import select
 import struct
 import time
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from pymodbus.client import ModbusSerialClient
+from pymodbus import Framer
+from pymodbus.client import ModbusSerialClient, ModbusTcpClient
 from pymodbus.exceptions import ModbusException
 from serial.tools import list_ports
 
+from ws600_metrics import REGISTRY, GAP_BUCKETS, start_http_exporter
+from ws600_livefeed import LiveFeedSender, LIVE_FEED_PORT
+from ws600_esp32 import Esp32Link
+from ws600_qc import QC_FIELDS, QualityChecker, qc_mask
+from ws600_compress import ARCHIVE_FIELDS, HistoryCompressor, validate as validate_compression
+from ws600_profiler import Profiler
+
 # ==============================
 # KONFIGURASI DEFAULT (Akan diupdate dari Database)
 # ==============================
@@ -24,6 +35,44 @@ DB_SAVE_INTERVAL = 10
 DB_NAME = "ws600_data.db"
 CHECK_SETTINGS_INTERVAL = 5 # Cek perubahan setting setiap 5 detik
 
+# Transaksi Modbus (timeout adaptif + retry di dalam budget polling)
+MIN_TIMEOUT = 0.15     # batas bawah timeout adaptif (detik)
+MAX_TIMEOUT = 2.0      # timeout awal / batas atas sebelum latency diketahui
+MAX_RETRIES = 2        # retry per blok dalam satu siklus polling
+RETRY_BACKOFF = 0.05   # jeda awal antar retry, dikali 2 tiap percobaan
+POLL_BUDGET = 0.8      # porsi READ_INTERVAL yang boleh dipakai untuk transaksi
+
+# Circuit breaker: sensor/port mati tidak di-poll setiap siklus
+FAILURES_TO_OPEN = 5           # kegagalan berturut-turut sebelum circuit dibuka
+RECONNECT_BACKOFF_MIN = 2.0    # jeda probe pertama saat circuit terbuka (detik)
+RECONNECT_BACKOFF_MAX = 60.0   # jeda probe maksimum (detik)
+
+METRICS_PORT = 9101    # exporter Prometheus poller (http://127.0.0.1:9101/metrics), 0 = mati
+LIVE_FEED = True       # kirim sampel live ke ring buffer dashboard (UDP 127.0.0.1:LIVE_FEED_PORT)
+START_ADDRESS_CANDIDATES = [0, 1]  # sebagian unit WS-600 bergeser 1 register (lihat firmware ESP32)
+MAX_BLOCK_REGISTERS = 125          # batas Modbus untuk read holding registers
+MAX_REGISTER_GAP = 4               # celah register yang masih lebih murah dibaca daripada transaksi baru
+READ_RADIATION = True              # channel opsional register 40019-40020
+
+# Transport per stasiun: "serial" (RTU), "tcp" (Modbus TCP) atau "rtu_tcp" (RTU lewat gateway TCP)
+TRANSPORTS = ("serial", "tcp", "rtu_tcp", "esp32")
+TCP_PORT = 502
+GATEWAY_WORKERS = 16   # gateway/port serial yang di-poll paralel; slave di belakang satu gateway tetap berurutan
+PRIMARY_STATION = 1    # stasiun dari system_settings, stasiun lain dari tabel stations
+ESP32_STALE = 10.0     # transport esp32: node tanpa frame selama ini (detik) dianggap gagal
+
+# Akumulasi hujan dari counter rain_total (increment per baris histori + rollup per jam)
+RAIN_MAX_RATE = 500.0  # mm/jam; kenaikan counter lebih cepat dari ini dianggap glitch
+RAIN_SLACK = 1.0       # toleransi mm di atas RAIN_MAX_RATE (resolusi tipping bucket, jitter waktu)
+RAIN_ROLLOVER = 0.0    # nilai maksimum counter sebelum kembali ke 0 (0 = tidak diketahui, turun = reset)
+RAIN_REBASE_AFTER = 3  # glitch berturut-turut yang konsisten = counter baru, baseline dipindah
+
+# Kompresi histori per kolom dari tabel compression_settings (ws600_compress.py): {kolom: (mode, toleransi)}
+COMPRESSION = {}
+
+# Profiling runtime (ws600_profiler.py), mode dari system_settings.profile_mode; file di samping DB_NAME
+PROFILE_DIR = "profiles"
+
 FIELDS = [
     "Wind Speed (m/s)",
     "Wind Direction (deg)",
@@ -46,7 +95,67 @@ FIELD_RANGES = {
     "Hour Rain (mm)": (0.0, 400.0),
     "Day Rain (mm)": (0.0, 1000.0),
     "Total Rain (mm)": (0.0, 20000.0),
+    "Radiation (W/m2)": (0.0, 2500.0),
+}
+
+# ==============================
+# METRIK
+# ==============================
+MODBUS_RTT = REGISTRY.histogram("ws600_modbus_rtt_seconds", "Round-trip time transaksi Modbus yang berhasil")
+MODBUS_ERRORS = REGISTRY.counter("ws600_modbus_errors_total", "Transaksi Modbus gagal per jenis (timeout/CRC muncul sebagai timeout)", ("kind",))
+DECODE_TIME = REGISTRY.histogram("ws600_decode_seconds", "Waktu decode register menjadi nilai float")
+DB_COMMIT = REGISTRY.histogram("ws600_db_commit_seconds", "Latency tulis+commit SQLite", ("table",))
+DB_LOCKED = REGISTRY.counter("ws600_db_lock_contention_total", "Tulis SQLite gagal karena database terkunci", ("table",))
+DROPPED_SAMPLES = REGISTRY.counter("ws600_dropped_samples_total", "Sampel yang gagal dibaca atau disimpan", ("reason",))
+SAMPLE_GAP = REGISTRY.histogram("ws600_sample_gap_seconds", "Jarak waktu antar sampel sukses", buckets=GAP_BUCKETS)
+SAMPLES = REGISTRY.counter("ws600_samples_total", "Sampel sensor yang berhasil dibaca")
+CIRCUIT_STATE = REGISTRY.gauge("ws600_circuit_open", "Jumlah stasiun yang circuit breaker-nya sedang terbuka")
+RAIN_EVENTS = REGISTRY.counter("ws600_rain_counter_events_total", "Counter rain_total reset/rollover/glitch/rebase", ("kind",))
+
+# main() tidur di time.sleep antar siklus: frame terdalamnya dihitung idle
+PROFILER = Profiler("poller", PROFILE_DIR, idle=[("modbusWs600.py", "main")])
+
+
+def record_db_error(table, err):
+    if isinstance(err, sqlite3.OperationalError) and "locked" in str(err):
+        DB_LOCKED.inc(table=table)
+
+# Kolom koneksi per stasiun yang ditambahkan ke system_settings (stasiun utama)
+STATION_COLUMNS = [
+    ("transport", "TEXT DEFAULT 'serial'"),
+    ("host", "TEXT DEFAULT ''"),
+    ("tcp_port", "INTEGER DEFAULT 502"),
+    ("slave_id", "INTEGER DEFAULT 1"),
+    ("pipeline_depth", "INTEGER DEFAULT 1"),
+]
+
+# Statistik semua sampel dalam satu jendela simpan, ditulis bersama snapshot di weather_data
+WINDOW_COLUMNS = [
+    ("sample_count", "INTEGER"),
+    ("wind_speed_avg", "REAL"),
+    ("wind_gust", "REAL"),
+    ("wind_dir_avg", "REAL"),
+    ("wind_dir_std", "REAL"),
+    ("temp_min", "REAL"),
+    ("temp_max", "REAL"),
+    ("rain_increment", "REAL"),  # mm sejak baris histori sebelumnya (dari delta rain_total)
+    ("qc_flags", "INTEGER"),     # bitmask kualitas snapshot (ws600_qc.py), NULL = belum dicek
+]
+
+# Nama field sampel untuk tiap kolom QC (urut ws600_qc.QC_FIELDS)
+QC_SOURCE = {
+    "wind_speed": "Wind Speed (m/s)", "wind_direction": "Wind Direction (deg)",
+    "temperature": "Temperature (degC)", "humidity": "Humidity (%)", "pressure": "Pressure (hPa)",
+    "rain_total": "Total Rain (mm)", "solar_radiation": "Radiation (W/m2)",
 }
+# Sumber nilai untuk keputusan kompresi histori (urut ARCHIVE_FIELDS)
+ARCHIVE_SOURCE = dict(QC_SOURCE, rain_minute="Minute Rain (mm)", rain_hour="Hour Rain (mm)", rain_day="Day Rain (mm)")
+QC_WIND = qc_mask("wind_speed", "wind_direction")
+QC_TEMPERATURE = qc_mask("temperature")
+
+# Peta register: field -> offset register dari alamat awal (float 32-bit = 2 register)
+REGISTER_MAP = {field: i * 2 for i, field in enumerate(FIELDS)}
+OPTIONAL_CHANNELS = {"Radiation (W/m2)": 18}
 
 # ==============================
 # DATABASE FUNCTIONS
@@ -82,6 +191,19 @@ def init_db():
             last_check DATETIME
         )
     ''')
+    cursor.execute("PRAGMA table_info(system_status)")
+    if "circuit_state" not in [c[1] for c in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE system_status ADD COLUMN circuit_state TEXT")
+    # 3b. Riwayat gangguan sensor (durasi outage)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS device_outages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at DATETIME,
+            ended_at DATETIME,
+            duration_s REAL,
+            reason TEXT
+        )
+    ''')
     # 4. Tabel Pengaturan
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS system_settings (
@@ -97,62 +219,191 @@ def init_db():
     cursor.execute("SELECT COUNT(*) FROM system_settings")
     if cursor.fetchone()[0] == 0:
         cursor.execute("INSERT INTO system_settings (id, com_port, baudrate, poll_interval) VALUES (1, 'COM11', 9600, 2.0)")
+
+    # Migrasi: kolom radiasi (channel opsional) untuk tabel lama
+    for table in ("weather_data", "weather_live"):
+        cursor.execute(f"PRAGMA table_info({table})")
+        cols = [c[1] for c in cursor.fetchall()]
+        if "solar_radiation" not in cols:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN solar_radiation REAL")
+
+    # Multi-stasiun: weather_live/system_status memakai id = id stasiun,
+    # histori dan outage diberi kolom station_id (data lama = stasiun utama)
+    for table in ("weather_data", "device_outages"):
+        cursor.execute(f"PRAGMA table_info({table})")
+        if "station_id" not in [c[1] for c in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN station_id INTEGER DEFAULT {PRIMARY_STATION}")
+
+    # Statistik jendela simpan (baris lama: NULL, dashboard memakai snapshot)
+    cursor.execute("PRAGMA table_info(weather_data)")
+    cols = [c[1] for c in cursor.fetchall()]
+    for column, ddl in WINDOW_COLUMNS:
+        if column not in cols:
+            cursor.execute(f"ALTER TABLE weather_data ADD COLUMN {column} {ddl}")
+
+    # Transport stasiun utama (kolom lama com_port/baudrate tetap dipakai untuk serial)
+    cursor.execute("PRAGMA table_info(system_settings)")
+    cols = [c[1] for c in cursor.fetchall()]
+    for column, ddl in STATION_COLUMNS:
+        if column not in cols:
+            cursor.execute(f"ALTER TABLE system_settings ADD COLUMN {column} {ddl}")
+    # Mode profiling (off/stacks/full), dibaca ulang bersama pengaturan lain
+    if "profile_mode" not in cols:
+        cursor.execute("ALTER TABLE system_settings ADD COLUMN profile_mode TEXT DEFAULT 'off'")
+
+    # 5. Stasiun tambahan (sensor lain di port serial / gateway TCP)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stations (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            transport TEXT DEFAULT 'serial',
+            com_port TEXT,
+            baudrate INTEGER DEFAULT 9600,
+            host TEXT,
+            tcp_port INTEGER DEFAULT 502,
+            slave_id INTEGER DEFAULT 1,
+            pipeline_depth INTEGER DEFAULT 1,
+            enabled INTEGER DEFAULT 1
+        )
+    ''')
+
+    # 6. Rollup hujan per jam (total + intensitas puncak 1 menit) dan baseline counter per stasiun
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rain_hourly (
+            station_id INTEGER,
+            hour DATETIME,
+            rain_mm REAL DEFAULT 0,
+            peak_intensity REAL DEFAULT 0,
+            PRIMARY KEY (station_id, hour)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rain_state (
+            station_id INTEGER PRIMARY KEY,
+            last_total REAL,
+            last_time REAL
+        )
+    ''')
+
+    # 7. Kompresi histori per kolom (deadband / swinging_door); kolom tanpa baris = off
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS compression_settings (
+            field TEXT PRIMARY KEY,
+            mode TEXT DEFAULT 'off',
+            tolerance REAL
+        )
+    ''')
     
     conn.commit()
     conn.close()
 
 def load_settings():
-    global PORT, BAUDRATE, READ_INTERVAL, DB_SAVE_INTERVAL
+    """Muat interval + daftar stasiun dari DB. Return True jika konfigurasi koneksi berubah"""
+    global PORT, BAUDRATE, READ_INTERVAL, DB_SAVE_INTERVAL, COMPRESSION
     try:
         conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT com_port, baudrate, poll_interval, save_interval FROM system_settings WHERE id = 1")
-        row = cursor.fetchone()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM system_settings WHERE id = 1").fetchone()
+        extra = conn.execute(
+            "SELECT * FROM stations WHERE enabled = 1 AND id != ? ORDER BY id", (PRIMARY_STATION,)
+        ).fetchall()
+        rain_state = {r["station_id"]: (r["last_total"], r["last_time"]) for r in conn.execute("SELECT * FROM rain_state")}
+        compression = {
+            r["field"]: (r["mode"], r["tolerance"]) for r in conn.execute("SELECT * FROM compression_settings")
+            if validate_compression(r["field"], r["mode"], r["tolerance"]) is None
+        }
         conn.close()
-        
-        if row:
-            new_port, new_baud, new_poll, new_save = row
-            changed = (PORT != new_port or BAUDRATE != new_baud)
-            PORT, BAUDRATE, READ_INTERVAL, DB_SAVE_INTERVAL = new_port, new_baud, new_poll, new_save
-            return changed
     except Exception as e:
         print(f"Gagal memuat pengaturan: {e}")
-    return False
+        return False
+
+    if row is None:
+        return False
+    PORT, BAUDRATE = row["com_port"], row["baudrate"]
+    READ_INTERVAL, DB_SAVE_INTERVAL = row["poll_interval"], row["save_interval"]
+    PROFILER.configure(row["profile_mode"])
+    configs = [station_from_row(row, PRIMARY_STATION, "Stasiun Utama")]
+    configs += [station_from_row(r, r["id"], r["name"]) for r in extra]
+    changed = apply_stations(configs)
+    if compression != COMPRESSION:
+        # Pengaturan kompresi berubah: semua stasiun mulai lagi dari baris penuh berikutnya
+        COMPRESSION = compression
+        for station in stations:
+            station.archive = HistoryCompressor(COMPRESSION)
+        print(f"[*] Kompresi histori: {', '.join(f'{c}={m}' for c, (m, _) in COMPRESSION.items()) or 'off'}")
+    # Stasiun baru melanjutkan counter hujan terakhir yang tersimpan (hujan selama poller mati ikut terhitung)
+    for station in stations:
+        if station.rain.last_total is None and station.id in rain_state:
+            station.rain.restore(*rain_state[station.id])
+    return changed
+
+def live_values(data):
+    return (
+        data["Wind Speed (m/s)"], data["Wind Direction (deg)"],
+        data["Temperature (degC)"], data["Humidity (%)"], data["Pressure (hPa)"],
+        data["Total Rain (mm)"], data.get("Radiation (W/m2)")
+    )
 
-def update_live_data(data, port_ok, sensor_ok):
-    """Update tabel LIVE dan STATUS secepat mungkin (Non-blocking I/O)"""
+def update_live_data(samples):
+    """Update tabel LIVE (satu baris per stasiun) dalam satu transaksi. samples: list (station_id, data)"""
     try:
         conn = sqlite3.connect(DB_NAME, timeout=1) # Timeout cepat agar tidak nge-lag
         cursor = conn.cursor()
         now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Update Status Sistem
-        cursor.execute('''
-            INSERT OR REPLACE INTO system_status (id, port_connected, sensor_responding, last_check)
-            VALUES (1, ?, ?, ?)
-        ''', (1 if port_ok else 0, 1 if sensor_ok else 0, now_str))
-        
-        # Update Data Live (Jika ada data)
-        if data:
-            cursor.execute('''
-                INSERT OR REPLACE INTO weather_live (
-                    id, timestamp, wind_speed, wind_direction, temperature, 
-                    humidity, pressure, rain_total
-                ) VALUES (1, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                now_str, data["Wind Speed (m/s)"], data["Wind Direction (deg)"],
-                data["Temperature (degC)"], data["Humidity (%)"], data["Pressure (hPa)"],
-                data["Total Rain (mm)"]
-            ))
-        
+        started = time.perf_counter()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO weather_live (
+                id, timestamp, wind_speed, wind_direction, temperature, 
+                humidity, pressure, rain_total, solar_radiation
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(station_id, now_str) + live_values(data) for station_id, data in samples])
         conn.commit()
+        DB_COMMIT.observe(time.perf_counter() - started, table="weather_live")
         conn.close()
     except Exception as e:
         # Jangan gunakan print biasa di loop cepat jika error terus menerus
-        pass
+        record_db_error("weather_live", e)
+        DROPPED_SAMPLES.inc(len(samples), reason="live_write")
+
+def save_status(station_id, port_ok, sensor_ok, state):
+    """Simpan status stasiun; dipanggil hanya saat status berubah"""
+    try:
+        conn = sqlite3.connect(DB_NAME, timeout=1)
+        started = time.perf_counter()
+        conn.execute('''
+            INSERT OR REPLACE INTO system_status (id, port_connected, sensor_responding, last_check, circuit_state)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (station_id, 1 if port_ok else 0, 1 if sensor_ok else 0, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), state))
+        conn.commit()
+        DB_COMMIT.observe(time.perf_counter() - started, table="system_status")
+        conn.close()
+    except Exception as e:
+        record_db_error("system_status", e)
+        print(f"Gagal simpan status: {e}")
 
-def save_to_history(data):
-    """Penyimpanan ke tabel histori (dilakukan berkala)"""
+def save_outage(station_id, started_at, ended_at, reason):
+    try:
+        conn = sqlite3.connect(DB_NAME, timeout=1)
+        conn.execute(
+            "INSERT INTO device_outages (station_id, started_at, ended_at, duration_s, reason) VALUES (?, ?, ?, ?, ?)",
+            (station_id,
+             datetime.fromtimestamp(started_at).strftime("%Y-%m-%d %H:%M:%S"),
+             datetime.fromtimestamp(ended_at).strftime("%Y-%m-%d %H:%M:%S"),
+             round(ended_at - started_at, 1), reason)
+        )
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Gagal simpan outage: {e}")
+
+def save_to_history(samples, rain=()):
+    """Penyimpanan ke tabel histori (dilakukan berkala). samples: list (station_id, data, statistik jendela[, waktu]).
+
+    waktu (epoch) hanya untuk titik belok kompresi yang ditulis terlambat satu tick; default sekarang.
+
+    rain: list (station_id, bucket per jam, counter terakhir, waktu counter) dari RainAccumulator.pending(),
+    ditulis dalam transaksi yang sama agar increment dan rollup tidak pernah selisih.
+    """
     try:
         conn = sqlite3.connect(DB_NAME)
         cursor = conn.cursor()
@@ -161,19 +412,36 @@ def save_to_history(data):
         query = '''
             INSERT INTO weather_data (
                 timestamp, wind_speed, wind_direction, temperature, 
-                humidity, pressure, rain_minute, rain_hour, rain_day, rain_total
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-        values = (
-            now_str, data["Wind Speed (m/s)"], data["Wind Direction (deg)"],
+                humidity, pressure, rain_minute, rain_hour, rain_day, rain_total,
+                solar_radiation, station_id, {}
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?{})
+        '''.format(", ".join(c for c, _ in WINDOW_COLUMNS), ", ?" * len(WINDOW_COLUMNS))
+        values = [(
+            datetime.fromtimestamp(at[0]).strftime("%Y-%m-%d %H:%M:%S") if at else now_str,
+            data["Wind Speed (m/s)"], data["Wind Direction (deg)"],
             data["Temperature (degC)"], data["Humidity (%)"], data["Pressure (hPa)"],
-            data["Minute Rain (mm)"], data["Hour Rain (mm)"], data["Day Rain (mm)"], data["Total Rain (mm)"]
+            data["Minute Rain (mm)"], data["Hour Rain (mm)"], data["Day Rain (mm)"], data["Total Rain (mm)"],
+            data.get("Radiation (W/m2)"), station_id
+        ) + tuple(stats.get(c) for c, _ in WINDOW_COLUMNS) for station_id, data, stats, *at in samples]
+        started = time.perf_counter()
+        cursor.executemany(query, values)
+        cursor.executemany('''
+            INSERT INTO rain_hourly (station_id, hour, rain_mm, peak_intensity) VALUES (?, ?, ?, ?)
+            ON CONFLICT (station_id, hour) DO UPDATE SET
+                rain_mm = rain_mm + excluded.rain_mm,
+                peak_intensity = MAX(peak_intensity, excluded.peak_intensity)
+        ''', [(station_id, hour, mm, peak) for station_id, hours, _, _ in rain for hour, mm, peak in hours])
+        cursor.executemany(
+            "INSERT OR REPLACE INTO rain_state (station_id, last_total, last_time) VALUES (?, ?, ?)",
+            [(station_id, total, ts) for station_id, _, total, ts in rain if total is not None]
         )
-        cursor.execute(query, values)
         conn.commit()
+        DB_COMMIT.observe(time.perf_counter() - started, table="weather_data")
         conn.close()
         return True
     except Exception as e:
+        record_db_error("weather_data", e)
+        DROPPED_SAMPLES.inc(len(samples), reason="history_write")
         print(f"Gagal simpan histori: {e}")
         return False
 
@@ -198,10 +466,11 @@ def decode_float32_from_registers(
     return struct.unpack(">f" if byte_order == "big" else "<f", packed)[0]
 
 
-def decode_dataset(values, byte_order: str, word_order: str):
+def decode_dataset(values, byte_order: str, word_order: str, register_map=None):
     data = {}
-    for i, field in enumerate(FIELDS):
-        idx = i * 2
+    if register_map is None:
+        register_map = REGISTER_MAP
+    for field, idx in register_map.items():
         val = decode_float32_from_registers(
             values[idx],
             values[idx + 1],
@@ -223,7 +492,7 @@ def score_dataset(data):
     return score
 
 
-def pick_best_dataset(values):
+def pick_best_dataset(values, register_map=None):
     combos = [
         ("big", "big"),
         ("big", "little"),
@@ -233,7 +502,7 @@ def pick_best_dataset(values):
     best = None
     best_score = -1
     for byte_order, word_order in combos:
-        data = decode_dataset(values, byte_order, word_order)
+        data = decode_dataset(values, byte_order, word_order, register_map)
         score = score_dataset(data)
         if score > best_score:
             best = (data, byte_order, word_order)
@@ -241,126 +510,902 @@ def pick_best_dataset(values):
     return best, best_score
 
 
-def build_client():
-    return ModbusSerialClient(
-        port=PORT,
-        baudrate=BAUDRATE,
-        parity="N",
-        stopbits=1,
-        bytesize=8,
-        timeout=2,
+def build_client(endpoint):
+    """Buat client pymodbus sesuai transport endpoint (transport, alamat, parameter)"""
+    transport, address, param = endpoint
+    if transport == "esp32":
+        # Bukan Modbus: ESP32 mengirim frame hasil decode lewat USB serial (ws600_esp32.py)
+        return Esp32Link(address, param)
+    # retries=0: retry diatur sendiri oleh read_block() agar tetap dalam budget polling
+    if transport == "serial":
+        return ModbusSerialClient(
+            port=address,
+            baudrate=param,
+            parity="N",
+            stopbits=1,
+            bytesize=8,
+            timeout=MAX_TIMEOUT,
+            retries=0,
+        )
+    return ModbusTcpClient(
+        host=address,
+        port=param,
+        framer=Framer.SOCKET if transport == "tcp" else Framer.RTU,
+        timeout=MAX_TIMEOUT,
+        retries=0,
     )
 
 
-def is_port_detected(port_name: str) -> bool:
-    return any(p.device.upper() == port_name.upper() for p in list_ports.comports())
+class LatencyTracker:
+    """Estimasi waktu respon perangkat (SRTT/RTTVAR ala RFC 6298) untuk timeout adaptif"""
 
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.backoff = 1.0
 
-def close_client():
-    global client
-    if client is not None:
+    def observe(self, rtt):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.backoff = 1.0
+
+    def timed_out(self):
+        self.backoff = min(self.backoff * 2, 8.0)
+
+    def timeout(self):
+        if self.srtt is None:
+            return MAX_TIMEOUT
+        rto = (self.srtt + 4 * self.rttvar) * self.backoff
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, rto))
+
+    def snapshot(self):
+        """Estimasi saat ini dalam ms (untuk benchmark/diagnostik)"""
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+        return {"srtt_ms": ms(self.srtt), "rttvar_ms": ms(self.rttvar), "backoff": self.backoff, "timeout_ms": ms(self.timeout())}
+
+
+class SampleWindow:
+    """Statistik streaming semua sampel di antara dua simpan histori (gaya WMO).
+
+    Arah rata-rata = rata-rata vektor satuan (aman di sekitar 0/360 derajat),
+    simpangan baku arah dengan metode Yamartino (satu lintasan), gust = kecepatan
+    sampel maksimum. Memori konstan berapa pun jumlah sampelnya.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.wind_count = 0
+        self.speed_sum = 0.0
+        self.speed_max = None
+        self.sin_sum = 0.0
+        self.cos_sum = 0.0
+        self.temp_min = None
+        self.temp_max = None
+
+    def add(self, data, flags=0):
+        """flags = qc_flags sampel; nilai yang ditandai QC tidak ikut statistik"""
+        self.count += 1
+        speed = data["Wind Speed (m/s)"]
+        direction = data["Wind Direction (deg)"]
+        if math.isfinite(speed) and math.isfinite(direction) and not flags & QC_WIND:
+            self.wind_count += 1
+            self.speed_sum += speed
+            self.speed_max = speed if self.speed_max is None else max(self.speed_max, speed)
+            rad = math.radians(direction)
+            self.sin_sum += math.sin(rad)
+            self.cos_sum += math.cos(rad)
+        temp = data["Temperature (degC)"]
+        if math.isfinite(temp) and not flags & QC_TEMPERATURE:
+            self.temp_min = temp if self.temp_min is None else min(self.temp_min, temp)
+            self.temp_max = temp if self.temp_max is None else max(self.temp_max, temp)
+
+    def summary(self):
+        stats = {"sample_count": self.count, "temp_min": self.temp_min, "temp_max": self.temp_max}
+        if self.wind_count:
+            n = self.wind_count
+            sin_avg, cos_avg = self.sin_sum / n, self.cos_sum / n
+            eps = math.sqrt(max(0.0, 1 - (sin_avg ** 2 + cos_avg ** 2)))
+            std = math.asin(eps) * (1 + (2 / math.sqrt(3) - 1) * eps ** 3)
+            stats.update(
+                wind_speed_avg=round(self.speed_sum / n, 3),
+                wind_gust=self.speed_max,
+                wind_dir_avg=round(math.degrees(math.atan2(sin_avg, cos_avg)) % 360, 1) % 360,
+                wind_dir_std=round(math.degrees(std), 1),
+            )
+        return stats
+
+
+def rain_hour(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:00:00")
+
+
+class RainAccumulator:
+    """Ubah counter rain_total sensor menjadi increment hujan yang bisa dijumlahkan.
+
+    Counter turun = reset sensor (counter mulai lagi dari 0, increment = nilai baru)
+    atau rollover jika RAIN_ROLLOVER diketahui. Kenaikan lebih cepat dari
+    RAIN_MAX_RATE dibuang sebagai glitch; baseline baru dipindah (tanpa menghitung
+    hujan) hanya jika RAIN_REBASE_AFTER glitch berturut-turut saling konsisten, yaitu
+    tiap bacaan naik tidak lebih dari RAIN_MAX_RATE (+ RAIN_SLACK) dari bacaan
+    sebelumnya dan tidak turun lebih dari RAIN_SLACK. Glitch acak tidak memindah
+    baseline. Increment dikumpulkan per jam (mm + intensitas
+    puncak 1 menit dalam mm/jam) sampai ditulis bersama histori.
+    """
+
+    def __init__(self):
+        self.last_total = None
+        self.last_time = None
+        self.suspects = []  # [(total, ts)] glitch berturut-turut yang saling konsisten
+        self.minute = None  # [awal menit (epoch), mm]
+        self.clear()
+
+    def clear(self):
+        self.window_mm = 0.0
+        self.hours = {}  # 'YYYY-MM-DD HH:00:00' -> [mm, intensitas puncak mm/jam]
+
+    def restore(self, total, ts):
+        self.last_total, self.last_time = total, ts
+        self.suspects = []
+
+    def consistent(self, total, ts):
+        """Apakah bacaan glitch ini cocok dengan glitch sebelumnya (counter baru yang sama)"""
+        if not self.suspects:
+            return True
+        prev_total, prev_time = self.suspects[-1]
+        limit = RAIN_MAX_RATE * max(0.0, ts - prev_time) / 3600 + RAIN_SLACK
+        return -RAIN_SLACK <= total - prev_total <= limit
+
+    def increment(self, total, ts):
+        if self.last_total is None:
+            return 0.0
+        delta = total - self.last_total
+        if delta < 0:
+            if RAIN_ROLLOVER and self.last_total >= RAIN_ROLLOVER / 2:
+                delta += RAIN_ROLLOVER
+                RAIN_EVENTS.inc(kind="rollover")
+            else:
+                delta = total
+                RAIN_EVENTS.inc(kind="reset")
+        limit = RAIN_MAX_RATE * max(0.0, ts - self.last_time) / 3600 + RAIN_SLACK
+        if delta > limit:
+            return None
+        return delta
+
+    def add(self, total, ts):
+        """Proses satu sampel rain_total. Return increment (mm) yang dihitung"""
+        if total is None or not math.isfinite(total):
+            return 0.0
+        delta = self.increment(total, ts)
+        if delta is None:
+            RAIN_EVENTS.inc(kind="glitch")
+            if not self.consistent(total, ts):
+                self.suspects = []  # glitch acak, bukan counter baru: hitung ulang dari bacaan ini
+            self.suspects.append((total, ts))
+            if len(self.suspects) < RAIN_REBASE_AFTER:
+                return 0.0  # baseline lama dipertahankan, kemungkinan besar salah baca
+            RAIN_EVENTS.inc(kind="rebase")
+            delta = 0.0
+        self.suspects = []
+        gap = ts - self.last_time if self.last_time is not None else 0.0
+        self.last_total, self.last_time = total, ts
+
+        hour = self.hours.setdefault(rain_hour(ts), [0.0, 0.0])
+        hour[0] += delta
+        self.window_mm += delta
+        if gap > 60:
+            # Jeda panjang (poller/sensor mati): intensitas dirata-rata sepanjang jeda
+            self.close_minute()
+            hour[1] = max(hour[1], delta / gap * 3600)
+            return delta
+        minute = ts // 60 * 60
+        if self.minute is not None and self.minute[0] != minute:
+            self.close_minute()
+        if self.minute is None:
+            self.minute = [minute, 0.0]
+        self.minute[1] += delta
+        return delta
+
+    def close_minute(self):
+        if self.minute is None:
+            return
+        start, mm = self.minute
+        hour = self.hours.setdefault(rain_hour(start), [0.0, 0.0])
+        hour[1] = max(hour[1], mm * 60)
+        self.minute = None
+
+    def pending(self):
+        """Return (mm sejak simpan terakhir, [(jam, mm, intensitas puncak)]) yang belum ditulis"""
+        hours = [(hour, round(mm, 3), round(peak, 1)) for hour, (mm, peak) in self.hours.items()]
+        return round(self.window_mm, 3), hours
+
+
+class DeviceHealth:
+    """State machine kesehatan sensor: healthy -> degraded -> open (circuit breaker).
+
+    Saat open, sensor tidak di-poll sama sekali sampai waktu probe berikutnya
+    (backoff eksponensial). Probe yang berhasil (half-open) mengembalikan ke healthy.
+    """
+
+    HEALTHY, DEGRADED, OPEN = "healthy", "degraded", "open"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.state = self.HEALTHY
+        self.failures = 0
+        self.backoff = RECONNECT_BACKOFF_MIN
+        self.next_probe = 0
+        self.outage_start = None
+        self.outage_reason = None
+        self.port_ok = True
+
+    def should_poll(self, now):
+        return self.state != self.OPEN or now >= self.next_probe
+
+    def record_success(self, now):
+        """Return (mulai, alasan) outage jika baru pulih dari circuit terbuka, selain itu None"""
+        outage = None
+        if self.state == self.OPEN:
+            outage = (self.outage_start, self.outage_reason)
+        self.reset()
+        return outage
+
+    def record_failure(self, now, port_ok):
+        self.failures += 1
+        self.port_ok = port_ok
+        if self.outage_start is None:
+            self.outage_start = now
+            self.outage_reason = "port" if not port_ok else "sensor"
+        if self.state == self.OPEN:
+            # Probe half-open gagal: perpanjang jeda
+            self.backoff = min(self.backoff * 2, RECONNECT_BACKOFF_MAX)
+            self.next_probe = now + self.backoff
+        elif self.failures >= FAILURES_TO_OPEN:
+            self.state = self.OPEN
+            self.next_probe = now + self.backoff
+        else:
+            self.state = self.DEGRADED
+
+
+# ==============================
+# STASIUN & POOL KONEKSI
+# ==============================
+class Station:
+    """Satu sensor WS-600 (slave Modbus) beserta state akuisisinya sendiri"""
+
+    def __init__(self, station_id, name=None, transport="serial", com_port=None, baudrate=None,
+                 host=None, tcp_port=None, slave_id=None, pipeline_depth=1):
+        self.id = station_id
+        self.name = name or f"Stasiun {station_id}"
+        self.transport = transport if transport in TRANSPORTS else "serial"
+        self.com_port = com_port or PORT
+        self.baudrate = int(baudrate or BAUDRATE)
+        self.host = host or ""
+        self.tcp_port = int(tcp_port or TCP_PORT)
+        self.slave_id = SLAVE_ID if slave_id is None else int(slave_id)
+        self.pipeline_depth = max(1, int(pipeline_depth or 1))
+        self.register_base = None
+        self.latency = LatencyTracker()
+        self.disabled_channels = set()
+        self.health = DeviceHealth()
+        self.last_status = None
+        self.status_time = None  # epoch perubahan status terakhir (last_check system_status)
+        self.last_sample_time = None
+        self.last_db_save = 0
+        self.window = SampleWindow()
+        self.rain = RainAccumulator()
+        self.qc = QualityChecker()
+        self.qc_flags = None  # flag sampel terbaru (snapshot yang ditulis ke histori)
+        self.archive = HistoryCompressor(COMPRESSION)
+
+    @property
+    def endpoint(self):
+        """Kunci koneksi fisik: semua slave dengan endpoint sama berbagi satu koneksi"""
+        if self.transport in ("serial", "esp32"):
+            return (self.transport, self.com_port, self.baudrate)
+        return (self.transport, self.host, self.tcp_port)
+
+    @property
+    def config(self):
+        return (self.endpoint, self.slave_id, self.pipeline_depth)
+
+    def __str__(self):
+        return f"#{self.id} {self.name}"
+
+
+def station_from_row(row, station_id, name):
+    return Station(
+        station_id, name,
+        transport=row["transport"], com_port=row["com_port"], baudrate=row["baudrate"],
+        host=row["host"], tcp_port=row["tcp_port"], slave_id=row["slave_id"],
+        pipeline_depth=row["pipeline_depth"],
+    )
+
+
+class Gateway:
+    """Koneksi persisten ke satu port serial / gateway TCP, dipakai bersama semua slave di belakangnya"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.transport = endpoint[0]
+        self.client = None
+        self.latency = LatencyTracker()  # waktu layanan per request saat pipelining
+        self.tid = 0
+
+    def port_detected(self):
+        return self.transport not in ("serial", "esp32") or is_port_detected(self.endpoint[1])
+
+    def connect(self):
+        if self.client is None:
+            self.client = build_client(self.endpoint)
         try:
-            client.close()
+            if not self.client.connected:
+                return self.client.connect()
+            return True
         except Exception:
-            pass
-    client = None
+            self.close()
+            return False
 
+    def close(self, reset_stations=True):
+        if self.client is not None:
+            try:
+                self.client.close()
+            except Exception:
+                pass
+        self.client = None
+        if not reset_stations:
+            return
+        # Setelah reconnect bisa saja sensor lain yang terpasang: deteksi alamat awal ulang
+        for station in stations:
+            if station.endpoint == self.endpoint:
+                station.register_base = None
 
-def ensure_connection() -> bool:
-    global client
-    if not is_port_detected(PORT):
-        close_client()
-        return False
-    if client is None:
-        client = build_client()
-    try:
-        if not client.connected:
-            return client.connect()
-        return True
-    except Exception:
-        close_client()
-        return False
+    def set_timeout(self, timeout):
+        self.client.comm_params.timeout_connect = timeout
+        if self.transport == "serial" and getattr(self.client, "socket", None) is not None:
+            self.client.socket.timeout = timeout
 
-def read_ws600():
-    # Cek Port
-    port_ok = is_port_detected(PORT)
-    if not port_ok:
-        update_live_data(None, False, False)
-        close_client()
-        return None
 
-    # Cek Koneksi Modbus
-    if not ensure_connection():
-        update_live_data(None, True, False)
-        return None
+def get_gateway(endpoint):
+    gateway = gateways.get(endpoint)
+    if gateway is None:
+        gateway = gateways[endpoint] = Gateway(endpoint)
+    return gateway
 
-    try:
-        result = client.read_holding_registers(
-            address=START_ADDRESS,
-            count=REGISTER_COUNT,
-            slave=SLAVE_ID, # Perbaikan: Gunakan 'slave' untuk v3.x
-        )
-        
+
+def close_client():
+    """Tutup semua koneksi di pool (setting berubah / program berhenti)"""
+    for gateway in list(gateways.values()):
+        gateway.close()
+    gateways.clear()
+
+
+def apply_stations(configs):
+    """Ganti daftar stasiun; stasiun yang konfigurasinya sama mempertahankan state-nya"""
+    global stations
+    current = {s.id: s for s in stations}
+    updated = []
+    for station in configs:
+        old = current.get(station.id)
+        if old is not None and old.config == station.config:
+            old.name = station.name
+            station = old
+        updated.append(station)
+    changed = [s.id for s in updated] != [s.id for s in stations] or any(
+        s is not current.get(s.id) for s in updated
+    )
+    stations = updated
+    used = {s.endpoint for s in stations}
+    for endpoint in list(gateways):
+        if endpoint not in used:
+            gateways.pop(endpoint).close()
+    return changed
+
+
+# ==============================
+# TRANSAKSI MODBUS
+# ==============================
+def plan_blocks(register_map):
+    """Gabungkan channel menjadi sesedikit mungkin blok baca yang berurutan.
+
+    Hasil: list (offset_awal, jumlah_register). Celah kecil ikut dibaca karena
+    satu frame yang sedikit lebih panjang lebih murah daripada transaksi baru.
+    """
+    blocks = []
+    for offset in sorted(set(register_map.values())):
+        end = offset + 2
+        if blocks:
+            start, count = blocks[-1]
+            gap = offset - (start + count)
+            if gap <= MAX_REGISTER_GAP and end - start <= MAX_BLOCK_REGISTERS:
+                blocks[-1] = (start, max(count, end - start))
+                continue
+        blocks.append((offset, 2))
+    return blocks
+
+
+def read_block(station, gateway, address, count, deadline):
+    """Baca satu blok dengan retry + backoff selama masih dalam budget polling.
+
+    Return (registers, illegal_address). registers None jika gagal.
+    """
+    latency = station.latency
+    delay = RETRY_BACKOFF
+    for attempt in range(MAX_RETRIES + 1):
+        timeout = latency.timeout()
+        if attempt and time.time() + delay + timeout > deadline:
+            break
+        if attempt:
+            time.sleep(delay)
+            delay *= 2
+        if not gateway.connect():
+            break
+        gateway.set_timeout(timeout)
+        started = time.time()
+        try:
+            result = gateway.client.read_holding_registers(
+                address=address,
+                count=count,
+                slave=station.slave_id,
+            )
+        except ModbusException:
+            MODBUS_ERRORS.inc(kind="io")
+            latency.timed_out()
+            continue
         if result.isError():
-            update_live_data(None, True, False)
+            # Exception code 2 = ILLEGAL DATA ADDRESS: register tidak ada, retry percuma
+            if getattr(result, "exception_code", None) == 2:
+                MODBUS_ERRORS.inc(kind="illegal_address")
+                return None, True
+            # pymodbus membuang frame CRC rusak, sehingga terlihat sebagai timeout
+            MODBUS_ERRORS.inc(kind="exception" if getattr(result, "exception_code", None) else "timeout")
+            latency.timed_out()
+            continue
+        if len(getattr(result, "registers", [])) < count:
+            MODBUS_ERRORS.inc(kind="short_frame")
+            latency.timed_out()
+            continue
+        rtt = time.time() - started
+        MODBUS_RTT.observe(rtt)
+        latency.observe(rtt)
+        return result.registers, False
+    return None, False
+
+
+def active_register_map(station):
+    register_map = dict(REGISTER_MAP)
+    if READ_RADIATION:
+        register_map.update({f: o for f, o in OPTIONAL_CHANNELS.items() if f not in station.disabled_channels})
+    return register_map
+
+
+def read_register_map(station, gateway, deadline):
+    """Baca semua channel aktif sesuai rencana blok; return (dict offset->register, register_map) atau None"""
+    register_map = active_register_map(station)
+    values = {}
+    for offset, count in plan_blocks(register_map):
+        registers, illegal = read_block(station, gateway, station.register_base + offset, count, deadline)
+        if illegal:
+            # Channel opsional tidak didukung perangkat ini: nonaktifkan lalu coba ulang tanpa channel itu
+            optional = [f for f, o in OPTIONAL_CHANNELS.items() if offset <= o < offset + count and f in register_map]
+            if optional:
+                station.disabled_channels.update(optional)
+                print(f"[!] {station}: channel tidak didukung sensor, dinonaktifkan: {', '.join(optional)}")
+                return read_register_map(station, gateway, deadline)
             return None
+        if registers is None:
+            return None
+        for i, reg in enumerate(registers):
+            values[offset + i] = reg
+    return values, register_map
 
-        update_live_data(None, True, True) # Sinyal OK
-        values = result.registers
-        
+
+def detect_register_base(station, gateway, deadline):
+    """Pilih alamat awal (0 atau 1) dengan skor decoding terbaik; dilakukan sekali per koneksi"""
+    best_address, best_score = START_ADDRESS, -1
+    for address in START_ADDRESS_CANDIDATES:
+        registers, illegal = read_block(station, gateway, address, REGISTER_COUNT, deadline)
+        if illegal:
+            # Register di alamat ini tidak ada (unit tanpa pergeseran alamat): bukan kandidat
+            continue
+        if registers is None:
+            # Semua kandidat harus terbaca agar perbandingannya adil; ulangi di siklus berikutnya
+            return False
+        _, score = pick_best_dataset(registers)
+        if score > best_score:
+            best_address, best_score = address, score
+    if best_score < 0:
+        return False
+    station.register_base = best_address
+    return True
+
+
+def decode_values(values, register_map):
+    with DECODE_TIME.time():
         if AUTO_DETECT_ENDIAN:
-            picked, _ = pick_best_dataset(values)
-            data, _, _ = picked
-        else:
-            data = decode_dataset(values, BYTE_ORDER, WORD_ORDER)
-            
-        return data
+            picked, _ = pick_best_dataset(values, register_map)
+            return picked[0]
+        return decode_dataset(values, BYTE_ORDER, WORD_ORDER, register_map)
+
 
-    except Exception as err:
-        update_live_data(None, True, False)
+def read_station(station, gateway, deadline):
+    """Baca satu stasiun lewat gateway yang sudah tersambung. Return data atau None.
+
+    Hanya error komunikasi (pymodbus, serial/socket) yang berarti sensor tidak menjawab;
+    error lain (bug decode dsb.) diteruskan agar tidak tercatat sebagai timeout sensor.
+    """
+    try:
+        if station.register_base is None and not detect_register_base(station, gateway, deadline):
+            return None
+        read = read_register_map(station, gateway, deadline)
+    except (ModbusException, OSError):  # SerialException dan timeout socket turunan OSError
+        MODBUS_ERRORS.inc(kind="io")
+        gateway.close()
+        return None
+    if read is None:
         return None
+    return decode_values(*read)
+
+
+def read_pipelined(gateway, requests, depth, deadline):
+    """Modbus TCP: kirim beberapa request FC03 tanpa menunggu respon sebelumnya.
+
+    requests: list (slave, address, count). Maksimal `depth` request menunggu
+    jawaban sekaligus; respon dicocokkan lewat transaction id MBAP. Return list
+    register (atau None jika gagal) sesuai urutan request.
+    """
+    sock = gateway.client.socket
+    sock.setblocking(True)
+    results = [None] * len(requests)
+    pending = {}  # transaction id -> index request
+    buf = b""
+    sent = 0
+    last_progress = time.time()
+    lost = 0
+    try:
+        while sent < len(requests) or pending:
+            while sent < len(requests) and len(pending) < depth:
+                slave, address, count = requests[sent]
+                # Ruang tid atas (0x8000-0xFFFF) agar tidak bentrok dengan transaksi pymodbus
+                gateway.tid = (gateway.tid + 1) & 0x7FFF
+                tid = 0x8000 | gateway.tid
+                sock.sendall(struct.pack(">HHHBBHH", tid, 0, 6, slave, 3, address, count))
+                pending[tid] = sent
+                sent += 1
+            now = time.time()
+            if now >= deadline:
+                break
+            wait = min(deadline, last_progress + gateway.latency.timeout()) - now
+            ready, _, _ = select.select([sock], [], [], max(0, wait))
+            if not ready:
+                if time.time() >= deadline:
+                    break
+                # Tidak ada respon dalam satu timeout: request tertua dianggap hilang (slave mati)
+                pending.pop(min(pending, key=pending.get))
+                gateway.latency.timed_out()
+                lost += 1
+                last_progress = time.time()
+                continue
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("gateway menutup koneksi")
+            buf += chunk
+            while len(buf) >= 7:
+                tid, _, length = struct.unpack(">HHH", buf[:6])
+                if len(buf) < 6 + length:
+                    break
+                pdu, buf = buf[7:6 + length], buf[6 + length:]
+                idx = pending.pop(tid, None)
+                if idx is None:
+                    continue  # respon terlambat dari request yang sudah dianggap hilang
+                now = time.time()
+                gateway.latency.observe(now - last_progress)
+                last_progress = now
+                count = requests[idx][2]
+                if pdu[:1] == b"\x03" and len(pdu) >= 2 + 2 * count:
+                    results[idx] = list(struct.unpack(f">{count}H", pdu[2:2 + 2 * count]))
+                else:
+                    MODBUS_ERRORS.inc(kind="exception" if pdu[:1] and pdu[0] & 0x80 else "short_frame")
+    except (OSError, ConnectionError, struct.error):
+        MODBUS_ERRORS.inc(kind="io")
+        gateway.close(reset_stations=False)
+        return results
+    if pending or lost:
+        MODBUS_ERRORS.inc(len(pending) + lost, kind="timeout")
+        # Respon terlambat bisa mengacaukan transaksi pymodbus berikutnya: mulai koneksi baru
+        gateway.close(reset_stations=False)
+    return results
+
+
+def poll_pipelined(gateway, station_list, depth, deadline):
+    """Baca stasiun yang alamat awalnya sudah diketahui dalam satu pipeline.
+
+    Return (stasiun yang perlu dibaca biasa, list hasil (station, data, port_ok)).
+    """
+    ready = [s for s in station_list if s.register_base is not None]
+    rest = [s for s in station_list if s.register_base is None]
+    if len(ready) < 2:
+        return station_list, []
+
+    requests, index = [], []
+    for station in ready:
+        register_map = active_register_map(station)
+        for offset, count in plan_blocks(register_map):
+            requests.append((station.slave_id, station.register_base + offset, count))
+            index.append((station, offset, register_map))
+
+    collected = {}
+    failed = set()
+    for (station, offset, register_map), registers in zip(index, read_pipelined(gateway, requests, depth, deadline)):
+        if registers is None:
+            failed.add(station.id)
+            continue
+        values = collected.setdefault(station.id, ({}, register_map))[0]
+        for i, reg in enumerate(registers):
+            values[offset + i] = reg
+
+    results = []
+    for station in ready:
+        if station.id in failed:
+            # Dibaca ulang satu per satu (dengan retry dan deteksi channel yang tidak didukung)
+            rest.append(station)
+            continue
+        results.append((station, decode_values(*collected[station.id]), True))
+    return rest, results
+
+
+def esp32_data(values):
+    """Nilai frame $WS -> dict data seperti hasil decode Modbus (channel kosong = NaN, radiasi opsional)"""
+    data = {field: math.nan if v is None else v for field, v in zip(FIELDS, values)}
+    if values[len(FIELDS)] is not None:
+        data["Radiation (W/m2)"] = values[len(FIELDS)]
+    return data
+
+
+def poll_esp32(gateway, station_list, now):
+    """Kuras frame dari ESP32 di satu port USB. Return list (station, data, port_ok, waktu sampel).
+
+    Satu stasiun bisa mendapat beberapa sampel per siklus (ESP32 mengirim lebih cepat dari
+    READ_INTERVAL); waktu sampel diperkirakan dari selisih millis() terhadap frame terbaru.
+    """
+    link = gateway.client
+    try:
+        frames, bad = link.read_frames()
+    except Exception as e:
+        print(f"[!] ESP32 {gateway.endpoint[1]} terputus: {e}")
+        gateway.close()
+        return [(s, None, False) for s in station_list]
+    if bad:
+        DROPPED_SAMPLES.inc(bad, reason="esp32_crc")
+
+    # Semua stasiun di port ini, termasuk yang circuit-nya terbuka: frame yang datang = sensor pulih
+    nodes = {s.slave_id: s for s in stations if s.endpoint == gateway.endpoint}
+    newest = {}
+    for frame in frames:
+        newest[frame.node] = frame.ms
+    results = []
+    for frame in frames:
+        station = nodes.get(frame.node)
+        if station is None:
+            DROPPED_SAMPLES.inc(reason="esp32_unknown_node")
+            continue
+        accepted, lost = link.sequence.check(frame)
+        if lost:
+            DROPPED_SAMPLES.inc(lost, reason="esp32_gap")
+        if not accepted:
+            continue
+        age = (newest[frame.node] - frame.ms) / 1000
+        at = now - age if 0 <= age <= ESP32_STALE else now
+        link.last_seen[frame.node] = now
+        results.append((station, esp32_data(frame.values) if frame.kind == "WS" else None, True, at))
+
+    # Node yang diam terlalu lama (sensor/ESP32 hang) dicatat gagal sekali per siklus
+    for station in station_list:
+        if station.slave_id not in newest and now - link.last_seen.get(station.slave_id, link.opened_at) > ESP32_STALE:
+            results.append((station, None, True))
+    return results
+
+
+def poll_gateway(gateway, station_list, deadline):
+    """Poll semua stasiun di belakang satu port/gateway. Return list (station, data, port_ok[, waktu sampel])"""
+    # Cek Port
+    if not gateway.port_detected():
+        gateway.close()
+        return [(s, None, False) for s in station_list]
+
+    # Cek Koneksi Modbus
+    if not gateway.connect():
+        return [(s, None, True) for s in station_list]
+    if gateway.transport == "esp32":
+        return poll_esp32(gateway, station_list, time.time())
+
+    # Stasiun yang paling lama tidak terbaca didahulukan, agar budget yang habis tidak selalu mengorbankan stasiun yang sama
+    pending = sorted(station_list, key=lambda s: s.last_sample_time or 0)
+    results = []
+    depth = min(s.pipeline_depth for s in station_list)
+    if gateway.transport == "tcp" and depth > 1:
+        pending, results = poll_pipelined(gateway, pending, depth, deadline)
+
+    for station in pending:
+        if time.time() >= deadline:
+            DROPPED_SAMPLES.inc(reason="budget")
+            continue
+        results.append((station, read_station(station, gateway, deadline), True))
+    return results
+
+
+def is_port_detected(port_name: str) -> bool:
+    # URL pyserial (socket://, rfc2217://) tidak muncul di daftar COM port
+    if "://" in port_name:
+        return True
+    # pty (simulator ESP32 di Linux) juga tidak terdaftar sebagai COM port
+    if port_name.startswith("/dev/pts/"):
+        return os.path.exists(port_name)
+    return any(p.device.upper() == port_name.upper() for p in list_ports.comports())
+
 
 # =============================================
 # MAIN LOOP (FAST SAMPLING)
 # =============================================
-init_db()
-client = None
-last_db_save = 0
+stations = []
+gateways = {}        # endpoint -> Gateway (pool koneksi persisten)
+gateway_executor = None
+live_feed = None
 last_settings_check = 0
 
-print(f"[*] WS-600 High-Speed Service Started")
-print(f"[*] Port: {PORT}, Sampling: Setiap {READ_INTERVAL}s")
 
-try:
-    while True:
-        loop_start = time.time()
-        
-        # 1. Cek perubahan setting (Port/Interval) secara berkala
-        if loop_start - last_settings_check >= CHECK_SETTINGS_INTERVAL:
-            if load_settings():
-                print(f"[!] Pengaturan Berubah: Port {PORT}, Sampling {READ_INTERVAL}s")
-                close_client()
-            last_settings_check = loop_start
-
-        # 2. Baca Sensor
-        data = read_ws600()
-        
+def record_result(station, data, port_ok, now):
+    """Update state kesehatan + status DB satu stasiun setelah dibaca"""
+    health = station.health
+    prev_state = health.state
+    if data:
+        SAMPLES.inc()
+        if station.last_sample_time is not None:
+            SAMPLE_GAP.observe(now - station.last_sample_time)
+        station.last_sample_time = now
+        outage = health.record_success(now)
+        if outage is not None:
+            started_at, reason = outage
+            save_outage(station.id, started_at, now, reason)
+            print(f"[+] {station}: sensor kembali normal setelah {now - started_at:.0f}s")
+    else:
+        DROPPED_SAMPLES.inc(reason="no_port" if not port_ok else "no_response")
+        health.record_failure(now, port_ok)
+        if health.state != prev_state:
+            print(f"[!] {station}: {'Cek USB TTL' if not port_ok else 'Cek Wiring Sensor'} ({health.state})")
+
+    # Status hanya ditulis ke DB saat berubah. sensor_responding = hasil poll terakhir (seperti semula);
+    # keadaan circuit breaker hanya lewat kolom circuit_state
+    status = (health.port_ok, bool(data), health.state)
+    if status != station.last_status:
+        save_status(station.id, *status)
+        station.last_status = status
+        station.status_time = time.time()
+
+
+def poll_once(loop_start):
+    """Satu siklus akuisisi semua stasiun. Return list (station, data) yang berhasil dibaca"""
+    global gateway_executor
+    deadline = loop_start + READ_INTERVAL * POLL_BUDGET
+
+    # Kelompokkan per port/gateway (stasiun dengan circuit terbuka dilewati)
+    groups = {}
+    for station in stations:
+        if station.health.should_poll(loop_start):
+            groups.setdefault(station.endpoint, []).append(station)
+    jobs = [(get_gateway(endpoint), group) for endpoint, group in groups.items()]
+
+    # Tiap gateway di thread sendiri; satu gateway saja langsung di thread utama
+    if len(jobs) > 1:
+        if gateway_executor is None:
+            gateway_executor = ThreadPoolExecutor(max_workers=GATEWAY_WORKERS, thread_name_prefix="gateway")
+        futures = [gateway_executor.submit(poll_gateway, gateway, group, deadline) for gateway, group in jobs]
+        results = [r for future in futures for r in future.result()]
+    else:
+        results = [r for gateway, group in jobs for r in poll_gateway(gateway, group, deadline)]
+
+    # Semua sampel masuk statistik jendela & hujan; live data dan histori memakai sampel terbaru per stasiun
+    latest = {}
+    for station, data, port_ok, *at in results:
+        now = at[0] if at else loop_start
+        record_result(station, data, port_ok, now)
         if data:
-            # 3. Update Live Dashboard (Cepat)
-            update_live_data(data, True, True)
+            station.qc_flags = station.qc.check(now, [data.get(QC_SOURCE[c]) for c in QC_FIELDS])
+            station.window.add(data, station.qc_flags)
+            station.rain.add(data["Total Rain (mm)"], now)
+            latest[station.id] = (station, data)
+    samples = list(latest.values())
+
+    # Semua slave di satu gateway mati: lepas koneksinya, dibuka lagi saat probe berikutnya
+    for gateway, group in jobs:
+        if all(s.health.state == DeviceHealth.OPEN for s in stations if s.endpoint == gateway.endpoint):
+            gateway.close()
+    CIRCUIT_STATE.set(sum(1 for s in stations if s.health.state == DeviceHealth.OPEN))
+    if live_feed is not None:
+        # Status dikirim setiap siklus (murah, UDP): worker dashboard yang baru start langsung mendapatkannya
+        live_feed.send_status([(s.id, s.status_time, *s.last_status) for s in stations if s.last_status is not None])
+
+    if samples:
+        # Update Live Dashboard (Cepat, satu transaksi untuk semua stasiun)
+        update_live_data([(s.id, data) for s, data in samples])
+        if live_feed is not None:
+            live_feed.send([(s.id, loop_start, live_values(data)) for s, data in samples])
+
+        # Simpan Histori (Berkala): snapshot + statistik semua sampel sejak baris tersimpan terakhir.
+        # Dengan kompresi tick bisa dilewati (statistik & hujan terus terkumpul), atau tick sebelumnya
+        # ikut ditulis sebagai titik belok swinging door
+        due = [(s, data) for s, data in samples if loop_start - s.last_db_save >= DB_SAVE_INTERVAL]
+        history, rain, written = [], [], []
+        for s, data in due:
+            values = [data.get(ARCHIVE_SOURCE[c]) for c in ARCHIVE_FIELDS]
+            for at, (snapshot, flags) in s.archive.offer(loop_start, values, (data, s.qc_flags)):
+                if at != loop_start:
+                    # Titik belok: statistiknya tetap di baris berikutnya (sample_count 0 = tanpa bobot)
+                    history.append((s.id, snapshot, {"sample_count": 0, "rain_increment": 0.0, "qc_flags": flags}, at))
+                    continue
+                rain_mm, hours = s.rain.pending()
+                history.append((s.id, data, dict(s.window.summary(), rain_increment=rain_mm, qc_flags=flags)))
+                rain.append((s.id, hours, s.rain.last_total, s.rain.last_time))
+                written.append(s)
+        if not history or save_to_history(history, rain):
+            if history:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Data saved to history ({len(history)} baris, {len(due)} stasiun).")
+            for s, _ in due:
+                s.last_db_save = loop_start
+            for s in written:
+                s.window.reset()
+                s.rain.clear()
+        else:
+            # Gagal tulis: tick berikutnya ditulis penuh, statistik & hujan tetap terkumpul
+            for s, _ in due:
+                s.archive.reset()
+    return samples
+
+
+def main():
+    global last_settings_check, live_feed
+    init_db()
+    load_settings()
+    last_settings_check = time.time()
+
+    print(f"[*] WS-600 High-Speed Service Started")
+    print(f"[*] {len(stations)} stasiun di {len({s.endpoint for s in stations})} port/gateway, Sampling: Setiap {READ_INTERVAL}s")
+    if METRICS_PORT:
+        start_http_exporter(METRICS_PORT)
+    if LIVE_FEED:
+        live_feed = LiveFeedSender(port=LIVE_FEED_PORT)
+
+    try:
+        while True:
+            loop_start = time.time()
             
-            # 4. Simpan Histori (Berkala)
-            if loop_start - last_db_save >= DB_SAVE_INTERVAL:
-                if save_to_history(data):
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Data saved to history.")
-                    last_db_save = loop_start
-        
-        # 5. Precise Timing
-        elapsed = time.time() - loop_start
-        wait_time = max(0, READ_INTERVAL - elapsed)
-        time.sleep(wait_time)
-
-except KeyboardInterrupt:
-    print("\n[!] Program dihentikan pengguna.")
-finally:
-    close_client()
+            # 1. Cek perubahan setting (Port/Interval/Stasiun) secara berkala
+            if loop_start - last_settings_check >= CHECK_SETTINGS_INTERVAL:
+                if load_settings():
+                    print(f"[!] Pengaturan Berubah: {len(stations)} stasiun, Sampling {READ_INTERVAL}s")
+                last_settings_check = loop_start
+
+            # 2. Baca sensor + simpan
+            poll_once(loop_start)
+            
+            # 3. Precise Timing
+            elapsed = time.time() - loop_start
+            wait_time = max(0, READ_INTERVAL - elapsed)
+            time.sleep(wait_time)
+
+    except KeyboardInterrupt:
+        print("\n[!] Program dihentikan pengguna.")
+    finally:
+        close_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,7 @@ echo Press Ctrl+C to stop the dashboard.
 echo ==========================================
 echo.
 
-:: Run the dashboard
+:: Run the dashboard (set WS600_STARTUP_TIMING=1 to print startup phase timings)
 python main.py
 
 if %errorlevel% neq 0 (
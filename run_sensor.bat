@@ -5,8 +5,9 @@ echo    Starting WS600 Sensor Collector...
 echo ==========================================
 echo.
 
-:: Change to the device program directory
-cd /d "%~dp0Device-program"
+:: Run the main poller from the project root (same one start_system.bat starts;
+:: it uses ws600_data.db in this folder)
+cd /d "%~dp0"
 
 :: Check for python
 where python >nul 2>nul
@@ -18,10 +19,10 @@ if %errorlevel% neq 0 (
 
 :: Check/Install dependencies
 echo Checking dependencies...
-python -c "import pymodbus, serial" 2>nul
+python -c "import pymodbus, serial, numpy" 2>nul
 if %errorlevel% neq 0 (
     echo [INFO] Installing required libraries...
-    pip install pymodbus pyserial
+    pip install pymodbus pyserial numpy
 )
 
 echo.
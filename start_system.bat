@@ -5,10 +5,23 @@ echo    MENJALANKAN SISTEM INSALUSI WEATHER STATION
 echo ======================================================
 echo.
 
+:: 0. Cek library: poller butuh numpy (QC ws600_qc.py), dashboard butuh fastapi/uvicorn
+python -c "import pymodbus, serial, numpy, fastapi, uvicorn" 2>nul
+if %errorlevel% neq 0 (
+    echo [ERROR] Library Python belum lengkap.
+    echo Jalankan INSTALL_OFFLINE.bat atau: pip install -r requirements_offline.txt
+    pause
+    exit /b
+)
+
 :: 1. Jalankan Program Sensor di window baru
 echo [*] Menjalankan Service Sensor (modbusWs600.py)...
 start "WS600_SENSOR_SERVICE" cmd /k "python modbusWs600.py"
 
+:: 1b. Agent replikasi ke server pusat (diam saja sampai diaktifkan di pengaturan)
+echo [*] Menjalankan Agent Replikasi (ws600_replicator.py)...
+start "WS600_REPLICATOR" cmd /k "python ws600_replicator.py"
+
 :: 2. Jalankan Dashboard Web di window baru
 echo [*] Menjalankan Dashboard Dashboard (FastAPI)...
 cd Device-program\dashboard
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modul bersama ada di root, modul khusus dashboard di Device-program/dashboard
+for path in (ROOT, os.path.join(ROOT, "Device-program", "dashboard")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
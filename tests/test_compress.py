@@ -0,0 +1,136 @@
+import math
+import random
+
+import pytest
+
+from ws600_compress import (
+    ARCHIVE_FIELDS, COMPRESS_FIELDS, KEYFRAME_INTERVAL, HistoryCompressor, SwingingDoor, Deadband,
+)
+
+CALM = {
+    "wind_speed": 0.0, "wind_direction": 180.0, "temperature": 24.5, "humidity": 88.0,
+    "pressure": 1010.0, "rain_total": 152.4, "solar_radiation": 0.0,
+    "rain_minute": 0.0, "rain_hour": 0.0, "rain_day": 0.0,
+}
+
+
+def calm_night(ticks, step=10, **overrides):
+    """Malam tenang: semua kolom diam kecuali yang diberi fungsi f(i) di overrides"""
+    series = []
+    for i in range(ticks):
+        row = dict(CALM)
+        for column, fn in overrides.items():
+            row[column] = fn(i)
+        series.append((i * step, [row[c] for c in ARCHIVE_FIELDS]))
+    return series
+
+
+def run(compressor, series):
+    """Return indeks tick yang ditulis"""
+    written = []
+    for i, (t, values) in enumerate(series):
+        written += [index for _, index in compressor.offer(t, values, i)]
+    return written
+
+
+def reconstruct(series, written, column, linear):
+    """Nilai rekonstruksi kolom di setiap tick di antara baris tersimpan"""
+    k = ARCHIVE_FIELDS.index(column)
+    out = {}
+    for a, b in zip(written, written[1:]):
+        (t0, v0), (t1, v1) = series[a], series[b]
+        for i in range(a, b):
+            t = series[i][0]
+            out[i] = v0[k] + (v1[k] - v0[k]) * (t - t0) / (t1 - t0) if linear else v0[k]
+    return out
+
+
+def test_single_field_compression_reduces_row_count():
+    # Hanya tekanan yang dikompresi; tekanan turun pelan 0.3 hPa/jam dengan noise sensor 0.05 hPa
+    rng = random.Random(1)
+    series = calm_night(
+        360, pressure=lambda i: round(1010.0 - 0.3 * i * 10 / 3600 + rng.uniform(-0.05, 0.05), 2)
+    )
+    uncompressed = run(HistoryCompressor(), series)
+    compressed = run(HistoryCompressor({"pressure": ("swinging_door", 0.1)}), series)
+    assert len(uncompressed) == len(series)
+    assert len(compressed) * 5 < len(uncompressed)
+
+
+def test_single_field_deadband_reduces_row_count():
+    series = calm_night(360, humidity=lambda i: 88.0 + (i % 4) * 0.1)
+    compressed = run(HistoryCompressor({"humidity": ("deadband", 0.5)}), series)
+    # Hanya baris pertama + keyframe tiap KEYFRAME_INTERVAL
+    assert len(compressed) == 1 + (359 * 10) // KEYFRAME_INTERVAL
+
+
+def test_unset_columns_are_lossless():
+    # Suhu tidak diatur: setiap perubahannya tetap ditulis walau tekanan dikompresi
+    series = calm_night(100, temperature=lambda i: 24.5 if i < 40 else 24.4)
+    written = run(HistoryCompressor({"pressure": ("deadband", 0.1)}), series)
+    assert 40 in written
+    assert len(written) == 2
+    values = reconstruct(series + [series[-1]], written + [len(series)], "temperature", linear=False)
+    k = ARCHIVE_FIELDS.index("temperature")
+    assert all(values[i] == series[i][1][k] for i in range(len(series)))
+
+
+def test_held_rain_minute_returning_to_zero_is_written():
+    series = calm_night(30, rain_minute=lambda i: 0.2 if 10 <= i < 16 else 0.0,
+                        rain_total=lambda i: 152.4 if i < 10 else 152.6)
+    written = run(HistoryCompressor({c: ("deadband", None) for c in COMPRESS_FIELDS}), series)
+    assert written == [0, 10, 16]
+
+
+def test_keyframe_written_when_everything_is_still():
+    series = calm_night(KEYFRAME_INTERVAL // 10 * 2 + 1)
+    written = run(HistoryCompressor({"pressure": ("deadband", 0.1)}), series)
+    assert [series[i][0] for i in written] == [0, KEYFRAME_INTERVAL, 2 * KEYFRAME_INTERVAL]
+
+
+@pytest.mark.parametrize("mode, linear", [("deadband", False), ("swinging_door", True)])
+def test_reconstruction_error_within_tolerance(mode, linear):
+    rng = random.Random(7)
+    level = [1012.0]
+
+    def walk(i):
+        level[0] += rng.gauss(0, 0.04) + 0.1 * math.sin(i / 50)
+        return round(level[0], 2)
+
+    tolerance = 0.2
+    series = calm_night(2000, pressure=walk)
+    written = run(HistoryCompressor({"pressure": (mode, tolerance)}, keyframe=10 ** 9), series)
+    assert len(written) < len(series) / 3
+    k = ARCHIVE_FIELDS.index("pressure")
+    estimate = reconstruct(series, written, "pressure", linear)
+    worst = max(abs(estimate[i] - series[i][1][k]) for i in estimate)
+    assert worst <= tolerance + 1e-9
+
+
+def test_swinging_door_writes_turning_point_before_reversal():
+    # Naik lurus 10 tick lalu turun: tick puncak (i=10) ditulis sebagai titik belok saat i=11 datang
+    series = calm_night(20, pressure=lambda i: 1010.0 + 0.5 * min(i, 20 - i))
+    written = run(HistoryCompressor({"pressure": ("swinging_door", 0.1)}, keyframe=10 ** 9), series)
+    assert written[:2] == [0, 10]
+
+
+def test_swinging_door_straight_line_needs_no_rows():
+    door = SwingingDoor("pressure", 0.1)
+    door.reset(0, 1000.0)
+    for t in range(10, 200, 10):
+        assert door.check(t, 1000.0 + t * 0.01) == 0
+        door.update(t, 1000.0 + t * 0.01)
+
+
+def test_deadband_wind_direction_measured_around_the_circle():
+    band = Deadband("wind_direction", 5.0)
+    band.reset(0, 358.0)
+    assert band.check(10, 2.0) == 0
+    assert band.check(10, 10.0) != 0
+
+
+def test_missing_values_start_and_end_a_line():
+    nan = float("nan")
+    series = calm_night(10, solar_radiation=lambda i: nan if 3 <= i < 6 else 0.0)
+    written = run(HistoryCompressor({"solar_radiation": ("swinging_door", 5.0)}, keyframe=10 ** 9), series)
+    assert 3 in written and 6 in written
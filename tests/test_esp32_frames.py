@@ -0,0 +1,114 @@
+import pytest
+
+from ws600_esp32 import (
+    FIELD_COUNT, MAX_LINE, SEQ_MOD, Frame, FrameReader, SequenceTracker,
+    crc16, encode_error, encode_sample, parse_line, seal,
+)
+
+VALUES = (1.25, 180.0, 24.5, 88.0, 1010.1, 152.4, None, 0.0, 3.5, 412.0)
+
+
+def sample(seq, ms=1000, node=1, values=VALUES):
+    return encode_sample(node, seq, ms, values)
+
+
+def frame(seq, ms, node=1):
+    return Frame("WS", node, seq, ms, VALUES, None)
+
+
+def test_crc16_check_value():
+    assert crc16(b"123456789") == 0x29B1  # nilai cek CRC-16/CCITT-FALSE
+
+
+def test_sample_round_trip():
+    parsed = parse_line(sample(7).rstrip(b"\n"))
+    assert parsed == Frame("WS", 1, 7, 1000, VALUES, None)
+
+
+def test_nan_written_empty():
+    values = (float("nan"),) + VALUES[1:]
+    assert parse_line(sample(1, values=values).rstrip(b"\n")).values[0] is None
+
+
+def test_error_frame():
+    assert parse_line(encode_error(3, 9, 500, "226").rstrip(b"\n")) == Frame("WE", 3, 9, 500, None, "226")
+
+
+@pytest.mark.parametrize("line", [
+    sample(7).replace(b"24.50", b"24.60"),      # isi berubah, CRC lama
+    sample(7)[:-6] + b"0000\n",                  # CRC diganti
+    sample(7).replace(b"*", b""),                # tanpa pemisah CRC
+    seal(",".join(["WS", "1", "7", "1000"] + ["1.0"] * (FIELD_COUNT - 1))),  # field kurang
+    seal("WX,1,7,1000"),                         # jenis tidak dikenal
+])
+def test_corrupt_frame_rejected(line):
+    with pytest.raises(ValueError):
+        parse_line(line.rstrip(b"\n"))
+
+
+def test_reader_reassembles_partial_frames():
+    reader = FrameReader()
+    data = sample(1) + sample(2)
+    frames = []
+    for i in range(0, len(data), 5):
+        frames += reader.feed(data[i:i + 5])
+    assert [f.seq for f in frames] == [1, 2]
+    assert reader.bad == 0 and reader.buffer == b""
+
+
+def test_reader_skips_debug_text_and_counts_bad_frames():
+    reader = FrameReader()
+    corrupt = sample(2).replace(b"24.50", b"24.60")
+    data = b"Reading sensor...\r\n" + b"debug: " + sample(1) + corrupt + sample(3).replace(b"\n", b"\r\n")
+    frames = reader.feed(data)
+    assert [f.seq for f in frames] == [1, 3]
+    assert reader.bad == 1
+
+
+def test_reader_drops_overlong_garbage_and_resyncs():
+    reader = FrameReader()
+    assert reader.feed(b"\xff" * (MAX_LINE + 1)) == []
+    assert reader.bad == 1 and reader.buffer == b""
+    # Sisa sampah sebelum newline berikutnya ikut terbuang bersama baris pertama
+    frames = reader.feed(b"\xfe\xfe\n" + sample(5))
+    assert [f.seq for f in frames] == [5]
+    assert reader.bad == 1
+
+
+def test_sequence_counts_gaps():
+    tracker = SequenceTracker()
+    assert tracker.check(frame(10, 1000)) == (True, 0)
+    assert tracker.check(frame(11, 3000)) == (True, 0)
+    assert tracker.check(frame(15, 11000)) == (True, 3)
+
+
+def test_sequence_rejects_duplicate_and_old_frames():
+    tracker = SequenceTracker()
+    tracker.check(frame(10, 1000))
+    tracker.check(frame(11, 3000))
+    assert tracker.check(frame(11, 3000)) == (False, 0)
+    assert tracker.check(frame(9, 3000)) == (False, 0)
+    assert tracker.last[1] == (11, 3000)
+
+
+def test_sequence_wraps_at_uint32():
+    tracker = SequenceTracker()
+    tracker.check(frame(SEQ_MOD - 2, 1000))
+    assert tracker.check(frame(SEQ_MOD - 1, 3000)) == (True, 0)
+    assert tracker.check(frame(1, 5000)) == (True, 1)  # 0 hilang
+    assert tracker.check(frame(SEQ_MOD - 1, 7000)) == (False, 0)
+
+
+def test_sequence_restarts_after_reboot():
+    # millis() mundur: ESP32 reboot, nomor urut rendah diterima tanpa dihitung hilang
+    tracker = SequenceTracker()
+    tracker.check(frame(500, 900000))
+    assert tracker.check(frame(0, 200)) == (True, 0)
+    assert tracker.check(frame(2, 4200)) == (True, 1)
+
+
+def test_sequence_per_node():
+    tracker = SequenceTracker()
+    tracker.check(frame(10, 1000, node=1))
+    assert tracker.check(frame(3, 1000, node=2)) == (True, 0)
+    assert tracker.check(frame(11, 3000, node=1)) == (True, 0)
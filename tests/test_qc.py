@@ -0,0 +1,155 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from ws600_qc import (
+    MAX_STEP_GAP, QC_BITS, QC_FIELDS, QC_FLATLINE, QC_LIMITS, QC_MISSING, QC_RANGE, QC_STEP,
+    QualityChecker, check_batch, describe, qc_clean_sql, qc_mask, qc_value_sql,
+)
+
+BASE = {
+    "wind_speed": 1.0, "wind_direction": 180.0, "temperature": 24.5, "humidity": 88.0,
+    "pressure": 1010.0, "rain_total": 152.4, "solar_radiation": 0.0,
+}
+
+
+def series(ticks, step=60, **overrides):
+    """Return (times, values); overrides: kolom -> f(i) (None = kosong)"""
+    times, values = [], []
+    for i in range(ticks):
+        row = dict(BASE)
+        for column, fn in overrides.items():
+            row[column] = fn(i)
+        times.append(i * step)
+        values.append([np.nan if row[c] is None else row[c] for c in QC_FIELDS])
+    return times, values
+
+
+def bits(flags, column):
+    """Bit QC satu kolom dari array qc_flags"""
+    return (np.asarray(flags) >> (QC_FIELDS.index(column) * QC_BITS)) & 0xF
+
+
+def test_mask_bit_positions():
+    assert qc_mask("wind_speed") == 0xF
+    assert qc_mask("temperature") == 0xF << 8
+    assert qc_mask("pressure", checks=QC_RANGE) == QC_RANGE << 16
+    assert qc_mask("temperature", "humidity") == (0xF << 8) | (0xF << 12)
+    assert qc_mask("co2") == 0
+    assert len(QC_FIELDS) * QC_BITS <= 63  # muat di INTEGER SQLite
+
+
+def test_describe_round_trip():
+    flags = (QC_STEP << 8) | ((QC_RANGE | QC_FLATLINE) << 16)
+    assert describe(flags) == {"temperature": ["step"], "pressure": ["range", "flatline"]}
+    assert describe(0) == {}
+
+
+def test_clean_series_has_no_flags():
+    flags, _ = check_batch(*series(30, temperature=lambda i: 24.5 + 0.1 * i))
+    assert not flags.any()
+
+
+def test_missing_value_flagged_except_optional_channel():
+    flags, _ = check_batch(*series(2, temperature=lambda i: None, solar_radiation=lambda i: None))
+    assert list(bits(flags, "temperature")) == [QC_MISSING, QC_MISSING]
+    assert not bits(flags, "solar_radiation").any()
+
+
+def test_out_of_range():
+    flags, _ = check_batch(*series(3, humidity=lambda i: [88.0, 100.5, -1.0][i], pressure=lambda i: 1201.0))
+    assert list(bits(flags, "humidity") & QC_RANGE) == [0, QC_RANGE, QC_RANGE]
+    assert (bits(flags, "pressure") & QC_RANGE).all()
+
+
+def test_step_flags_spike_but_not_return():
+    temps = [24.5, 24.6, 30.0, 24.7, 24.8]
+    flags, _ = check_batch(*series(5, temperature=lambda i: temps[i]))
+    assert list(bits(flags, "temperature")) == [0, 0, QC_STEP, 0, 0]
+
+
+def test_step_limit_scales_with_gap():
+    # 5 °C dalam 3 menit masih di bawah 3 °C/menit
+    flags, _ = check_batch(*series(2, step=180, temperature=lambda i: 24.5 + 5.0 * i))
+    assert not flags.any()
+    # Jeda lebih dari MAX_STEP_GAP (poller mati): loncatan tidak dicek
+    flags, _ = check_batch(*series(2, step=MAX_STEP_GAP + 60, temperature=lambda i: 24.5 + 40.0 * i))
+    assert not bits(flags, "temperature").any()
+
+
+def test_flatline_after_duration():
+    duration = QC_LIMITS["pressure"][3]
+    ticks = duration // 60 + 2
+    flags, _ = check_batch(*series(ticks, pressure=lambda i: 1010.0))
+    flat = bits(flags, "pressure") & QC_FLATLINE
+    assert not flat[:duration // 60].any()
+    assert flat[duration // 60:].all()
+
+
+def test_flatline_ignores_float_noise_but_not_resolution_steps():
+    ticks = QC_LIMITS["pressure"][3] // 60 + 2
+    noisy, _ = check_batch(*series(ticks, pressure=lambda i: 1010.0 + (1e-4 if i % 2 else 0.0)))
+    assert bits(noisy, "pressure")[-1] & QC_FLATLINE
+    # Satu langkah resolusi (0.1 hPa) bolak-balik = sensor hidup
+    alive, _ = check_batch(*series(ticks, pressure=lambda i: 1010.0 + (0.1 if i % 2 else 0.0)))
+    assert not (bits(alive, "pressure") & QC_FLATLINE).any()
+
+
+def test_flatline_skips_value_at_range_bound():
+    ticks = QC_LIMITS["wind_speed"][3] // 60 + 2
+    flags, _ = check_batch(*series(ticks, wind_speed=lambda i: 0.0, humidity=lambda i: 100.0))
+    assert not bits(flags, "wind_speed").any()
+    assert not bits(flags, "humidity").any()
+
+
+def test_chunked_and_streaming_match_whole_batch():
+    rng = random.Random(3)
+    # Suhu jalan acak dengan spike dan sampel kosong sesekali
+    walk, temps = 24.5, []
+    for _ in range(400):
+        walk += rng.choice([0.0, 0.0, 0.1, -0.1])
+        temps.append(rng.choice([walk] * 8 + [walk + 6.0, None]))
+    times, values = series(len(temps), step=30, temperature=lambda i: temps[i],
+                           pressure=lambda i: 1010.0 + 0.1 * (i // 200))
+    whole, _ = check_batch(times, values)
+    assert whole.any()
+
+    chunked, state = [], None
+    for start in range(0, len(times), 37):
+        flags, state = check_batch(times[start:start + 37], values[start:start + 37], state)
+        chunked.extend(flags.tolist())
+    assert chunked == whole.tolist()
+
+    checker = QualityChecker()
+    streamed = [checker.check(t, [None if v != v else v for v in row]) for t, row in zip(times, values)]
+    assert streamed == whole.tolist()
+
+
+def test_empty_batch_keeps_state():
+    _, state = check_batch(*series(3))
+    flags, same = check_batch([], np.empty((0, len(QC_FIELDS))), state)
+    assert len(flags) == 0 and same is state
+
+
+def test_sql_helpers_hide_flagged_values():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE weather_data (temperature REAL, humidity REAL, qc_flags INTEGER)")
+    conn.executemany("INSERT INTO weather_data VALUES (?, ?, ?)", [
+        (24.5, 88.0, None),                 # belum dicek
+        (30.0, 88.0, QC_STEP << 8),         # spike suhu
+        (24.6, 101.0, QC_RANGE << 12),      # RH di luar rentang
+    ])
+    rows = conn.execute(
+        f"SELECT {qc_value_sql('temperature')}, {qc_value_sql('humidity')} FROM weather_data"
+    ).fetchall()
+    assert rows == [(24.5, 88.0), (None, 88.0), (24.6, None)]
+    clean = conn.execute(f"SELECT COUNT(*) FROM weather_data WHERE {qc_clean_sql('temperature')}").fetchone()
+    assert clean == (2,)
+    assert qc_value_sql("co2") == "co2"
+
+
+@pytest.mark.parametrize("column", QC_FIELDS)
+def test_resolution_declared(column):
+    assert QC_LIMITS[column][4] > 0
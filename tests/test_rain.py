@@ -0,0 +1,117 @@
+import math
+from datetime import datetime
+
+import pytest
+
+import modbusWs600
+from modbusWs600 import RAIN_EVENTS, RainAccumulator, rain_hour
+
+T0 = datetime(2026, 2, 16, 10, 58, 50).timestamp()
+
+
+def feed(acc, readings, step=10, start=T0):
+    """readings: counter rain_total per tick. Return increment per tick"""
+    return [acc.add(total, start + i * step) for i, total in enumerate(readings)]
+
+
+def events(kind):
+    return RAIN_EVENTS.value(kind=kind)
+
+
+def test_first_reading_is_baseline():
+    acc = RainAccumulator()
+    assert feed(acc, [152.4, 152.6, 152.6, 153.0]) == pytest.approx([0.0, 0.2, 0.0, 0.4])
+    assert acc.pending()[0] == pytest.approx(0.6)
+
+
+def test_missing_reading_ignored():
+    acc = RainAccumulator()
+    assert feed(acc, [10.0, None, math.nan, 10.2]) == pytest.approx([0.0, 0.0, 0.0, 0.2])
+    assert acc.last_total == 10.2
+
+
+def test_counter_drop_is_reset_when_rollover_unknown():
+    acc = RainAccumulator()
+    before = events("reset")
+    assert feed(acc, [5.0, 5.2, 0.3]) == pytest.approx([0.0, 0.2, 0.3])
+    assert events("reset") == before + 1
+
+
+def test_rollover(monkeypatch):
+    monkeypatch.setattr(modbusWs600, "RAIN_ROLLOVER", 100.0)
+    acc = RainAccumulator()
+    before = events("rollover")
+    assert feed(acc, [99.6, 99.8, 0.3]) == pytest.approx([0.0, 0.2, 0.5])
+    assert events("rollover") == before + 1
+
+
+def test_drop_far_below_rollover_is_reset(monkeypatch):
+    # Counter baru di paruh bawah rentang: reset sensor, bukan rollover
+    monkeypatch.setattr(modbusWs600, "RAIN_ROLLOVER", 100.0)
+    acc = RainAccumulator()
+    assert feed(acc, [20.0, 0.4]) == pytest.approx([0.0, 0.4])
+
+
+def test_single_glitch_keeps_baseline():
+    acc = RainAccumulator()
+    before = events("glitch")
+    assert feed(acc, [10.0, 60.0, 10.1]) == pytest.approx([0.0, 0.0, 0.1])
+    assert events("glitch") == before + 1
+    assert acc.last_total == 10.1 and acc.suspects == []
+
+
+def test_consistent_jump_rebases_without_counting_rain():
+    acc = RainAccumulator()
+    before = events("rebase")
+    increments = feed(acc, [10.0, 400.0, 400.0, 400.1, 400.3])
+    assert increments == pytest.approx([0.0, 0.0, 0.0, 0.0, 0.2])
+    assert events("rebase") == before + 1
+    assert acc.last_total == 400.3
+    assert acc.pending()[0] == pytest.approx(0.2)
+
+
+def test_random_glitches_do_not_rebase():
+    acc = RainAccumulator()
+    before = events("rebase")
+    increments = feed(acc, [10.0, 400.0, 900.0, 50.0, 600.0, 10.1])
+    assert increments == pytest.approx([0.0] * 5 + [0.1])
+    assert events("rebase") == before
+    assert acc.last_total == 10.1
+
+
+def test_rebase_after_counter_moves_backwards_by_slack():
+    # Bacaan counter baru boleh turun sedikit (jitter) dan tetap dianggap konsisten
+    acc = RainAccumulator()
+    assert feed(acc, [10.0, 400.5, 400.0, 400.2]) == pytest.approx([0.0] * 4)
+    assert acc.last_total == 400.2
+
+
+def test_hourly_rollup_and_peak_intensity():
+    acc = RainAccumulator()
+    # 10:58:50 baseline; 0.5 mm di menit 10:59 lalu 0.1 mm setelah jam berganti
+    feed(acc, [0.0, 0.2, 0.2, 0.2, 0.5], step=10)
+    acc.add(0.6, datetime(2026, 2, 16, 11, 0, 10).timestamp())
+    window, hours = acc.pending()
+    assert window == pytest.approx(0.6)
+    assert hours == [
+        ("2026-02-16 10:00:00", pytest.approx(0.5), pytest.approx(30.0)),
+        ("2026-02-16 11:00:00", pytest.approx(0.1), 0.0),  # menit 11:00 belum ditutup
+    ]
+
+
+def test_long_gap_spreads_intensity():
+    acc = RainAccumulator()
+    acc.add(0.0, T0)
+    assert acc.add(1.0, T0 + 600) == pytest.approx(1.0)
+    mm, peak = acc.hours[rain_hour(T0 + 600)]
+    assert mm == pytest.approx(1.0)
+    assert peak == pytest.approx(6.0)  # 1 mm / 10 menit
+
+
+def test_clear_keeps_baseline():
+    acc = RainAccumulator()
+    feed(acc, [1.0, 1.4])
+    acc.clear()
+    assert acc.pending() == (0.0, [])
+    assert acc.add(1.5, T0 + 20) == pytest.approx(0.1)
+    assert rain_hour(T0 + 20) in acc.hours
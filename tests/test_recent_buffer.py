@@ -0,0 +1,112 @@
+import math
+import socket
+import sqlite3
+import time
+
+import pytest
+
+from recent_buffer import RecentStore, RingBuffer
+from ws600_livefeed import LIVE_FIELDS, LiveFeedSender
+
+FIELDS = ("temperature", "pressure")
+
+
+def filled(capacity, count, start=1000.0):
+    buf = RingBuffer(capacity, FIELDS)
+    for i in range(count):
+        buf.append(start + i, [20.0 + i, 1000.0 + i])
+    return buf
+
+
+def test_since_before_wrap():
+    buf = filled(8, 5)
+    assert buf.since(1002.0) == {
+        "timestamp": [1002.0, 1003.0, 1004.0],
+        "temperature": [22.0, 23.0, 24.0],
+        "pressure": [1002.0, 1003.0, 1004.0],
+    }
+
+
+def test_wraparound_keeps_newest_in_order():
+    buf = filled(8, 21)
+    assert buf.size == 8
+    assert buf.since(0)["timestamp"] == [1013.0 + i for i in range(8)]
+    # Binary search melewati batas fisik array (start di tengah)
+    assert buf.since(1018.5)["timestamp"] == [1019.0, 1020.0]
+    assert buf.since(2000.0)["timestamp"] == []
+
+
+@pytest.mark.parametrize("count", [1, 7, 8, 9, 15, 16, 17])
+def test_since_every_boundary(count):
+    buf = filled(8, count)
+    kept = [1000.0 + i for i in range(max(0, count - 8), count)]
+    for t0 in [999.0] + kept + [kept[-1] + 0.5]:
+        assert buf.since(t0)["timestamp"] == [t for t in kept if t >= t0]
+
+
+def test_out_of_order_and_duplicate_rejected():
+    buf = filled(8, 3)
+    buf.append(1002.0, [99.0, 99.0])
+    buf.append(1001.5, [99.0, 99.0])
+    assert buf.size == 3
+    assert buf.since(0)["temperature"] == [20.0, 21.0, 22.0]
+
+
+def test_stride_limits_points():
+    buf = filled(100, 100)
+    thinned = buf.since(0, max_points=10)["timestamp"]
+    assert len(thinned) == 10
+    assert thinned[0] == 1000.0 and thinned[1] == 1010.0
+    assert len(buf.since(0, max_points=1000)["timestamp"]) == 100
+
+
+def test_field_selection_and_missing_values():
+    buf = RingBuffer(4, FIELDS)
+    buf.append(1.0, [None, 1010.123456])
+    buf.append(2.0, [math.nan, None])
+    result = buf.since(0, fields=["pressure"])
+    assert set(result) == {"timestamp", "pressure"}
+    assert result["pressure"] == [1010.123, None]  # float32 -> 3 desimal, NaN -> null
+    assert buf.since(0)["temperature"] == [None, None]
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_store_receives_samples_and_status(tmp_path):
+    db_path = str(tmp_path / "ws600_data.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"CREATE TABLE weather_data (station_id INTEGER, timestamp DATETIME, {', '.join(f'{f} REAL' for f in LIVE_FIELDS)})")
+    conn.close()
+
+    port = free_port()
+    store = RecentStore(db_path, host="127.0.0.1", port=port, capacity=16)
+    store.start()
+    try:
+        sender = LiveFeedSender(host="127.0.0.1", port=port)
+        values = [1.5] * len(LIVE_FIELDS)
+        now = time.time()
+        sender.send([(1, now, values), (2, now, values)])
+        sender.send([(1, now - 5, [9.0] * len(LIVE_FIELDS))])  # datagram terlambat
+        sender.send_status([(1, now, True, False, "degraded")])
+        assert wait_for(lambda: store.received >= 3 and store.status(1) is not None)
+
+        ts, latest = store.latest(1)
+        assert ts == now and list(latest) == values
+        assert store.latest(3) is None
+        assert store.status(1) == (now, True, False, "degraded")
+        assert store.buffer(1).since(0)["timestamp"] == [now]
+    finally:
+        store.stop()
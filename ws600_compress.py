@@ -0,0 +1,323 @@
+"""Kompresi histori weather_data: deadband / swinging door per kolom.
+
+Tanpa kompresi (semua kolom off) poller menulis satu baris setiap DB_SAVE_INTERVAL.
+Begitu satu kolom saja dikompresi, keputusan tulis diambil per kolom dan baris hanya
+ditulis jika ada kolom yang membutuhkannya untuk rekonstruksi dalam toleransi:
+
+    off            kolom tidak dikompresi (lossless): tulis jika nilainya berubah sedikit pun;
+                   juga berlaku untuk kolom yang tidak disebut di pengaturan dan HELD_FIELDS
+    deadband       tulis jika nilai bergeser > toleransi dari nilai tersimpan terakhir;
+                   rekonstruksi step (tahan nilai sebelumnya)
+    swinging_door  tulis titik belok tren (Bristol); rekonstruksi linear antar baris
+
+Setiap baris yang ditulis tetap snapshot lengkap (semua kolom + statistik jendela sejak
+baris sebelumnya), dan semua kolom mulai lagi dari baris itu. Jadi untuk setiap tick
+simpan yang dilewati: |nilai asli - rekonstruksi| <= toleransi kolom tersebut.
+Selain itu satu baris ditulis paling lambat setiap KEYFRAME_INTERVAL detik.
+
+Toleransi default = pecahan rentang sensor (QC_LIMITS = FIELD_RANGES poller).
+Perkiraan rasio & error pada data yang sudah ada:
+
+    python ws600_compress.py --db ws600_data.db [--station 1] [--days 7]
+"""
+import argparse
+import math
+import sqlite3
+from datetime import datetime, timedelta
+
+from ws600_qc import QC_FIELDS, QC_LIMITS
+
+COMPRESS_FIELDS = QC_FIELDS
+# Kolom snapshot lain tanpa mode sendiri: saat kompresi aktif ikut ditahan lossless (deadband 0),
+# agar mis. rain_minute yang kembali ke 0 setelah hujan tidak hilang dari rekonstruksi step
+HELD_FIELDS = ["rain_minute", "rain_hour", "rain_day"]
+ARCHIVE_FIELDS = COMPRESS_FIELDS + HELD_FIELDS  # urutan nilai untuk HistoryCompressor.offer()
+MODES = ("off", "deadband", "swinging_door")
+KEYFRAME_INTERVAL = 900  # detik; batas jarak antar baris (heartbeat) walau semua kolom diam
+
+# Toleransi default sebagai pecahan rentang (maks - min) kolom
+TOLERANCE_FRACTION = {
+    "wind_speed": 0.001,        # 0.08 m/s
+    "wind_direction": 0.01,     # 3.6 derajat
+    "temperature": 0.001,       # 0.14 degC
+    "humidity": 0.002,          # 0.2 %RH
+    "pressure": 0.00025,        # 0.1 hPa (resolusi sensor)
+    "rain_total": 0.0,          # counter: setiap kenaikan ditulis
+    "solar_radiation": 0.002,   # 5 W/m2
+}
+CIRCULAR = {"wind_direction": 360.0}  # selisih diukur memutar; swinging door tidak didukung
+PREVIOUS, CURRENT = 1, 2  # hasil check(): tick sebelumnya / tick ini harus ditulis
+
+
+def default_tolerance(column):
+    lo, hi = QC_LIMITS[column][:2]
+    return round((hi - lo) * TOLERANCE_FRACTION[column], 6)
+
+
+def validate(column, mode, tolerance=None):
+    """Return pesan error (str) atau None jika pengaturan valid"""
+    if column not in COMPRESS_FIELDS:
+        return f"Kolom tidak bisa dikompresi: {column}"
+    if mode not in MODES:
+        return f"Mode tidak dikenal: {mode} ({', '.join(MODES)})"
+    if mode == "swinging_door" and column in CIRCULAR:
+        return f"{column} hanya mendukung deadband"
+    if tolerance is not None and not tolerance >= 0:
+        return "Toleransi harus >= 0"
+    return None
+
+
+def difference(column, a, b):
+    d = abs(a - b)
+    period = CIRCULAR.get(column)
+    return min(d, period - d) if period else d
+
+
+def is_nan(value):
+    return value is None or value != value
+
+
+class Deadband:
+    def __init__(self, column, tolerance):
+        self.column = column
+        self.tolerance = tolerance
+        self.value = None
+
+    def reset(self, t, value):
+        self.value = value
+
+    def check(self, t, value):
+        if is_nan(value) or is_nan(self.value):
+            return 0 if is_nan(value) and is_nan(self.value) else CURRENT
+        return CURRENT if difference(self.column, value, self.value) > self.tolerance else 0
+
+    def update(self, t, value):
+        pass
+
+
+class SwingingDoor:
+    """Pintu dari titik tersimpan terakhir: slope atas menyempit, slope bawah melebar tiap sampel.
+
+    Varian ketat: tick ini hanya boleh jadi ujung garis jika slope ke nilainya masih di dalam
+    pintu sampel-sampel sebelumnya (garis lewat semua sampel +- toleransi). Jika tidak, tick
+    sebelumnya ditulis sebagai titik belok dan pintu dibuka lagi dari sana.
+    """
+
+    def __init__(self, column, tolerance):
+        self.column = column
+        self.tolerance = tolerance
+        self.anchor = None
+        self.upper = self.lower = None
+
+    def reset(self, t, value):
+        self.anchor = (t, value)
+        self.upper, self.lower = math.inf, -math.inf
+
+    def check(self, t, value):
+        t0, v0 = self.anchor
+        if is_nan(value) or is_nan(v0):
+            # Awal/akhir data kosong: garis diakhiri di tick sebelumnya, tick ini ditulis apa adanya
+            return 0 if is_nan(value) and is_nan(v0) else PREVIOUS | CURRENT
+        if t <= t0:
+            return CURRENT if abs(value - v0) > self.tolerance else 0
+        slope = (value - v0) / (t - t0)
+        return 0 if self.lower <= slope <= self.upper else PREVIOUS
+
+    def update(self, t, value):
+        t0, v0 = self.anchor
+        if is_nan(value) or is_nan(v0) or t <= t0:
+            return
+        self.upper = min(self.upper, (value + self.tolerance - v0) / (t - t0))
+        self.lower = max(self.lower, (value - self.tolerance - v0) / (t - t0))
+
+
+def build(column, mode, tolerance=None):
+    if mode == "swinging_door":
+        return SwingingDoor(column, default_tolerance(column) if tolerance is None else tolerance)
+    if mode == "deadband":
+        return Deadband(column, default_tolerance(column) if tolerance is None else tolerance)
+    return Deadband(column, 0.0)  # off: nilai disimpan persis, baris ditulis setiap kali berubah
+
+
+class HistoryCompressor:
+    """Keputusan tulis histori satu stasiun, dipanggil sekali per tick simpan.
+
+    settings: {kolom: (mode, toleransi | None)}; kolom yang tidak disebut = off. Jika semua off,
+    setiap tick ditulis; selain itu tiap kolom di ARCHIVE_FIELDS memutuskan sendiri.
+    """
+
+    def __init__(self, settings=None, keyframe=KEYFRAME_INTERVAL):
+        settings = settings or {}
+        self.enabled = any(settings.get(c, ("off", None))[0] != "off" for c in COMPRESS_FIELDS)
+        self.columns = [build(c, *settings.get(c, ("off", None))) for c in ARCHIVE_FIELDS]
+        self.keyframe = keyframe
+        self.written = None   # waktu baris tersimpan terakhir
+        self.previous = None  # (t, nilai, payload) tick sebelumnya yang belum ditulis
+
+    def reset(self, t=None, values=None):
+        """Semua kolom mulai dari baris yang baru ditulis (tanpa argumen: baris berikutnya pasti ditulis)"""
+        self.written = t
+        self.previous = None
+        if t is not None:
+            for column, value in zip(self.columns, values):
+                column.reset(t, value)
+
+    def check(self, t, values):
+        if not self.enabled or t - self.written >= self.keyframe:
+            return CURRENT
+        result = 0
+        for column, value in zip(self.columns, values):
+            result |= column.check(t, value)
+        return result
+
+    def offer(self, t, values, payload=None):
+        """values: nilai urut ARCHIVE_FIELDS (None/NaN = kosong). Return list (t, payload) yang harus
+        ditulis, urut waktu: tick sebelumnya (titik belok swinging door) dan/atau tick ini"""
+        if self.written is None:
+            self.reset(t, values)
+            return [(t, payload)]
+        out = []
+        result = self.check(t, values)
+        if result & PREVIOUS and self.previous is not None:
+            prev_t, prev_values, prev_payload = self.previous
+            out.append((prev_t, prev_payload))
+            self.reset(prev_t, prev_values)
+            result = self.check(t, values)  # pintu baru dari tick sebelumnya tidak mungkin tertutup
+        if result & CURRENT:
+            out.append((t, payload))
+            self.reset(t, values)
+            return out
+        for column, value in zip(self.columns, values):
+            column.update(t, value)
+        self.previous = (t, values, payload)
+        return out
+
+
+# ==============================
+# REKONSTRUKSI SAAT DIBACA
+# ==============================
+def resample(names, rows, interval, modes=None):
+    """Deret reguler setiap `interval` detik dari baris histori (urut waktu naik, ada kolom timestamp).
+
+    Kolom swinging_door diinterpolasi linear, kolom lain step (nilai baris sebelumnya). Titik grid
+    setelah baris terakhir tidak dibuat (ekor belum pasti). modes: {kolom: mode} dari pengaturan.
+    Return (names, kolom) dengan timestamp string seperti weather_data; kolom id dibuang.
+    """
+    modes = modes or {}
+    keep = [i for i, n in enumerate(names) if n != "id"]
+    ts_index = names.index("timestamp")
+    times, data = [], []
+    for row in rows:
+        try:
+            t = datetime.strptime(row[ts_index], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (TypeError, ValueError):
+            continue
+        if times and t <= times[-1]:
+            continue
+        times.append(t)
+        data.append(row)
+    out_names = [names[i] for i in keep]
+    columns = [[] for _ in keep]
+    if not times:
+        return out_names, columns
+
+    linear = [modes.get(names[i]) == "swinging_door" for i in keep]
+    grid = math.ceil(times[0] / interval) * interval
+    j = 0
+    while grid <= times[-1]:
+        while j + 1 < len(times) and times[j + 1] <= grid:
+            j += 1
+        t0, row0 = times[j], data[j]
+        nxt = j + 1 < len(times)
+        for k, i in enumerate(keep):
+            if i == ts_index:
+                value = datetime.fromtimestamp(grid).strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                value = row0[i]
+                if linear[k] and nxt and grid > t0 and value is not None and data[j + 1][i] is not None:
+                    value = round(value + (data[j + 1][i] - value) * (grid - t0) / (times[j + 1] - t0), 3)
+            columns[k].append(value)
+        grid += interval
+    return out_names, columns
+
+
+# ==============================
+# EVALUASI PADA DATA LAMA
+# ==============================
+def evaluate(db_path, settings, station_id=None, days=None, keyframe=KEYFRAME_INTERVAL):
+    """Jalankan kompresor pada histori yang ada. Return (baris asli, baris tersisa, {kolom: error maks})"""
+    conn = sqlite3.connect(db_path)
+    existing = {c[1] for c in conn.execute("PRAGMA table_info(weather_data)")}
+    columns = ", ".join(c if c in existing else "NULL" for c in ARCHIVE_FIELDS)
+    query = f"SELECT station_id, timestamp, {columns} FROM weather_data"
+    params, where = [], []
+    if station_id is not None:
+        where.append("station_id = ?")
+        params.append(station_id)
+    if days:
+        where.append("timestamp >= ?")
+        params.append((datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S"))
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    rows = conn.execute(query + " ORDER BY station_id, timestamp, id", params).fetchall()
+    conn.close()
+
+    total = kept = 0
+    errors = {c: 0.0 for c in ARCHIVE_FIELDS}
+    modes = {c: m for c, (m, _) in settings.items()}
+    station_rows = {}
+    for row in rows:
+        station_rows.setdefault(row[0], []).append(row[1:])
+    for series in station_rows.values():
+        compressor = HistoryCompressor(settings, keyframe)
+        stored = []
+        for i, row in enumerate(series):
+            try:
+                t = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp()
+            except (TypeError, ValueError):
+                continue
+            for _, index in compressor.offer(t, row[1:], i):
+                stored.append(index)
+        total += len(series)
+        kept += len(stored)
+        # Error = selisih nilai asli tiap baris dengan rekonstruksi dari baris yang disimpan
+        for a, b in zip(stored, stored[1:]):
+            t0 = datetime.strptime(series[a][0], "%Y-%m-%d %H:%M:%S").timestamp()
+            t1 = datetime.strptime(series[b][0], "%Y-%m-%d %H:%M:%S").timestamp()
+            for row in series[a + 1:b]:
+                t = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp()
+                for k, column in enumerate(ARCHIVE_FIELDS, start=1):
+                    v0, v1, v = series[a][k], series[b][k], row[k]
+                    if is_nan(v) or is_nan(v0) or is_nan(v1):
+                        continue
+                    estimate = v0 + (v1 - v0) * (t - t0) / (t1 - t0) if modes.get(column) == "swinging_door" else v0
+                    errors[column] = max(errors[column], difference(column, v, estimate))
+    return total, kept, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perkiraan rasio kompresi histori weather_data")
+    parser.add_argument("--db", default="ws600_data.db")
+    parser.add_argument("--station", type=int)
+    parser.add_argument("--days", type=int, help="hanya N hari terakhir")
+    parser.add_argument("--mode", choices=MODES[1:], default="deadband",
+                        help="mode untuk semua kolom (wind_direction selalu deadband)")
+    parser.add_argument("--scale", type=float, default=1.0, help="kali toleransi default")
+    parser.add_argument("--fields", help="hanya kolom ini yang dikompresi, dipisah koma (default semua)")
+    args = parser.parse_args()
+
+    fields = args.fields.split(",") if args.fields else COMPRESS_FIELDS
+    for column in fields:
+        if column not in COMPRESS_FIELDS:
+            parser.error(f"kolom tidak bisa dikompresi: {column}")
+    settings = {c: ("deadband" if c in CIRCULAR else args.mode, default_tolerance(c) * args.scale)
+                if c in fields else ("off", 0.0) for c in COMPRESS_FIELDS}
+    total, kept, errors = evaluate(args.db, settings, args.station, args.days)
+    print(f"[*] {total} baris -> {kept} baris ({total / max(kept, 1):.1f}x)")
+    for column in COMPRESS_FIELDS:
+        mode, tolerance = settings[column]
+        print(f"    {column:<16} {mode:<14} toleransi {tolerance:<8g} error maks {errors[column]:.4g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Protokol frame serial ESP32 -> PC (transport "esp32").
+
+ESP32 (WS600_ESP32.ino) sudah membaca sensor lewat RS-485, jadi PC cukup
+menerima hasil decode-nya lewat USB serial, satu baris teks per sampel:
+
+    $WS,<node>,<seq>,<ms>,<v0>,...,<v9>*<crc>\\n    sampel 10 channel (kosong = tidak ada nilai)
+    $WE,<node>,<seq>,<ms>,<kode>*<crc>\\n           sensor tidak menjawab (kode hasil ModbusMaster)
+
+node = id sensor (slave_id stasiun), seq = nomor urut uint32 per node,
+ms = millis() ESP32, crc = CRC-16/CCITT-FALSE (hex 4 digit) dari teks di
+antara '$' dan '*'. Baris lain (log debug, teks serial monitor) diabaikan,
+sehingga output lama boleh tetap dicetak berdampingan.
+"""
+import time
+from collections import namedtuple
+
+import serial
+
+ESP32_BAUDRATE = 115200
+FIELD_COUNT = 10          # urutan sama dengan FIELDS poller + radiasi
+MAX_LINE = 256            # baris lebih panjang = sampah, dibuang sampai newline berikutnya
+MAX_READ = 64 * 1024      # byte maksimum yang dikuras per panggilan read_frames()
+SEQ_MOD = 1 << 32
+
+Frame = namedtuple("Frame", "kind node seq ms values code")
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        crc &= 0xFFFF
+    return crc
+
+
+def seal(body):
+    return f"${body}*{crc16(body.encode()):04X}\n".encode()
+
+
+def encode_sample(node, seq, ms, values):
+    """Frame $WS (dipakai simulator); None/NaN ditulis kosong"""
+    fields = ["" if v is None or v != v else f"{v:.2f}" for v in values]
+    return seal(",".join(["WS", str(node), str(seq % SEQ_MOD), str(ms)] + fields))
+
+
+def encode_error(node, seq, ms, code):
+    return seal(f"WE,{node},{seq % SEQ_MOD},{ms},{code}")
+
+
+def parse_line(line):
+    """Parse satu baris (bytes, tanpa newline) yang diawali '$'. ValueError jika rusak"""
+    star = line.rfind(b"*")
+    if not line.startswith(b"$") or star < 0:
+        raise ValueError("frame tidak lengkap")
+    body = line[1:star]
+    if int(line[star + 1:], 16) != crc16(body):
+        raise ValueError("CRC salah")
+    parts = body.decode("ascii").split(",")
+    kind = parts[0]
+    node, seq, ms = int(parts[1]), int(parts[2]), int(parts[3])
+    if kind == "WS":
+        if len(parts) != 4 + FIELD_COUNT:
+            raise ValueError("jumlah field salah")
+        values = tuple(float(p) if p else None for p in parts[4:])
+        return Frame(kind, node, seq, ms, values, None)
+    if kind == "WE":
+        return Frame(kind, node, seq, ms, None, parts[4] if len(parts) > 4 else "")
+    raise ValueError(f"jenis frame tidak dikenal: {kind}")
+
+
+class FrameReader:
+    """Potong aliran byte menjadi frame. Potongan baris disimpan sampai newline berikutnya"""
+
+    def __init__(self):
+        self.buffer = b""
+        self.bad = 0   # total frame rusak (CRC/format/terlalu panjang)
+
+    def feed(self, data):
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b"\n")
+        if len(self.buffer) > MAX_LINE:
+            # Tidak ada newline terlalu lama (noise/baudrate salah): buang, sinkron lagi di newline berikutnya
+            self.buffer = b""
+            self.bad += 1
+        frames = []
+        for line in lines:
+            start = line.find(b"$")
+            if start < 0:
+                continue
+            try:
+                frames.append(parse_line(line[start:].rstrip(b"\r")))
+            except (ValueError, IndexError, UnicodeDecodeError):
+                self.bad += 1
+        return frames
+
+
+class SequenceTracker:
+    """Deteksi frame hilang/duplikat per node dari nomor urut"""
+
+    def __init__(self):
+        self.last = {}  # node -> (seq, ms)
+
+    def check(self, frame):
+        """Return (diterima, jumlah frame hilang sebelum frame ini)"""
+        previous = self.last.get(frame.node)
+        if previous is not None:
+            last_seq, last_ms = previous
+            if frame.ms >= last_ms:
+                diff = (frame.seq - last_seq) % SEQ_MOD
+                if diff == 0 or diff >= SEQ_MOD // 2:
+                    return False, 0  # duplikat atau frame lama
+                self.last[frame.node] = (frame.seq, frame.ms)
+                return True, diff - 1
+            # millis() mundur: ESP32 reboot, nomor urut mulai lagi
+        self.last[frame.node] = (frame.seq, frame.ms)
+        return True, 0
+
+
+class Esp32Link:
+    """Koneksi USB serial ke satu ESP32 (antarmuka connect/close/connected seperti client pymodbus).
+
+    port boleh URL pyserial (socket://host:port, loop://) untuk simulator.
+    """
+
+    def __init__(self, port, baudrate=ESP32_BAUDRATE):
+        self.port = port
+        self.baudrate = baudrate
+        self.serial = None
+        self.reader = FrameReader()
+        self.sequence = SequenceTracker()
+        self.last_seen = {}   # node -> waktu host frame terakhir
+        self.opened_at = None
+
+    @property
+    def connected(self):
+        return self.serial is not None and self.serial.is_open
+
+    def connect(self):
+        try:
+            self.serial = serial.serial_for_url(self.port, baudrate=self.baudrate, timeout=0)
+        except (serial.SerialException, OSError, ValueError):
+            self.serial = None
+            return False
+        self.serial.reset_input_buffer()
+        self.reader = FrameReader()
+        self.opened_at = time.time()
+        return True
+
+    def close(self):
+        if self.serial is not None:
+            self.serial.close()
+        self.serial = None
+
+    def read_frames(self):
+        """Kuras semua byte yang sudah masuk. Return (frame, frame rusak sejak panggilan terakhir).
+
+        SerialException/OSError diteruskan (USB dicabut) agar pemanggil menutup koneksi.
+        """
+        bad_before = self.reader.bad
+        frames, total = [], 0
+        while total < MAX_READ:
+            chunk = self.serial.read(4096)
+            if not chunk:
+                break
+            total += len(chunk)
+            frames.extend(self.reader.feed(chunk))
+        return frames, self.reader.bad - bad_before
@@ -0,0 +1,140 @@
+"""Server ingest pusat (versi lokal) untuk menerima batch dari ws600_replicator.py.
+
+POST /ingest menerima batch JSON (boleh gzip), menyimpan ke tabel weather_data
+di DB pusat dengan kunci unik (site_id, source_id). Batch yang terkirim ulang
+setelah gangguan jaringan tidak menggandakan data. GET /status menampilkan
+jumlah baris dan id terakhir per lokasi.
+
+    python ws600_ingest_server.py --port 8100 --db central_data.db
+"""
+import argparse
+import gzip
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DB_NAME = "central_data.db"
+API_KEY = ""
+MAX_BODY = 32 * 1024 * 1024
+COLUMN_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+db_lock = threading.Lock()
+
+
+def init_db():
+    conn = sqlite3.connect(DB_NAME)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS weather_data (
+            site_id TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            received_at DATETIME,
+            PRIMARY KEY (site_id, source_id)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def store_batch(batch):
+    """Simpan satu batch; kolom baru dari lokasi ditambahkan otomatis. Return jumlah baris baru"""
+    columns = [c for c in batch["columns"] if c != "id"]
+    for c in columns:
+        if not COLUMN_NAME.match(c):
+            raise ValueError(f"Nama kolom tidak valid: {c}")
+    id_index = batch["columns"].index("id")
+    value_index = [batch["columns"].index(c) for c in columns]
+    received_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [
+        (batch["site_id"], row[id_index], received_at, *(row[i] for i in value_index))
+        for row in batch["rows"]
+    ]
+    with db_lock:
+        conn = sqlite3.connect(DB_NAME)
+        try:
+            existing = {r[1] for r in conn.execute("PRAGMA table_info(weather_data)")}
+            for c in columns:
+                if c not in existing:
+                    conn.execute(f"ALTER TABLE weather_data ADD COLUMN {c}")
+            placeholders = ", ".join("?" * (3 + len(columns)))
+            before = conn.total_changes
+            conn.executemany(
+                f"INSERT OR IGNORE INTO weather_data (site_id, source_id, received_at, {', '.join(columns)}) "
+                f"VALUES ({placeholders})", rows
+            )
+            conn.commit()
+            return conn.total_changes - before
+        finally:
+            conn.close()
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/ingest":
+            return self.reply(404, {"error": "not found"})
+        if API_KEY and self.headers.get("X-Api-Key") != API_KEY:
+            return self.reply(401, {"error": "api key salah"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if not 0 < length <= MAX_BODY:
+            return self.reply(413, {"error": "ukuran body tidak valid"})
+        try:
+            body = self.rfile.read(length)
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            batch = json.loads(body)
+            accepted = store_batch(batch)
+        except (ValueError, KeyError, OSError) as e:
+            return self.reply(400, {"error": str(e)})
+        except sqlite3.Error as e:
+            return self.reply(500, {"error": str(e)})
+        print(f"[{batch['site_id']}] id {batch['first_id']}-{batch['last_id']}: {accepted} baris baru")
+        self.reply(200, {"accepted": accepted, "last_id": batch["last_id"]})
+
+    def do_GET(self):
+        if self.path != "/status":
+            return self.reply(404, {"error": "not found"})
+        conn = sqlite3.connect(DB_NAME)
+        rows = conn.execute(
+            "SELECT site_id, COUNT(*), MAX(source_id), MAX(received_at) FROM weather_data GROUP BY site_id"
+        ).fetchall()
+        conn.close()
+        self.reply(200, [
+            {"site_id": r[0], "rows": r[1], "last_id": r[2], "last_received": r[3]} for r in rows
+        ])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    global DB_NAME, API_KEY
+    parser = argparse.ArgumentParser(description="Server ingest pusat WS-600 (lokal)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--api-key", default=API_KEY)
+    args = parser.parse_args()
+    DB_NAME, API_KEY = args.db, args.api_key
+
+    init_db()
+    server = ThreadingHTTPServer((args.host, args.port), IngestHandler)
+    print(f"[*] Ingest server di http://{args.host}:{args.port}/ingest (DB: {DB_NAME})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
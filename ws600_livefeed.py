@@ -0,0 +1,191 @@
+"""Feed data live poller -> dashboard lewat UDP localhost (fire-and-forget).
+
+Poller mengirim satu record biner kecil per stasiun setiap siklus polling;
+dashboard menampungnya di ring buffer memori (dashboard/recent_buffer.py).
+Jika dashboard tidak jalan, datagram hilang begitu saja tanpa memperlambat
+poller. Record: versi, station_id, timestamp epoch, lalu nilai float32
+sesuai urutan LIVE_FIELDS (NaN = tidak ada nilai). Status stasiun (port, sensor,
+circuit breaker, waktu perubahan terakhir) dikirim setiap siklus di datagram
+terpisah berversi STATUS_VERSION, sehingga dashboard bisa melayani /api/latest dan
+/api/status dari memori.
+
+Dashboard multi-worker: port feed dipegang LiveFeedHub di proses induk, yang
+meneruskan setiap datagram ke semua worker yang berlangganan (datagram SUBSCRIBE
+dari socket worker, diulang berkala sebagai tanda masih hidup).
+"""
+import math
+import socket
+import struct
+import threading
+import time
+
+LIVE_FEED_HOST = "127.0.0.1"
+LIVE_FEED_PORT = 9102
+LIVE_FIELDS = (
+    "wind_speed", "wind_direction", "temperature", "humidity",
+    "pressure", "rain_total", "solar_radiation",
+)
+FEED_VERSION = 1
+RECORD = struct.Struct("!BId" + "f" * len(LIVE_FIELDS))
+STATUS_VERSION = 2
+STATUS_RECORD = struct.Struct("!BIdBBB")  # versi, station_id, waktu perubahan, port, sensor, circuit
+CIRCUIT_STATES = ("healthy", "degraded", "open")
+MAX_DATAGRAM = 1400  # di bawah MTU, beberapa stasiun digabung per datagram
+SUBSCRIBE = b"\x00sub"   # versi 0: dilewati decode() jika sampai ke penerima biasa
+SUBSCRIBE_INTERVAL = 5   # detik, worker mengulang SUBSCRIBE
+SUBSCRIBER_TTL = 15      # detik, worker yang tidak mengulang dianggap mati
+
+
+def encode(records):
+    """records: iterable (station_id, ts, values). Return list datagram"""
+    datagrams, chunk = [], b""
+    for station_id, ts, values in records:
+        packed = RECORD.pack(
+            FEED_VERSION, station_id, ts,
+            *(math.nan if v is None else v for v in values)
+        )
+        if len(chunk) + len(packed) > MAX_DATAGRAM:
+            datagrams.append(chunk)
+            chunk = b""
+        chunk += packed
+    if chunk:
+        datagrams.append(chunk)
+    return datagrams
+
+
+def encode_status(records):
+    """records: iterable (station_id, changed_at, port_ok, sensor_ok, circuit_state). Return list datagram"""
+    datagrams, chunk = [], b""
+    for station_id, changed_at, port_ok, sensor_ok, state in records:
+        packed = STATUS_RECORD.pack(
+            STATUS_VERSION, station_id, changed_at, 1 if port_ok else 0, 1 if sensor_ok else 0,
+            CIRCUIT_STATES.index(state) if state in CIRCUIT_STATES else 255
+        )
+        if len(chunk) + len(packed) > MAX_DATAGRAM:
+            datagrams.append(chunk)
+            chunk = b""
+        chunk += packed
+    if chunk:
+        datagrams.append(chunk)
+    return datagrams
+
+
+def decode_status(datagram):
+    """Return list (station_id, changed_at, port_ok, sensor_ok, circuit_state) dari datagram status"""
+    records = []
+    for offset in range(0, len(datagram) - STATUS_RECORD.size + 1, STATUS_RECORD.size):
+        version, station_id, changed_at, port_ok, sensor_ok, state = STATUS_RECORD.unpack_from(datagram, offset)
+        if version == STATUS_VERSION:
+            state = CIRCUIT_STATES[state] if state < len(CIRCUIT_STATES) else None
+            records.append((station_id, changed_at, bool(port_ok), bool(sensor_ok), state))
+    return records
+
+
+def is_status(datagram):
+    return datagram[:1] == bytes((STATUS_VERSION,))
+
+
+def decode(datagram):
+    """Return list (station_id, ts, values); record dengan versi lain dilewati"""
+    records = []
+    for offset in range(0, len(datagram) - RECORD.size + 1, RECORD.size):
+        version, station_id, ts, *values = RECORD.unpack_from(datagram, offset)
+        if version == FEED_VERSION:
+            records.append((station_id, ts, values))
+    return records
+
+
+def ignore_connreset(sock):
+    """Windows: sendto ke port tanpa listener (worker/hub mati atau belum bind) membuat recvfrom
+    berikutnya gagal WSAECONNRESET. Matikan perilaku itu agar socket UDP tetap bisa menerima"""
+    if hasattr(socket, "SIO_UDP_CONNRESET"):
+        try:
+            sock.ioctl(socket.SIO_UDP_CONNRESET, False)
+        except OSError:
+            pass  # tetap aman: ConnectionResetError juga ditangkap di loop penerima
+
+
+def receive_error(err, stop):
+    """Error recv di loop penerima: True = berhenti. Hanya berhenti jika memang diminta stop"""
+    if stop.is_set():
+        return True
+    if not isinstance(err, ConnectionResetError):
+        print(f"Error socket feed live: {err}")
+        time.sleep(0.5)
+    return False
+
+
+class LiveFeedSender:
+    def __init__(self, host=LIVE_FEED_HOST, port=LIVE_FEED_PORT):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def send(self, records):
+        self._send(encode(records))
+
+    def send_status(self, records):
+        self._send(encode_status(records))
+
+    def _send(self, datagrams):
+        for datagram in datagrams:
+            try:
+                self.sock.sendto(datagram, self.address)
+            except OSError:
+                # Dashboard mati / buffer socket penuh: sampel live ini dilewati saja
+                pass
+
+    def close(self):
+        self.sock.close()
+
+
+class LiveFeedHub:
+    """Satu penerima feed untuk banyak worker dashboard: datagram poller diteruskan apa adanya"""
+    def __init__(self, host=LIVE_FEED_HOST, port=LIVE_FEED_PORT):
+        self.address = (host, port)
+        self.subscribers = {}  # (host, port) worker -> waktu SUBSCRIBE terakhir
+        self.relayed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self, sock):
+        while not self._stop.is_set():
+            try:
+                datagram, sender = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if receive_error(e, self._stop):
+                    break
+                continue
+            now = time.monotonic()
+            if datagram == SUBSCRIBE:
+                self.subscribers[sender] = now
+                continue
+            for address, seen in list(self.subscribers.items()):
+                if now - seen > SUBSCRIBER_TTL:
+                    del self.subscribers[address]
+                    continue
+                try:
+                    sock.sendto(datagram, address)
+                except OSError:
+                    pass  # buffer worker penuh: sampel live ini dilewati, sama seperti pengirim poller
+                self.relayed += 1
+        sock.close()
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind(self.address)
+        except OSError as e:
+            print(f"Hub feed live tidak aktif (port {self.address[1]}): {e}")
+            sock.close()
+            return False
+        ignore_connreset(sock)
+        sock.settimeout(1.0)
+        self._thread = threading.Thread(target=self._run, args=(sock,), name="live-feed-hub", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
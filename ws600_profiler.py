@@ -0,0 +1,292 @@
+"""Profiling ringan yang bisa dinyalakan saat runtime (poller & dashboard).
+
+Mode diambil dari kolom system_settings.profile_mode, tanpa restart:
+  off     tidak ada thread sampler, tanpa overhead
+  stacks  satu thread mengambil stack semua thread setiap SAMPLE_INTERVAL
+  full    stacks + tracemalloc (alokasi per baris dan pertumbuhannya antar dump)
+
+Sampling memakai waktu dinding: fungsi yang menunggu di kode C (query SQLite yang
+terkunci, timeout serial/Modbus, list_ports.comports) terhitung pada frame Python
+pemanggilnya, jadi persentase = porsi waktu thread berada di fungsi itu. Thread
+yang sedang menunggu di primitive idle (Event.wait, selector, antrian executor)
+dihitung terpisah sebagai idle. Setiap DUMP_INTERVAL ringkasan jendela ditulis ke
+<dir>/<nama>-<waktu>-<pid>.json (termasuk stack terlipat untuk flamegraph); hanya
+KEEP_FILES file terbaru per nama yang disimpan.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_MODES = ("off", "stacks", "full")
+SAMPLE_INTERVAL = 0.05  # 20 Hz; satu sampel belasan thread ~0.1 ms
+DUMP_INTERVAL = 60      # detik per file profil
+KEEP_FILES = 30         # file per nama proses (30 menit terakhir pada DUMP_INTERVAL 60)
+MAX_DEPTH = 40          # frame per stack
+MAX_STACKS = 5000       # stack terlipat berbeda per jendela, sisanya masuk "(lainnya)"
+TRACE_FRAMES = 1        # frame per alokasi tracemalloc (cukup untuk statistik per baris, snapshot tetap murah)
+TOP = 20
+
+# Frame terdalam yang berarti thread sedang menunggu pekerjaan, bukan sibuk
+IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures: worker executor menunggu job
+}
+# Frame dasar setiap thread, tidak berguna di daftar waktu kumulatif
+BOOTSTRAP_FUNCTIONS = {"_bootstrap", "_bootstrap_inner", "run"}
+
+
+def short_path(filename):
+    return "/".join(filename.replace("\\", "/").split("/")[-2:])
+
+
+def function_label(code):
+    return f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def top_items(counter, ticks, top):
+    return [
+        {"name": name, "samples": count, "pct": round(100.0 * count / ticks, 1) if ticks else 0.0}
+        for name, count in counter.most_common(top)
+    ]
+
+
+class Profiler:
+    def __init__(self, name, directory, idle=()):
+        """idle: pasangan (nama file, fungsi) tambahan yang berarti menunggu, mis. loop recv/sleep utama"""
+        self.name = name
+        self.directory = directory
+        self.idle = IDLE_FUNCTIONS | set(idle)
+        self.mode = "off"
+        self.last_dump = None
+        self.last_memory = None
+        self._lock = threading.Lock()
+        self._config_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watch_stop = threading.Event()
+        self._traced_by_us = False
+        self._previous_lines = None  # {(file, baris): byte} snapshot sebelumnya
+        self._reset()
+
+    def _reset(self):
+        self.window_start = time.time()
+        self.ticks = 0
+        self.cost = 0.0
+        self.threads = Counter()  # nama thread -> sampel sibuk
+        self.idle_samples = Counter()
+        self.self_time = Counter()
+        self.total_time = Counter()
+        self.lines = Counter()
+        self.stacks = Counter()
+
+    # ---------- kontrol ----------
+    def configure(self, mode):
+        """Ganti mode (off/stacks/full); nilai tidak dikenal dianggap off"""
+        mode = mode if mode in PROFILE_MODES else "off"
+        with self._config_lock:
+            if mode == self.mode:
+                return
+            previous, self.mode = self.mode, mode
+            if previous == "off":
+                # Event baru per thread sampler: thread lama yang belum sempat berhenti tidak ikut hidup lagi
+                self._stop = threading.Event()
+                threading.Thread(target=self._run, args=(self._stop,), name="profiler", daemon=True).start()
+            elif mode == "off":
+                self._stop.set()
+        print(f"[*] Profiling {self.name}: {mode}")
+
+    def watch(self, read_mode, interval=5.0):
+        """Thread kecil yang membaca mode dari read_mode() (mis. system_settings) setiap interval"""
+        def loop():
+            while True:
+                try:
+                    self.configure(read_mode())
+                except Exception as e:
+                    print(f"Gagal membaca mode profiling: {e}")
+                if self._watch_stop.wait(interval):  # Event.wait: thread ini terhitung idle
+                    return
+        threading.Thread(target=loop, name="profiler-watch", daemon=True).start()
+
+    def stop(self):
+        self._watch_stop.set()
+        self.configure("off")
+
+    # ---------- sampling ----------
+    def _run(self, stop):
+        next_dump = time.monotonic() + DUMP_INTERVAL
+        while not stop.wait(SAMPLE_INTERVAL):
+            self._sync_tracing()
+            self.sample()
+            if time.monotonic() >= next_dump:
+                next_dump = time.monotonic() + DUMP_INTERVAL
+                self._dump_safely()
+        self._dump_safely()
+        self._sync_tracing()
+
+    def _sync_tracing(self):
+        """tracemalloc hanya dinyalakan/dimatikan dari thread sampler, agar tidak berhenti di tengah snapshot"""
+        if self.mode == "full" and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._traced_by_us = True
+        elif self.mode != "full" and self._traced_by_us:
+            tracemalloc.stop()
+            self._traced_by_us = False
+            self._previous_lines = None
+
+    def _dump_safely(self):
+        try:
+            self.dump()
+        except Exception as e:
+            print(f"Gagal menulis profil {self.name}: {e}")
+
+    def sample(self):
+        started = time.perf_counter()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        me = threading.get_ident()
+        frames = sys._current_frames()
+        with self._lock:
+            self.ticks += 1
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                thread = names.get(ident, str(ident))
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in self.idle:
+                    self.idle_samples[thread] += 1
+                    continue
+                self.threads[thread] += 1
+                self.self_time[function_label(code)] += 1
+                self.lines[f"{short_path(code.co_filename)}:{frame.f_lineno} ({code.co_name})"] += 1
+                stack, cumulative = [], set()
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    code = frame.f_code
+                    label = function_label(code)
+                    stack.append(label)
+                    if not (code.co_name in BOOTSTRAP_FUNCTIONS and code.co_filename == threading.__file__):
+                        cumulative.add(label)
+                    frame = frame.f_back
+                for label in cumulative:
+                    self.total_time[label] += 1
+                folded = ";".join([thread] + stack[::-1])
+                if folded in self.stacks or len(self.stacks) < MAX_STACKS:
+                    self.stacks[folded] += 1
+                else:
+                    self.stacks[f"{thread};(lainnya)"] += 1
+            self.cost += time.perf_counter() - started
+
+    # ---------- memori ----------
+    def memory(self, top=TOP):
+        """Top alokasi per baris + pertumbuhan sejak snapshot sebelumnya (hanya mode full)"""
+        if not tracemalloc.is_tracing():
+            return None
+        # Tanpa filter_traces/compare_to: keduanya mencocokkan pola per trace dan jauh lebih lambat
+        # dari statistik per baris sekali jalan; baris milik tracemalloc & profiler dibuang dari hasil
+        stats = [
+            s for s in tracemalloc.take_snapshot().statistics("lineno")
+            if s.traceback[0].filename not in (tracemalloc.__file__, __file__)
+        ]
+        current, peak = tracemalloc.get_traced_memory()
+        lines = {(s.traceback[0].filename, s.traceback[0].lineno): (s.size, s.count) for s in stats}
+        result = {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {"line": f"{short_path(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+                 "kb": round(s.size / 1024, 1), "count": s.count}
+                for s in stats[:top]
+            ],
+            "growth": [],
+        }
+        if self._previous_lines is not None:
+            growth = []
+            for key, (size, count) in lines.items():
+                old_size, old_count = self._previous_lines.get(key, (0, 0))
+                if size > old_size:
+                    growth.append((size - old_size, count - old_count, key))
+            growth.sort(reverse=True)
+            result["growth"] = [
+                {"line": f"{short_path(filename)}:{lineno}", "kb": round(size / 1024, 1), "count": count}
+                for size, count, (filename, lineno) in growth[:top]
+            ]
+        self._previous_lines = lines
+        return result
+
+    # ---------- ringkasan & file ----------
+    def summary(self, top=TOP, stacks=0):
+        """Ringkasan jendela berjalan; stacks > 0 ikut menyertakan stack terlipat terbanyak"""
+        with self._lock:
+            ticks = self.ticks
+            result = {
+                "process": self.name,
+                "pid": os.getpid(),
+                "mode": self.mode,
+                "window_start": datetime.fromtimestamp(self.window_start).strftime("%Y-%m-%d %H:%M:%S"),
+                "window_seconds": round(time.time() - self.window_start, 1),
+                "samples": ticks,
+                "sample_interval": SAMPLE_INTERVAL,
+                "overhead_ms_per_sample": round(1000 * self.cost / ticks, 3) if ticks else None,
+                "threads": {
+                    thread: {
+                        "busy_pct": round(100.0 * self.threads[thread] / ticks, 1) if ticks else 0.0,
+                        "idle_pct": round(100.0 * self.idle_samples[thread] / ticks, 1) if ticks else 0.0,
+                    }
+                    for thread in sorted(set(self.threads) | set(self.idle_samples))
+                },
+                "hot_self": top_items(self.self_time, ticks, top),
+                "hot_total": top_items(self.total_time, ticks, top),
+                "hot_lines": top_items(self.lines, ticks, top),
+            }
+            if stacks:
+                result["stacks"] = [f"{s} {n}" for s, n in self.stacks.most_common(stacks)]
+        result["memory"] = self.last_memory
+        result["last_dump"] = self.last_dump
+        return result
+
+    def dump(self):
+        """Tulis jendela berjalan ke file (tmp + rename), mulai jendela baru, buang file lama"""
+        self.last_memory = self.memory()
+        data = self.summary(top=100, stacks=MAX_STACKS)
+        with self._lock:
+            self._reset()
+        if not data["samples"]:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.name}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.json")
+        with open(path + ".part", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".part", path)
+        self.last_dump = path
+        for old in profile_files(self.directory, self.name)[KEEP_FILES:]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # sudah dihapus proses lain dengan nama sama (worker dashboard)
+        return path
+
+
+def profile_files(directory, name):
+    """File profil untuk nama proses, terbaru dulu"""
+    prefix = name + "-"
+    try:
+        files = [f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith(".json")]
+    except OSError:
+        return []
+    return [os.path.join(directory, f) for f in sorted(files, reverse=True)]
+
+
+def load_profile(path, top=TOP):
+    """Isi file profil, dipangkas ke top N per daftar (untuk /api/debug/profile)"""
+    with open(path) as f:
+        data = json.load(f)
+    for key in ("hot_self", "hot_total", "hot_lines"):
+        data[key] = data.get(key, [])[:top]
+    data.pop("stacks", None)
+    data["file"] = path
+    return data
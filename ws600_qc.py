@@ -0,0 +1,249 @@
+"""Quality control sampel WS-600: bitmask kualitas per baris weather_data.
+
+Setiap kolom di QC_FIELDS mendapat 4 bit di kolom qc_flags (kolom ke-i di bit 4i..4i+3):
+    QC_MISSING  nilai kosong / NaN (kecuali channel opsional QC_OPTIONAL)
+    QC_RANGE    di luar rentang fisik sensor
+    QC_STEP     loncatan lebih besar dari batas perubahan per menit (spike / step);
+                sampel yang kembali dari spike tidak ikut ditandai
+    QC_FLATLINE nilai tidak berubah selama >= durasi flatline (sensor macet): perubahan
+                antar sampel kurang dari setengah resolusi sensor (noise float/pembulatan)
+                tidak dihitung berubah; nilai tepat di batas rentang (angin 0, RH 100 %,
+                radiasi malam 0) dikecualikan
+qc_flags NULL = baris lama yang belum pernah dicek, dianggap bersih.
+
+Poller menjalankan QualityChecker per stasiun pada setiap sampel; baris histori bisa
+dicek ulang secara batch (vektor numpy, per chunk) lewat:
+
+    python ws600_qc.py --db ws600_data.db --start 2026-01-01 --end 2026-01-31 [--station 1]
+"""
+import argparse
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+QC_MISSING, QC_RANGE, QC_STEP, QC_FLATLINE = 1, 2, 4, 8
+QC_BITS = 4
+
+# kolom: (min, maks, perubahan maks per menit | None, durasi flatline detik | None, resolusi sensor)
+# Rentang sama dengan FIELD_RANGES poller. Durasi flatline dipilih lebih panjang dari periode
+# tenang yang wajar pada resolusi sensor: tekanan 0.1 hPa dan RH 0.1 % bisa diam berjam-jam
+# saat malam tenang (tekanan tetap bergerak oleh pasang harian dalam 6 jam)
+QC_LIMITS = {
+    "wind_speed": (0.0, 80.0, 20.0, 3600, 0.1),
+    "wind_direction": (0.0, 360.0, None, None, 1.0),
+    "temperature": (-60.0, 80.0, 3.0, 10800, 0.1),
+    "humidity": (0.0, 100.0, 10.0, 14400, 0.1),
+    "pressure": (800.0, 1200.0, 2.0, 21600, 0.1),
+    "rain_total": (0.0, 20000.0, None, None, 0.1),  # loncatan counter ditangani RainAccumulator
+    "solar_radiation": (0.0, 2500.0, 1000.0, 3600, 1.0),
+}
+QC_FIELDS = list(QC_LIMITS)
+QC_OPTIONAL = {"solar_radiation"}  # channel opsional: kosong = sensor tanpa channel ini, bukan data buruk
+MAX_STEP_GAP = 3600   # jeda antar sampel lebih dari ini (detik): cek loncatan dilewati
+RERUN_CHUNK = 50000
+
+
+def qc_mask(*columns, checks=QC_MISSING | QC_RANGE | QC_STEP | QC_FLATLINE):
+    """Bitmask qc_flags untuk kolom tertentu (kolom di luar QC_FIELDS diabaikan)"""
+    mask = 0
+    for column in columns:
+        if column in QC_LIMITS:
+            mask |= checks << (QC_FIELDS.index(column) * QC_BITS)
+    return mask
+
+
+def qc_clean_sql(*columns):
+    """Kondisi SQL: baris tidak ditandai untuk kolom tersebut (NULL = belum dicek = lolos)"""
+    mask = qc_mask(*(columns or QC_FIELDS))
+    return f"COALESCE(qc_flags & {mask}, 0) = 0"
+
+
+def qc_value_sql(column):
+    """Ekspresi SQL kolom dengan nilai yang ditandai QC diganti NULL (kolom tanpa QC apa adanya)"""
+    if column not in QC_LIMITS:
+        return column
+    return f"CASE WHEN COALESCE(qc_flags & {qc_mask(column)}, 0) = 0 THEN {column} END"
+
+
+def describe(flags):
+    """qc_flags -> {kolom: [nama cek]} (untuk log / debug)"""
+    names = {QC_MISSING: "missing", QC_RANGE: "range", QC_STEP: "step", QC_FLATLINE: "flatline"}
+    result = {}
+    for i, column in enumerate(QC_FIELDS):
+        bits = (flags >> (i * QC_BITS)) & 0xF
+        if bits:
+            result[column] = [name for bit, name in names.items() if bits & bit]
+    return result
+
+
+def check_batch(times, values, state=None):
+    """Cek n sampel sekaligus (urut waktu). times: n detik, values: n x len(QC_FIELDS) (None/NaN = kosong).
+
+    state = hasil panggilan sebelumnya (sampel terakhir, arah loncatan, awal nilai datar), sehingga
+    data bisa diproses per chunk atau per sampel dengan hasil sama. Return (flags int64[n], state baru).
+    """
+    import numpy as np  # hanya poller & rerun yang butuh; dashboard cukup qc_mask()
+
+    t = np.asarray(times, dtype=np.float64)
+    v = np.asarray(values, dtype=np.float64).reshape(len(t), len(QC_FIELDS))
+    limits = np.array([[np.nan if x is None else x for x in QC_LIMITS[c]] for c in QC_FIELDS]).T
+    lo, hi, step, flat_secs, resolution = limits
+    if state is None:
+        nan = np.full(len(QC_FIELDS), np.nan)
+        state = (np.nan, nan, np.zeros(len(QC_FIELDS), dtype=bool), nan, nan)
+    prev_t, prev_v, prev_exceed, prev_d, prev_run = state
+
+    missing = ~np.isfinite(v)
+    optional = np.array([c in QC_OPTIONAL for c in QC_FIELDS])
+    with np.errstate(invalid="ignore"):
+        out_of_range = (v < lo) | (v > hi)
+
+        # Loncatan terhadap sampel sebelumnya, batas diskalakan dengan jarak waktu (minimal 1 menit)
+        d = np.diff(np.vstack([prev_v, v]), axis=0)
+        dt = np.diff(np.concatenate([[prev_t], t]))
+        limit = step * np.maximum(1.0, dt / 60)[:, None]
+        exceed = (np.abs(d) > limit) & (dt <= MAX_STEP_GAP)[:, None]
+        before_exceed = np.vstack([prev_exceed, exceed[:-1]])
+        before_d = np.vstack([prev_d, d[:-1]])
+        returning = before_exceed & (np.sign(d) * np.sign(before_d) < 0)
+        stepped = exceed & ~returning
+
+        # Flatline: awal deretan nilai yang tidak berubah (|d| < setengah resolusi; satu langkah
+        # resolusi tetap dihitung berubah walau selisih float-nya 0.0999...)
+        changed = ~(np.abs(d) < resolution / 2)
+        index = np.arange(len(t))[:, None]
+        last_change = np.maximum.accumulate(np.where(changed, index, -1), axis=0)
+        run_start = np.where(last_change >= 0, t[np.maximum(last_change, 0)], prev_run)
+        at_bound = (v == lo) | (v == hi)
+        flat = (t[:, None] - run_start >= flat_secs) & ~at_bound & ~missing
+
+    bits = ((missing & ~optional) * QC_MISSING) | (out_of_range * QC_RANGE) | (stepped * QC_STEP) | (flat * QC_FLATLINE)
+    shifts = np.arange(len(QC_FIELDS)) * QC_BITS
+    flags = (bits.astype(np.int64) << shifts).sum(axis=1)
+    if len(t):
+        state = (t[-1], v[-1].copy(), exceed[-1].copy(), d[-1].copy(), run_start[-1].copy())
+    return flags, state
+
+
+class QualityChecker:
+    """QC streaming satu stasiun (state dibawa dari sampel ke sampel)"""
+
+    def __init__(self):
+        self.state = None
+
+    def check(self, ts, values):
+        """values: list nilai urut QC_FIELDS. Return qc_flags sampel ini"""
+        flags, self.state = check_batch([ts], [[as_float(x) for x in values]], self.state)
+        return int(flags[0])
+
+
+def as_float(value):
+    return float("nan") if value is None else value
+
+
+# ==============================
+# CEK ULANG HISTORI (BATCH)
+# ==============================
+def init_db(conn):
+    columns = [c[1] for c in conn.execute("PRAGMA table_info(weather_data)")]
+    if "qc_flags" not in columns:
+        conn.execute("ALTER TABLE weather_data ADD COLUMN qc_flags INTEGER")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS qc_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at DATETIME,
+            range_start DATETIME,
+            range_end DATETIME,
+            station_id INTEGER,
+            rows_checked INTEGER,
+            rows_flagged INTEGER,
+            duration_s REAL
+        )
+    ''')
+    conn.commit()
+
+
+def epoch(timestamps):
+    import numpy as np
+    return np.array(timestamps, dtype="datetime64[s]").astype(np.int64).astype(np.float64)
+
+
+def rerun(db_path, start, end, station_id=None, chunk=RERUN_CHUNK):
+    """Hitung ulang qc_flags baris start..end (string 'YYYY-MM-DD HH:MM:SS'). Return (baris dicek, baris ditandai)"""
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path, timeout=10)
+    init_db(conn)
+    if station_id is None:
+        station_ids = [r[0] for r in conn.execute(
+            "SELECT DISTINCT station_id FROM weather_data WHERE timestamp BETWEEN ? AND ?", (start, end)
+        )]
+    else:
+        station_ids = [station_id]
+
+    # DB lama bisa belum punya kolom tertentu (mis. solar_radiation): dibaca sebagai NULL
+    existing = {c[1] for c in conn.execute("PRAGMA table_info(weather_data)")}
+    columns = ", ".join(c if c in existing else "NULL" for c in QC_FIELDS)
+    # Pemanasan: sampel sebelum start (sepanjang flatline terpanjang) hanya untuk mengisi state
+    warmup = max(x[3] or 0 for x in QC_LIMITS.values())
+    warmup_start = (datetime.strptime(start, "%Y-%m-%d %H:%M:%S") - timedelta(seconds=warmup)).strftime("%Y-%m-%d %H:%M:%S")
+    checked = flagged = 0
+    for sid in station_ids:
+        rows = conn.execute(
+            f"SELECT timestamp, {columns} FROM weather_data "
+            f"WHERE station_id = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp, id",
+            (sid, warmup_start, start)
+        ).fetchall()
+        state = None
+        if rows:
+            _, state = check_batch(epoch([r[0] for r in rows]), [[as_float(x) for x in r[1:]] for r in rows])
+
+        last = (start, -1)
+        while True:
+            rows = conn.execute(
+                f"SELECT id, timestamp, {columns} FROM weather_data "
+                f"WHERE station_id = ? AND (timestamp, id) > (?, ?) AND timestamp <= ? "
+                f"ORDER BY timestamp, id LIMIT ?",
+                (sid, last[0], last[1], end, chunk)
+            ).fetchall()
+            if not rows:
+                break
+            flags, state = check_batch(epoch([r[1] for r in rows]), [[as_float(x) for x in r[2:]] for r in rows], state)
+            conn.executemany("UPDATE weather_data SET qc_flags = ? WHERE id = ?",
+                             zip(flags.tolist(), (r[0] for r in rows)))
+            conn.commit()
+            checked += len(rows)
+            flagged += int((flags != 0).sum())
+            last = (rows[-1][1], rows[-1][0])
+
+    # Statistik harian yang tersimpan dihitung dari flag lama: hitung ulang saat diminta
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'daily_stats'").fetchone():
+        conn.execute("DELETE FROM daily_stats WHERE date BETWEEN ? AND ?", (start[:10], end[:10]))
+    conn.execute(
+        "INSERT INTO qc_runs (started_at, range_start, range_end, station_id, rows_checked, rows_flagged, duration_s) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), start, end, station_id, checked, flagged,
+         round(time.perf_counter() - started, 3))
+    )
+    conn.commit()
+    conn.close()
+    return checked, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cek ulang kualitas data weather_data (qc_flags)")
+    parser.add_argument("--db", default="ws600_data.db")
+    parser.add_argument("--start", help="YYYY-MM-DD (default: data paling awal)")
+    parser.add_argument("--end", help="YYYY-MM-DD (default: hari ini)")
+    parser.add_argument("--station", type=int, help="hanya satu stasiun")
+    args = parser.parse_args()
+
+    start = f"{args.start} 00:00:00" if args.start else "1970-01-01 00:00:00"
+    end = f"{args.end} 23:59:59" if args.end else datetime.now().strftime("%Y-%m-%d 23:59:59")
+    started = time.perf_counter()
+    checked, flagged = rerun(args.db, start, end, args.station)
+    elapsed = time.perf_counter() - started
+    print(f"[*] {checked} baris dicek, {flagged} ditandai ({elapsed:.1f}s, {checked / max(elapsed, 1e-9):.0f} baris/s)")
+
+
+if __name__ == "__main__":
+    main()
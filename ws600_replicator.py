@@ -0,0 +1,265 @@
+"""Agent replikasi store-and-forward: kirim weather_data baru ke server pusat.
+
+Baris baru dibaca berdasarkan watermark id (id > cursor), dikirim per batch
+(nama kolom sekali, baris sebagai array, gzip) lalu cursor disimpan di tabel
+replication_state setelah server mengonfirmasi. Selama jaringan atau server
+pusat mati data tetap aman di DB lokal; pengiriman dilanjutkan dari cursor
+terakhir tanpa scan ulang.
+
+Batasan: setiap baris hanya dikirim sekali. Perubahan setelah baris terkirim
+(mis. qc_flags dari cek ulang ws600_qc.py) tidak direplikasi ulang; jalankan
+cek QC yang sama di server pusat jika flag terbaru dibutuhkan di sana.
+
+    python ws600_replicator.py                    # pengaturan dari DB (replication_settings)
+    python ws600_replicator.py --url http://pusat:8100/ingest --site kebun-1 --once
+"""
+import argparse
+import gzip
+import json
+import socket
+import sqlite3
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+# ==============================
+# KONFIGURASI DEFAULT (Akan diupdate dari Database)
+# ==============================
+DB_NAME = "ws600_data.db"
+TARGET = "central"          # nama cursor di replication_state (satu baris per tujuan)
+ENABLED = False
+ENDPOINT_URL = ""           # mis. http://server-pusat:8100/ingest
+SITE_ID = socket.gethostname()
+API_KEY = ""
+BATCH_SIZE = 2000           # baris per request
+MAX_BYTES_PER_SEC = 0       # batas bandwidth rata-rata (byte terkompresi), 0 = tanpa batas
+BACKFILL_DAYS = -1          # cursor baru: -1 = kirim semua data lama, 0 = hanya data baru, N = N hari terakhir
+IDLE_INTERVAL = 10          # jeda saat semua data sudah terkirim (detik)
+RETRY_MIN = 5               # jeda retry pertama saat server tidak bisa dihubungi (detik)
+RETRY_MAX = 300
+HTTP_TIMEOUT = 30
+CHECK_SETTINGS_INTERVAL = 30
+
+
+# ==============================
+# DATABASE FUNCTIONS
+# ==============================
+def init_db():
+    conn = sqlite3.connect(DB_NAME)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_settings (
+            id INTEGER PRIMARY KEY,
+            enabled INTEGER DEFAULT 0,
+            endpoint_url TEXT,
+            site_id TEXT,
+            api_key TEXT,
+            batch_size INTEGER DEFAULT 2000,
+            max_bytes_per_sec INTEGER DEFAULT 0,
+            backfill_days INTEGER DEFAULT -1
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS replication_state (
+            target TEXT PRIMARY KEY,
+            last_id INTEGER,
+            rows_sent INTEGER DEFAULT 0,
+            bytes_sent INTEGER DEFAULT 0,
+            last_success DATETIME,
+            last_attempt DATETIME,
+            last_error TEXT
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO replication_settings (id) VALUES (1)")
+    conn.commit()
+    conn.close()
+
+def load_settings():
+    global ENABLED, ENDPOINT_URL, SITE_ID, API_KEY, BATCH_SIZE, MAX_BYTES_PER_SEC, BACKFILL_DAYS
+    try:
+        conn = sqlite3.connect(DB_NAME)
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM replication_settings WHERE id = 1").fetchone()
+        conn.close()
+    except Exception as e:
+        print(f"Gagal memuat pengaturan replikasi: {e}")
+        return
+    if row:
+        ENABLED = bool(row["enabled"])
+        ENDPOINT_URL = row["endpoint_url"] or ENDPOINT_URL
+        SITE_ID = row["site_id"] or SITE_ID
+        API_KEY = row["api_key"] or API_KEY
+        BATCH_SIZE = row["batch_size"] or BATCH_SIZE
+        MAX_BYTES_PER_SEC = row["max_bytes_per_sec"] or 0
+        BACKFILL_DAYS = row["backfill_days"] if row["backfill_days"] is not None else BACKFILL_DAYS
+
+def load_cursor(conn):
+    """Return last_id yang sudah diterima server; cursor baru ditentukan oleh BACKFILL_DAYS"""
+    row = conn.execute("SELECT last_id FROM replication_state WHERE target = ?", (TARGET,)).fetchone()
+    if row is not None:
+        return row[0]
+    if BACKFILL_DAYS < 0:
+        start = 0
+    elif BACKFILL_DAYS == 0:
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM weather_data").fetchone()[0]
+    else:
+        cutoff = (datetime.now() - timedelta(days=BACKFILL_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        first = conn.execute("SELECT MIN(id) FROM weather_data WHERE timestamp >= ?", (cutoff,)).fetchone()[0]
+        start = first - 1 if first is not None else conn.execute("SELECT COALESCE(MAX(id), 0) FROM weather_data").fetchone()[0]
+    conn.execute("INSERT INTO replication_state (target, last_id) VALUES (?, ?)", (TARGET, start))
+    conn.commit()
+    return start
+
+def save_cursor(conn, last_id, rows, size):
+    conn.execute('''
+        UPDATE replication_state
+        SET last_id = ?, rows_sent = rows_sent + ?, bytes_sent = bytes_sent + ?,
+            last_success = ?, last_attempt = ?, last_error = NULL
+        WHERE target = ?
+    ''', (last_id, rows, size, now_str(), now_str(), TARGET))
+    conn.commit()
+
+def save_error(conn, error):
+    try:
+        conn.rollback()  # transaksi yang gagal di tengah (mis. database terkunci) dibuang dulu
+        conn.execute(
+            "UPDATE replication_state SET last_attempt = ?, last_error = ? WHERE target = ?",
+            (now_str(), str(error)[:500], TARGET)
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        # DB masih terkunci oleh poller: status error dicatat di percobaan berikutnya
+        print(f"Gagal mencatat error replikasi: {e}")
+
+def now_str():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ==============================
+# PENGIRIMAN
+# ==============================
+def read_batch(conn, last_id):
+    """Baris id > last_id (urut id), maksimal BATCH_SIZE. Return (kolom, rows)"""
+    cursor = conn.execute("SELECT * FROM weather_data WHERE id > ? ORDER BY id LIMIT ?", (last_id, BATCH_SIZE))
+    columns = [c[0] for c in cursor.description]
+    return columns, cursor.fetchall()
+
+def encode_batch(columns, rows):
+    payload = {
+        "site_id": SITE_ID,
+        "first_id": rows[0][0],
+        "last_id": rows[-1][0],
+        "columns": columns,
+        "rows": rows,
+    }
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), compresslevel=6)
+
+def send_batch(body, last_id):
+    """POST satu batch; return True jika server mengonfirmasi sampai last_id"""
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip",
+        "X-Site-Id": SITE_ID,
+    }
+    if API_KEY:
+        headers["X-Api-Key"] = API_KEY
+    request = urllib.request.Request(ENDPOINT_URL, data=body, headers=headers, method="POST")
+    with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+        ack = json.loads(response.read() or b"{}")
+    # Server mengembalikan last_id yang sudah tersimpan; selain itu batch dianggap belum diterima
+    if ack.get("last_id") != last_id:
+        raise ValueError(f"Konfirmasi server tidak sesuai: {ack}")
+    return True
+
+def replicate_once(conn):
+    """Kirim satu batch. Return (jumlah baris, byte terkirim); (0, 0) jika sudah up to date"""
+    last_id = load_cursor(conn)
+    columns, rows = read_batch(conn, last_id)
+    if not rows:
+        return 0, 0
+    body = encode_batch(columns, rows)
+    send_batch(body, rows[-1][0])
+    save_cursor(conn, rows[-1][0], len(rows), len(body))
+    return len(rows), len(body)
+
+
+# ==============================
+# MAIN LOOP
+# ==============================
+def run(once=False):
+    print(f"[*] WS-600 Replication Agent ({SITE_ID}) -> {ENDPOINT_URL or '(belum diatur)'}")
+    conn = sqlite3.connect(DB_NAME, timeout=5)
+    retry_delay = RETRY_MIN
+    last_settings_check = time.time()
+    try:
+        while True:
+            now = time.time()
+            if now - last_settings_check >= CHECK_SETTINGS_INTERVAL:
+                load_settings()
+                last_settings_check = now
+            if not (ENABLED and ENDPOINT_URL):
+                if once:
+                    print("[!] Replikasi belum diaktifkan / URL server kosong.")
+                    return
+                time.sleep(IDLE_INTERVAL)
+                continue
+
+            started = time.time()
+            try:
+                rows, size = replicate_once(conn)
+            except (urllib.error.URLError, OSError, ValueError, sqlite3.Error) as e:
+                # sqlite3.Error: "database is locked" saat poller menulis; batch yang sudah terkirim
+                # tapi cursor-nya gagal disimpan dikirim ulang dan diabaikan server (INSERT OR IGNORE)
+                save_error(conn, e)
+                print(f"[!] Gagal kirim ({e}), coba lagi dalam {retry_delay:.0f}s")
+                if once:
+                    return
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, RETRY_MAX)
+                continue
+            retry_delay = RETRY_MIN
+
+            if not rows:
+                if once:
+                    return
+                time.sleep(IDLE_INTERVAL)
+                continue
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {rows} baris terkirim ({size} byte)")
+
+            # Batas bandwidth: jeda sebanding ukuran batch yang baru dikirim
+            if MAX_BYTES_PER_SEC:
+                time.sleep(max(0, size / MAX_BYTES_PER_SEC - (time.time() - started)))
+    except KeyboardInterrupt:
+        print("\n[!] Replikasi dihentikan pengguna.")
+    finally:
+        conn.close()
+
+
+def main():
+    global DB_NAME, ENABLED, ENDPOINT_URL, SITE_ID, BATCH_SIZE, MAX_BYTES_PER_SEC, BACKFILL_DAYS, CHECK_SETTINGS_INTERVAL
+    parser = argparse.ArgumentParser(description="Replikasi weather_data ke server pusat")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--url", help="endpoint ingest server pusat (menimpa pengaturan DB)")
+    parser.add_argument("--site", help="ID lokasi ini")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--rate", type=int, help="batas byte/detik")
+    parser.add_argument("--backfill-days", type=int)
+    parser.add_argument("--once", action="store_true", help="kirim sampai up to date lalu keluar")
+    args = parser.parse_args()
+
+    DB_NAME = args.db
+    init_db()
+    load_settings()
+    if args.url:
+        # Argumen CLI menimpa DB dan tidak dimuat ulang selama berjalan
+        ENABLED, ENDPOINT_URL = True, args.url
+        SITE_ID = args.site or SITE_ID
+        BATCH_SIZE = args.batch_size or BATCH_SIZE
+        MAX_BYTES_PER_SEC = args.rate if args.rate is not None else MAX_BYTES_PER_SEC
+        BACKFILL_DAYS = args.backfill_days if args.backfill_days is not None else BACKFILL_DAYS
+        CHECK_SETTINGS_INTERVAL = float("inf")
+    run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()